@@ -3,7 +3,8 @@ import os
 import pandas as pd
 from scipy.stats import gaussian_kde
 import matplotlib.pyplot as plt
-import geopandas as gpd
+from utils.figure_jobs import FigureJob, run_figure_jobs, save_figure
+from utils.world_geometry import plot_boundaries
 
 # Enable LaTeX and set fonts for better formatting
 plt.rcParams['text.usetex'] = True
@@ -39,9 +40,6 @@ def plot_kde_with_map(df, chain, output_folder='results', show_boundaries=True):
     positions = np.vstack([xgrid.ravel(), ygrid.ravel()])
     density = kde(positions).reshape(xgrid.shape)
 
-    # Load the world map
-    world = gpd.read_file('ne_110m_admin_0_countries/ne_110m_admin_0_countries.shp')  # Adjust this path
-
     # Create output directory if it doesn't exist
     os.makedirs(output_folder, exist_ok=True)
 
@@ -50,7 +48,7 @@ def plot_kde_with_map(df, chain, output_folder='results', show_boundaries=True):
     ax = plt.gca()
     
     if show_boundaries:
-        world.boundary.plot(ax=ax, color='black')  # Draw world boundaries
+        plot_boundaries(ax, color='black')  # Draw cached world boundaries
     
     contour = plt.contourf(xgrid, ygrid, density, levels=20, cmap='Reds', vmin=0, vmax=0.0002)
     plt.colorbar(contour, ax=ax, shrink=0.4, label=r'\textbf{Density of Stake Weight}', ticks=[0, 0.00005, 0.0001, 0.00015, 0.0002])
@@ -65,18 +63,27 @@ def plot_kde_with_map(df, chain, output_folder='results', show_boundaries=True):
 
     # Save the plot
     plot_file_path = os.path.join(output_folder, f'{chain}_kde_plot.pdf')  # Save as PDF
-    plt.savefig(plot_file_path, format='pdf', dpi=300, transparent=True)
+    plot_file_path = save_figure(plot_file_path, format='pdf', dpi=300, transparent=True)
     plt.close()  # Close the plot to free memory
 
     print(f'Saved plot to {plot_file_path}')
 
-def analyze_files(folder, output_folder='results', show_boundaries=True):
-    """Analyze all CSV files in a specified folder."""
+def plot_kde_file(file_path, chain, output_folder='results', show_boundaries=True):
+    """Read a CSV file and plot the KDE of its stake weights."""
+    df = pd.read_csv(file_path)
+    plot_kde_with_map(df, chain, output_folder, show_boundaries)
+
+def analyze_files(folder, output_folder='results', show_boundaries=True, processes=None):
+    """Analyze all CSV files in a specified folder, rendering one figure per chain in parallel."""
     files = get_all_files(folder)  # Get all CSV files
 
-    for file in files:
-        df = pd.read_csv(os.path.join(folder, file))
-        plot_kde_with_map(df, file.replace(".csv", ""), output_folder, show_boundaries)
+    jobs = [
+        FigureJob(file.replace(".csv", ""), plot_kde_file,
+                  args=(os.path.join(folder, file), file.replace(".csv", ""), output_folder, show_boundaries),
+                  outputs=[os.path.join(output_folder, file.replace(".csv", "_kde_plot.pdf"))])
+        for file in files
+    ]
+    run_figure_jobs(jobs, processes=processes)
 
 # Example usage
 if __name__ == "__main__":
@@ -3,7 +3,6 @@ import os
 import pandas as pd
 import haversine as hs
 from numpy.linalg import eig
-import matplotlib.pyplot as plt  # Import matplotlib for plotting
 from utils.normalization import Normalization
 
 def compute_all_distances(df):
@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+from utils.bootstrap import (centrality_gini, distance_gini, group_gini, mean_gdi, percentile_interval,
+                             run_bootstrap)
+from utils.spatial import haversine_matrix
+
+
+def get_all_files(folder_path):
+    """
+    This function returns a list of all files in the given folder path.
+
+    :param folder_path: Path to the folder
+    :return: List of files in the folder
+    """
+    return [f for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f)) and f.endswith('.csv')]
+
+
+def add_interval(results, name, metric, n, args, replicates, seed):
+    """
+    Stores the point estimate of a metric followed by its bootstrap percentile interval ('<name>_lo', '<name>_hi').
+    """
+    results[name] = metric(np.arange(n)[None, :], *args)[0]
+    samples = run_bootstrap(metric, n, args, replicates=replicates, seed=seed)
+    results[f'{name}_lo'], results[f'{name}_hi'] = percentile_interval(samples)
+
+
+if __name__ == '__main__':
+    replicates = 1000
+    seed = 0  # Same replicates for every metric of a chain
+    thresholds = [100, 200, 400, 500, 600, 800, 1000, 1500, 2000]
+    weight_columns = ['stake_weight', '0.9linear_weight', '0.8linear_weight', '0.7linear_weight',
+                      '0.6linear_weight', '0.5linear_weight']
+
+    # Country and distance-based Gini and mean GDI, as in results/gini.csv
+    results_list = []
+    for file in get_all_files('data/pre_processed_data/'):
+        df = pd.read_csv('data/pre_processed_data/' + file)
+        print(f'Processing {file}...')
+        n = len(df)
+        stakes = df['stake_weight'].to_numpy(dtype=float)
+        distances = haversine_matrix(df['latitude'], df['longitude'])
+        groups, _ = pd.factorize(df['country'].fillna('Unknown'))
+
+        file_results = {'blockchain': file, 'rows': n}
+        add_interval(file_results, 'gini', group_gini, n, (groups, stakes), replicates, seed)
+        for threshold in thresholds:
+            adjacency = csr_matrix(distances <= threshold)
+            add_interval(file_results, f'gini_{threshold}', distance_gini, n, (adjacency, stakes), replicates, seed)
+
+        order = np.argsort(distances, axis=1, kind='stable')
+        sorted_distances = np.take_along_axis(distances, order, axis=1)
+        add_interval(file_results, 'mean_gdi', mean_gdi, n, (order, sorted_distances, stakes), replicates, seed)
+        results_list.append(file_results)
+
+    results_df = pd.DataFrame(results_list)
+    results_df.to_csv('results/gini_ci.csv', index=False)
+    print('Results saved to gini_ci.csv')
+
+    # Eigenvector centrality Gini, as in results/centrality_measures_wc.csv
+    results_list = []
+    for file in get_all_files('data/wc/'):
+        df = pd.read_csv(f'data/wc/{file}')
+        chain = os.path.splitext(file)[0]
+        print(f'Processing {chain}...')
+        distances = haversine_matrix(df['latitude'], df['longitude'])
+
+        gini_values = {'file': chain}
+        for col in weight_columns:
+            stakes = df[col].to_numpy(dtype=float)
+            add_interval(gini_values, col, centrality_gini, len(df), (distances, stakes), replicates, seed)
+        results_list.append(gini_values)
+
+    results_df = pd.DataFrame(results_list)
+    results_df.to_csv('results/centrality_measures_wc_ci.csv', index=False)
+    print('Results saved to centrality_measures_wc_ci.csv')
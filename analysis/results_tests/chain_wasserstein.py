@@ -0,0 +1,46 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from analysis.results_tests.cross_chain_colocation import load_chains
+from pre_processing.geo_cells import cell_centers, cell_ids
+from utils.spatial import haversine_matrix
+from utils.transport import wasserstein_matrix
+
+
+def binned_distributions(df, level):
+    """
+    Stake distribution of every chain over the equal-area cells occupied by any chain.
+
+    :param df: Combined DataFrame from load_chains.
+    :param level: Geo cell level.
+    :return: Tuple ((K, m) stake per chain and cell, (m, m) great-circle distances in km between cell centres).
+    """
+    cells = cell_ids(df['latitude'], df['longitude'], level)
+    support, inverse = np.unique(cells, return_inverse=True)
+    chains = df['chain_code'].to_numpy()
+    distributions = np.zeros((chains.max() + 1, len(support)))
+    np.add.at(distributions, (chains, inverse.ravel()), df['stake_weight'].to_numpy(dtype=float))
+    latitudes, longitudes = cell_centers(support, level)
+    return distributions, haversine_matrix(latitudes, longitudes)
+
+
+if __name__ == '__main__':
+    input_folder = 'data/pre_processed_data/'
+    cell_level = 6  # ~350 km equal-area cells
+    epsilon_km = 50  # Entropic regularization, small against the cell size
+
+    df = load_chains(input_folder)
+    names = sorted(df['chain'].unique())
+
+    start = time.perf_counter()
+    distributions, cost = binned_distributions(df, cell_level)
+    matrix = wasserstein_matrix(distributions, cost, epsilon_km)
+    print(f'{len(names)} chains over {cost.shape[0]} cells in {time.perf_counter() - start:.2f}s')
+
+    matrix_df = pd.DataFrame(matrix, index=names, columns=names)
+    matrix_df.to_csv('results/wasserstein_km.csv', index_label='chain')
+    print('Earth-mover distance between stake distributions (km):')
+    print(matrix_df.round(0))
+    print('Results saved to wasserstein_km.csv')
@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from pre_processing.geo_cells import cell_centers, cell_ids
+from utils.colocation import colocation_matrix, shared_hotspots
+
+
+def get_all_files(folder_path):
+    """
+    This function returns a list of all files in the given folder path.
+
+    :param folder_path: Path to the folder
+    :return: List of files in the folder
+    """
+    return [f for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f)) and f.endswith('.csv')]
+
+
+def load_chains(folder_path):
+    """
+    Loads every chain once into one DataFrame with a 'chain' name and an integer 'chain_code' column.
+    """
+    frames = []
+    for file in sorted(get_all_files(folder_path)):
+        df = pd.read_csv(os.path.join(folder_path, file), usecols=['latitude', 'longitude', 'stake_weight'])
+        df['chain'] = os.path.splitext(file)[0]
+        frames.append(df)
+    combined = pd.concat(frames, ignore_index=True)
+    combined['chain_code'], _ = pd.factorize(combined['chain'], sort=True)
+    return combined
+
+
+if __name__ == '__main__':
+    input_folder = 'data/pre_processed_data/'
+    radii_km = [20, 100, 500]
+    cell_level = 8  # ~90 km equal-area cells
+    top_hotspots = 20
+
+    df = load_chains(input_folder)
+    names = sorted(df['chain'].unique())
+    chains = df['chain_code'].to_numpy()
+
+    for radius in radii_km:
+        matrix = colocation_matrix(df['latitude'], df['longitude'], df['stake_weight'], chains, radius)
+        matrix_df = pd.DataFrame(matrix, index=names, columns=names)
+        matrix_df.to_csv(f'results/colocation_{radius}km.csv', index_label='chain')
+        print(f'Co-located stake within {radius} km (row chain stake near column chain):')
+        print(matrix_df.round(3))
+
+    cells = cell_ids(df['latitude'], df['longitude'], cell_level)
+    hotspot_cells, shares = shared_hotspots(cells, df['stake_weight'], chains)
+    latitudes, longitudes = cell_centers(hotspot_cells[:top_hotspots], cell_level)
+    hotspots_df = pd.DataFrame(shares[:top_hotspots], columns=names)
+    hotspots_df.insert(0, 'cell', hotspot_cells[:top_hotspots])
+    hotspots_df.insert(1, 'latitude', latitudes)
+    hotspots_df.insert(2, 'longitude', longitudes)
+    hotspots_df.insert(3, 'chains', (shares[:top_hotspots] > 0).sum(axis=1))
+    hotspots_df.insert(4, 'combined_share', shares[:top_hotspots].sum(axis=1))
+    hotspots_df.to_csv('results/colocation_hotspots.csv', index=False)
+    print(hotspots_df.round(3).head(10))
+    print('Results saved to colocation_<radius>km.csv and colocation_hotspots.csv')
@@ -0,0 +1,70 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.density_clusters import NOISE, stake_dbscan
+from utils.outage import OutageScenarios, disk_scenarios, group_scenarios
+from utils.spatial import haversine_matrix
+
+
+def get_all_files(folder_path):
+    """
+    This function returns a list of all files in the given folder path.
+
+    :param folder_path: Path to the folder
+    :return: List of files in the folder
+    """
+    return [f for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f)) and f.endswith('.csv')]
+
+
+def build_scenarios(df, cities_df, radius_km=100):
+    """
+    Removal scenarios of one chain: every country, every density cluster and an R-km disk around every city.
+
+    :return: Tuple (DataFrame with 'scenario_type' and 'scenario', (S, n) boolean removal mask).
+    """
+    names, masks = [], []
+
+    countries, country_masks = group_scenarios(df['country'].fillna('Unknown'))
+    names += [('country', name) for name in countries]
+    masks.append(country_masks)
+
+    clusters, cluster_masks = group_scenarios(stake_dbscan(df['latitude'], df['longitude'], df['stake_weight']))
+    keep = clusters != NOISE
+    names += [('cluster', f'cluster_{label}') for label in clusters[keep]]
+    masks.append(cluster_masks[keep])
+
+    disk_masks = disk_scenarios(df['latitude'], df['longitude'], cities_df['latitude'], cities_df['longitude'],
+                                radius_km)
+    affected = disk_masks.any(axis=1)
+    names += [(f'city_{radius_km}km', name) for name in cities_df['name'][affected]]
+    masks.append(disk_masks[affected])
+
+    return pd.DataFrame(names, columns=['scenario_type', 'scenario']), np.vstack(masks)
+
+
+if __name__ == '__main__':
+    input_folder = 'data/pre_processed_data/'
+    cities_df = pd.read_csv('servers.csv')
+    results_list = []
+
+    for file in get_all_files(input_folder):
+        df = pd.read_csv(os.path.join(input_folder, file))
+        chain = os.path.splitext(file)[0]
+        start = time.perf_counter()
+
+        countries, _ = pd.factorize(df['country'].fillna('Unknown'))
+        engine = OutageScenarios(haversine_matrix(df['latitude'], df['longitude']), df['stake_weight'], countries)
+        scenarios_df, removed = build_scenarios(df, cities_df)
+        metrics = engine.evaluate(removed)
+
+        scenarios_df.insert(0, 'file', chain)
+        results_list.append(scenarios_df.assign(**metrics))
+        print(f'{chain}: {len(scenarios_df)} scenarios in {time.perf_counter() - start:.2f}s, '
+              f'{(~metrics["quorum_feasible"]).sum()} break the 2/3 quorum')
+
+    results_df = pd.concat(results_list, ignore_index=True)
+    results_df.to_csv('results/outage_scenarios.csv', index=False)
+    print('Results saved to outage_scenarios.csv')
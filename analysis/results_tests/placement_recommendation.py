@@ -0,0 +1,46 @@
+import os
+
+import pandas as pd
+
+from utils.placement import OBJECTIVES, PlacementRecommender
+
+
+def get_all_files(folder_path):
+    """
+    This function returns a list of all files in the given folder path.
+
+    :param folder_path: Path to the folder
+    :return: List of files in the folder
+    """
+    return [f for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f)) and f.endswith('.csv')]
+
+
+if __name__ == '__main__':
+    input_folder = 'data/pre_processed_data/'
+    candidates_df = pd.read_csv('servers.csv')  # Candidate sites
+    top_k = 10
+    results_list = []
+
+    for file in get_all_files(input_folder):
+        df = pd.read_csv(os.path.join(input_folder, file))
+        chain = os.path.splitext(file)[0]
+        print(f'Processing {chain}...')
+
+        recommender = PlacementRecommender(df['latitude'], df['longitude'], df['stake_weight'],
+                                           df['country'].fillna('Unknown'))
+        stake = df['stake_weight'].median()  # A typical new validator
+
+        for objective in OBJECTIVES:
+            top, scores = recommender.recommend(candidates_df['latitude'], candidates_df['longitude'],
+                                                candidates_df['country'], stake, top_k=top_k, by=objective)
+            top_df = candidates_df.loc[top, ['id', 'name', 'country', 'latitude', 'longitude']]
+            top_df = top_df.assign(**{key: values[top] for key, values in scores.items()})
+            top_df.insert(0, 'rank', range(1, len(top) + 1))
+            top_df.insert(0, 'objective', objective)
+            top_df.insert(0, 'file', chain)
+            results_list.append(top_df)
+        print(f"Best site by GDI: {results_list[-len(OBJECTIVES)]['name'].iloc[0]}")
+
+    results_df = pd.concat(results_list, ignore_index=True)
+    results_df.to_csv('results/placement_recommendations.csv', index=False)
+    print('Results saved to placement_recommendations.csv')
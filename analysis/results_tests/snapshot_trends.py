@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+
+import pandas as pd
+
+from utils.snapshot_store import SnapshotStore
+
+
+def get_all_files(folder_path):
+    """
+    This function returns a list of all files in the given folder path.
+
+    :param folder_path: Path to the folder
+    :return: List of files in the folder
+    """
+    return [f for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f)) and f.endswith('.csv')]
+
+
+def ingest_chain(store, chain_folder):
+    """
+    Adds every crawl in the chain folder that is newer than the latest stored snapshot.
+
+    :param store: SnapshotStore of the chain
+    :param chain_folder: Folder with one '<date>.csv' crawl per day
+    :return: Number of snapshots added
+    """
+    dates = store.dates()
+    added = 0
+    for file in sorted(get_all_files(chain_folder)):
+        date = os.path.splitext(file)[0]
+        if dates and date <= dates[-1]:
+            continue
+        df = pd.read_csv(os.path.join(chain_folder, file), encoding='ISO-8859-1')
+        summary = store.add_snapshot(date, df)
+        print(f"  {date}: +{summary['added']} -{summary['removed']} ~{summary['updated']}, "
+              f"gini {summary['stake_gini']:.4f}, mean GDI {summary['mean_gdi']:.1f}")
+        added += 1
+    return added
+
+
+if __name__ == '__main__':
+    input_folder = 'data/snapshots/'  # One folder per chain with one '<date>.csv' crawl per day
+    store_folder = 'data/history/'
+    start_date, end_date = None, None  # Optional ISO date range of the trend output
+    results_list = []
+
+    if not os.path.isdir(input_folder):
+        sys.exit(f"No snapshot folder {input_folder}: add one folder per chain with one '<date>.csv' crawl per day.")
+
+    for chain in sorted(os.listdir(input_folder)):
+        chain_folder = os.path.join(input_folder, chain)
+        if not os.path.isdir(chain_folder):
+            continue
+        print(f'Processing {chain}...')
+        start_time = time.time()
+        store = SnapshotStore(store_folder, chain)
+        added = ingest_chain(store, chain_folder)
+        print(f'Added {added} snapshots in {time.time() - start_time:.2f}s')
+
+        results_list.append(store.metrics(start_date, end_date).assign(chain=chain))
+
+    if not results_list:
+        sys.exit(f"No chain folders in {input_folder}.")
+    results_df = pd.concat(results_list, ignore_index=True)
+    results_df = results_df[['chain'] + [column for column in results_df.columns if column != 'chain']]
+    os.makedirs('results', exist_ok=True)
+    results_df.to_csv('results/snapshot_trends.csv', index=False)
+    print('Results saved to snapshot_trends.csv')
@@ -0,0 +1,98 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.relocation import relocate_for_gini, relocate_for_nakamoto, relocation_moves
+
+
+def get_all_files(folder_path):
+    """
+    This function returns a list of all files in the given folder path.
+
+    :param folder_path: Path to the folder
+    :return: List of files in the folder
+    """
+    return [f for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f)) and f.endswith('.csv')]
+
+
+def get_location_stakes(df, location_column='country', weight_column='stake_weight'):
+    """
+    Sums the stake of every location.
+
+    :param df: DataFrame with one row per validator
+    :param location_column: Column naming the location of every validator
+    :param weight_column: Stake column
+    :return: Series of stake per location
+    """
+    return df.groupby(df[location_column].fillna('Unknown'))[weight_column].sum()
+
+
+def calculate_relocations(location_stakes, gini_target, nakamoto_target):
+    """
+    Minimal relocations reaching the Gini target and the 1/3 Nakamoto target.
+
+    :param location_stakes: Series of stake per location
+    :param gini_target: Gini coefficient to reach
+    :param nakamoto_target: Nakamoto coefficient to reach
+    :return: Tuple (list of result rows, list of move rows)
+    """
+    stakes = location_stakes.to_numpy(dtype=float)
+    total = stakes.sum()
+    targets = [
+        ('gini', gini_target, lambda: relocate_for_gini(stakes, gini_target)),
+        ('nakamoto', nakamoto_target, lambda: relocate_for_nakamoto(stakes, nakamoto_target)),
+    ]
+
+    results, moves = [], []
+    for objective, target, relocate in targets:
+        try:
+            relocation = relocate()
+        except ValueError as error:
+            print(f'  {objective} target {target}: {error}')
+            results.append({'objective': objective, 'target': target, 'moved': np.nan, 'moved_share': np.nan})
+            continue
+        results.append({
+            'objective': objective,
+            'target': target,
+            'before': relocation[f'{objective}_before'],
+            'after': relocation[f'{objective}_after'],
+            'moved': relocation['moved'],
+            'moved_share': relocation['moved'] / total,
+            'moves': 0,
+        })
+        for source, destination, amount in relocation_moves(location_stakes.index, stakes, relocation['stakes']):
+            moves.append({'objective': objective, 'from': source, 'to': destination, 'amount': amount})
+            results[-1]['moves'] += 1
+    return results, moves
+
+
+if __name__ == '__main__':
+    input_folder = 'data/pre_processed_data/'
+    gini_target = 0.5
+    results_list = []
+    moves_list = []
+
+    for file in get_all_files(input_folder):
+        df = pd.read_csv(os.path.join(input_folder, file))
+        chain = os.path.splitext(file)[0]
+        print(f'Processing {chain}...')
+
+        location_stakes = get_location_stakes(df)
+        # One more country than today needed to halt the chain
+        nakamoto_target = (location_stakes.sort_values(ascending=False).cumsum()
+                           <= location_stakes.sum() / 3).sum() + 2
+        results, moves = calculate_relocations(location_stakes, gini_target, nakamoto_target)
+        for row in results + moves:
+            row['file'] = chain
+        results_list.extend(results)
+        moves_list.extend(moves)
+
+    os.makedirs('results', exist_ok=True)
+    results_df = pd.DataFrame(results_list)
+    results_df = results_df[['file'] + [column for column in results_df.columns if column != 'file']]
+    results_df.to_csv('results/stake_relocation.csv', index=False)
+    moves_df = pd.DataFrame(moves_list)
+    moves_df = moves_df[['file'] + [column for column in moves_df.columns if column != 'file']]
+    moves_df.to_csv('results/stake_relocation_moves.csv', index=False)
+    print('Results saved to stake_relocation.csv and stake_relocation_moves.csv')
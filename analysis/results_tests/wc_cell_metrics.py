@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from pre_processing.geo_cells import cell_column, cell_ids, parent_cells
+from utils.gini import gini_coefficient
+from utils.nakamoto import THRESHOLDS, group_stakes, nakamoto_from_group_stakes
+
+
+def get_all_files(folder_path):
+    """
+    This function returns a list of all files in the given folder path.
+
+    :param folder_path: Path to the folder
+    :return: List of files in the folder
+    """
+    return [f for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f)) and f.endswith('.csv')]
+
+
+def get_cells(df, levels):
+    """
+    Cell ids of every validator at each level. Uses the finest stored 'cell_<level>' column that is at least
+    as fine as the requested levels, and computes the ids from the coordinates otherwise.
+
+    :return: Dictionary of level to int64 cell id array.
+    """
+    finest = max(levels)
+    stored = [int(col.split('_')[1]) for col in df.columns if col.startswith('cell_')]
+    base_level = min((level for level in stored if level >= finest), default=None)
+    if base_level is None:
+        base_level = finest
+        base = cell_ids(df['latitude'], df['longitude'], finest)
+    else:
+        base = df[cell_column(base_level)].to_numpy(dtype=np.int64)
+    return {level: parent_cells(base, base_level, level) for level in levels}
+
+
+def calculate_cell_metrics(df, weight_columns, levels=(2, 4, 6, 8, 10), top_k=5):
+    """
+    Region Gini, top-k region share and Nakamoto coefficients over equal-area cells at several levels.
+
+    :return: List of result rows, one per level and weight column.
+    """
+    weights = df[weight_columns].to_numpy(dtype=float)
+    rows = []
+    for level, cells in get_cells(df, levels).items():
+        _, sums = group_stakes(cells, weights)
+        ginis = gini_coefficient(sums, axis=0)
+        top_shares = np.sort(sums, axis=0)[::-1][:top_k].sum(axis=0) / sums.sum(axis=0)
+        nakamoto = nakamoto_from_group_stakes(sums, THRESHOLDS)
+        for i, col in enumerate(weight_columns):
+            rows.append({
+                'level': level,
+                'cells': len(sums),
+                'weight': col,
+                'gini': ginis[i],
+                f'top{top_k}_share': top_shares[i],
+                'nakamoto_33': nakamoto[0, i],
+                'nakamoto_67': nakamoto[1, i],
+            })
+    return rows
+
+
+if __name__ == '__main__':
+    input_folder = 'data/wc/'
+    results_list = []
+
+    for file in get_all_files(input_folder):
+        df = pd.read_csv(os.path.join(input_folder, file))
+        chain = os.path.splitext(file)[0]
+        print(f'Processing {chain}...')
+
+        weight_columns = [col for col in df.columns if col.endswith('weight')]
+        results_list.extend({'file': chain, **row} for row in calculate_cell_metrics(df, weight_columns))
+
+    results_df = pd.DataFrame(results_list)
+    results_df.to_csv('results/cell_metrics_wc.csv', index=False)
+    print('Results saved to cell_metrics_wc.csv')
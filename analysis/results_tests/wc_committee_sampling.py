@@ -0,0 +1,47 @@
+import os
+import time
+
+import pandas as pd
+
+from utils.committee import AliasTable, simulate_committees
+from utils.spatial import haversine_matrix
+
+
+def get_all_files(folder_path):
+    """
+    This function returns a list of all files in the given folder path.
+
+    :param folder_path: Path to the folder
+    :return: List of files in the folder
+    """
+    return [f for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f)) and f.endswith('.csv')]
+
+
+if __name__ == '__main__':
+    input_folder = 'data/wc/'
+    committee_sizes = [16, 64]
+    committees = 100000
+
+    results_list = []
+    for file in get_all_files(input_folder):
+        df = pd.read_csv(os.path.join(input_folder, file))
+        chain = os.path.splitext(file)[0]
+        print(f'Processing {chain}...')
+
+        distances = haversine_matrix(df['latitude'], df['longitude'])
+        countries, _ = pd.factorize(df['country'].fillna('Unknown'))
+        weight_columns = [col for col in df.columns if col.endswith('weight')]
+
+        for col in weight_columns:
+            table = AliasTable(df[col])
+            for size in committee_sizes:
+                start = time.perf_counter()
+                summaries = simulate_committees(table, distances, countries, size, committees=committees, seed=0)
+                print(f'{col}, k={size}: {committees} committees in {time.perf_counter() - start:.2f}s')
+                for metric, summary in summaries.items():
+                    results_list.append({'file': chain, 'weight': col, 'committee_size': size, 'metric': metric,
+                                         **summary.summary()})
+
+    results_df = pd.DataFrame(results_list)
+    results_df.to_csv('results/committee_sampling_wc.csv', index=False)
+    print('Results saved to committee_sampling_wc.csv')
@@ -0,0 +1,48 @@
+import os
+
+import pandas as pd
+
+from utils.density_clusters import cluster_summary, stake_dbscan
+
+
+def get_all_files(folder_path):
+    """
+    This function returns a list of all files in the given folder path.
+
+    :param folder_path: Path to the folder
+    :return: List of files in the folder
+    """
+    return [f for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f)) and f.endswith('.csv')]
+
+
+if __name__ == '__main__':
+    input_folder = 'data/pre_processed_data/'
+    output_folder = 'results/density_clusters/'
+    eps_km = 100  # Well above the 20 km merge of the preprocessing
+    min_stake = 0.01  # Core points see at least 1% of the stake within eps_km
+
+    os.makedirs(output_folder, exist_ok=True)
+    results_list = []
+
+    for file in get_all_files(input_folder):
+        df = pd.read_csv(os.path.join(input_folder, file))
+        chain = os.path.splitext(file)[0]
+        print(f'Processing {chain}...')
+
+        df['cluster'] = stake_dbscan(df['latitude'], df['longitude'], df['stake_weight'], eps_km, min_stake)
+        df.to_csv(os.path.join(output_folder, file), index=False)
+
+        summary = cluster_summary(df['cluster'], df['stake_weight'])
+        shares = summary['stake_share']
+        print(f'{len(shares)} clusters, largest holds {shares.max() if len(shares) else 0:.3f} of stake')
+        results_list.append({
+            'file': chain,
+            'clusters': len(shares),
+            'largest_share': shares.max() if len(shares) else 0,
+            'noise_share': summary['noise_share'],
+            'gini': summary['gini'],
+        })
+
+    results_df = pd.DataFrame(results_list)
+    results_df.to_csv('results/density_clusters_gini.csv', index=False)
+    print('Results saved to density_clusters_gini.csv')
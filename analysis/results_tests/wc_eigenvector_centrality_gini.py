@@ -3,6 +3,7 @@ import os
 import pandas as pd
 import haversine as hs  # Ensure you have the haversine library installed
 from numpy.linalg import eig
+from pre_processing.instrumentation import Instrumentation
 from utils.normalization import Normalization
 
 def compute_all_distances(df):
@@ -45,13 +46,28 @@ def create_weighted_adjacency_matrix(distance_matrix, df, col='stake_weight'):
     
     return weighted_adjacency_matrix
 
-def compute_eigenvector_centrality(weighted_adjacency_matrix):
-    """Compute the eigenvector centrality from the weighted adjacency matrix."""
+def compute_eigenvector_centrality(weighted_adjacency_matrix, max_iterations=1000, tolerance=1e-12):
+    """
+    Compute the eigenvector centrality from the weighted adjacency matrix by power iteration,
+    falling back to a dense eigendecomposition if it does not converge.
+
+    :return: Tuple (centrality scores summing to 1, power iterations, whether the fallback was used).
+    """
+    n = len(weighted_adjacency_matrix)
+    centrality_scores = np.full(n, 1 / n)
+    for iteration in range(1, max_iterations + 1):
+        updated = weighted_adjacency_matrix @ centrality_scores
+        updated /= updated.sum()
+        converged = np.max(np.abs(updated - centrality_scores)) < tolerance
+        centrality_scores = updated
+        if converged:
+            return centrality_scores, iteration, False
+
     eigenvalues, eigenvectors = eig(weighted_adjacency_matrix)
     max_index = np.argmax(eigenvalues)
     principal_eigenvector = np.real(eigenvectors[:, max_index])
     centrality_scores = principal_eigenvector / np.sum(principal_eigenvector)
-    return centrality_scores
+    return centrality_scores, max_iterations, True
 
 def gini_coefficient(values):
     """Calculate the Gini coefficient of a numpy array."""
@@ -79,6 +95,7 @@ files = ['aptos.csv' ] #get_all_files('data/wc/')
 
 results_list = []  # List to hold Gini coefficients
 centrality_measures = []  # List to hold centrality scores
+instrumentation = Instrumentation()  # Per-stage time, memory and solver counters
 
 for file in files:
     df = pd.read_csv(f'data/wc/{file}')
@@ -89,14 +106,20 @@ for file in files:
     gini_values = {'file': chain}  # Start with the filename
     
     # Compute distance matrix
-    distance_matrix = compute_all_distances(df)
+    with instrumentation.stage('distances', chain):
+        distance_matrix = compute_all_distances(df)
+        instrumentation.count('distances_computed', len(df) ** 2)
     
     for col in weight_columns:
         # Generate the weighted adjacency matrix
-        weighted_adjacency_matrix = create_weighted_adjacency_matrix(distance_matrix, df, col=col)
+        with instrumentation.stage(f'adjacency/{col}', chain):
+            weighted_adjacency_matrix = create_weighted_adjacency_matrix(distance_matrix, df, col=col)
         
         # Compute eigenvector centrality
-        centrality_scores = compute_eigenvector_centrality(weighted_adjacency_matrix)
+        with instrumentation.stage(f'eigenvector_centrality/{col}', chain):
+            centrality_scores, iterations, fallback = compute_eigenvector_centrality(weighted_adjacency_matrix)
+            instrumentation.count('eigen_solver_iterations', iterations)
+            instrumentation.count('eigen_solver_fallbacks', int(fallback))
         
         # Calculate Gini coefficient
         gini = gini_coefficient(centrality_scores)
@@ -128,3 +151,8 @@ centrality_measures_df = pd.DataFrame(centrality_measures)
 # Save centrality measures to a CSV file
 centrality_measures_df.to_csv('results/centrality_measures.csv', index=False)
 print('Centrality measures saved to centrality_measures.csv')
+
+# Save the per-stage measurements
+instrumentation.write_jsonl('results/centrality_metrics.jsonl')
+instrumentation.write_prometheus('results/centrality_metrics.prom')
+print('Metrics saved to centrality_metrics.jsonl and centrality_metrics.prom')
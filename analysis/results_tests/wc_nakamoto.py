@@ -0,0 +1,87 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from geodec_scripts.agglomerative_merge import AgglomerativeMerger
+from utils.nakamoto import THRESHOLDS, group_stakes, nakamoto_from_group_stakes, radius_groups
+
+
+def get_all_files(folder_path):
+    """
+    This function returns a list of all files in the given folder path.
+
+    :param folder_path: Path to the folder
+    :return: List of files in the folder
+    """
+    return [f for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f)) and f.endswith('.csv')]
+
+
+def get_weight_columns(df):
+    """Returns the stake weighting columns present in a data/wc file."""
+    return [col for col in df.columns if col.endswith('weight')]
+
+
+def get_granularity_groups(df, cluster_count=64, radii_km=(100, 500, 1000)):
+    """
+    Group label of every validator for each granularity.
+
+    :param df: DataFrame with 'latitude', 'longitude', 'stake_weight' and 'country'.
+    :param cluster_count: Number of merge clusters (agglomerative merge on stake_weight).
+    :param radii_km: Neighbourhood radii in km.
+    :return: Dictionary of granularity name to label array.
+    """
+    groups = {'country': df['country'].fillna('unknown').to_numpy()}
+
+    merger = AgglomerativeMerger(df['latitude'], df['longitude'], df['stake_weight'])
+    groups[f'cluster{cluster_count}'] = merger.merge(cluster_count).get_labels()
+
+    for radius in radii_km:
+        groups[f'radius{radius}km'] = radius_groups(df['latitude'], df['longitude'], radius)
+    return groups
+
+
+def calculate_nakamoto(df, weight_columns, groups):
+    """
+    Geographic Nakamoto coefficients of one chain for every granularity and weight column.
+
+    :return: List of result rows, one per granularity and threshold.
+    """
+    weights = df[weight_columns].to_numpy(dtype=float)
+    rows = []
+    for granularity, labels in groups.items():
+        _, sums = group_stakes(labels, weights)
+        coefficients = nakamoto_from_group_stakes(sums, THRESHOLDS)
+        for threshold, values in zip(THRESHOLDS, coefficients):
+            row = {'granularity': granularity, 'threshold': round(threshold, 4), 'groups': len(sums)}
+            row.update(dict(zip(weight_columns, values)))
+            rows.append(row)
+    return rows
+
+
+if __name__ == '__main__':
+    input_folder = 'data/wc/'
+    results_list = []
+    grouping_time = 0.0
+    compute_time = 0.0
+
+    for file in get_all_files(input_folder):
+        df = pd.read_csv(os.path.join(input_folder, file))
+        chain = os.path.splitext(file)[0]
+        print(f'Processing {chain}...')
+
+        start = time.perf_counter()
+        groups = get_granularity_groups(df)
+        grouping_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        rows = calculate_nakamoto(df, get_weight_columns(df), groups)
+        compute_time += time.perf_counter() - start
+
+        results_list.extend({'file': chain, **row} for row in rows)
+
+    results_df = pd.DataFrame(results_list)
+    results_df.to_csv('results/nakamoto_wc.csv', index=False)
+    print(f'Grouping took {grouping_time:.3f}s, Nakamoto coefficients took {compute_time:.3f}s')
+    print('Results saved to nakamoto_wc.csv')
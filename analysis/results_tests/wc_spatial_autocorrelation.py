@@ -0,0 +1,48 @@
+import os
+
+import pandas as pd
+
+from utils.autocorrelation import global_autocorrelation, knn_weights, local_autocorrelation, row_standardize
+
+
+def get_all_files(folder_path):
+    """
+    This function returns a list of all files in the given folder path.
+
+    :param folder_path: Path to the folder
+    :return: List of files in the folder
+    """
+    return [f for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f)) and f.endswith('.csv')]
+
+
+if __name__ == '__main__':
+    input_folder = 'data/wc/'
+    local_folder = 'results/local_autocorrelation/'
+    neighbours = 8
+    permutations = 999
+
+    os.makedirs(local_folder, exist_ok=True)
+    results_list = []
+
+    for file in get_all_files(input_folder):
+        df = pd.read_csv(os.path.join(input_folder, file))
+        chain = os.path.splitext(file)[0]
+        print(f'Processing {chain}...')
+
+        weights = row_standardize(knn_weights(df['latitude'], df['longitude'], k=neighbours))
+        weight_columns = [col for col in df.columns if col.endswith('weight')]
+
+        # Global statistics for all weight columns in one batched permutation run
+        stats = global_autocorrelation(df[weight_columns], weights, permutations=permutations, seed=0)
+        for i, col in enumerate(weight_columns):
+            results_list.append({'file': chain, 'weight': col, **{key: values[i] for key, values in stats.items()}})
+        print(f"Moran's I for stake_weight: {stats['morans_i'][weight_columns.index('stake_weight')]:.4f}")
+
+        # Local statistics (LISA) of the stake
+        local_stats = local_autocorrelation(df['stake_weight'], weights, permutations=permutations, seed=0)
+        local_df = df[['uuid', 'latitude', 'longitude', 'stake_weight']].assign(**local_stats)
+        local_df.to_csv(os.path.join(local_folder, file), index=False)
+
+    results_df = pd.DataFrame(results_list)
+    results_df.to_csv('results/autocorrelation_wc.csv', index=False)
+    print('Results saved to autocorrelation_wc.csv')
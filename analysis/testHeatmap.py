@@ -1,7 +1,7 @@
 import os
 import pandas as pd
-import geopandas as gpd
 import matplotlib.pyplot as plt
+from utils.world_geometry import get_world, plot_boundaries
 
 # WORKS BUT WE DO NOT NEED IT FOR PAPER
 # Load the Ethereum data
@@ -15,15 +15,12 @@ country_stakes = df.groupby('country')['stake_weight'].sum().reset_index()
 total_stake = country_stakes['stake_weight'].sum()
 country_stakes['stake_percentage'] = (country_stakes['stake_weight'] / total_stake) * 100
 
-# Load the world map data from the shapefile
-world = gpd.read_file('ne_110m_admin_0_countries/ne_110m_admin_0_countries.shp')  # Update with the actual path to the shapefile
-
-# Merge with country stakes data
-world = world.merge(country_stakes, how='left', left_on='ADMIN', right_on='country')
+# Load the world map data (cached per process) and merge with country stakes data
+world = get_world().merge(country_stakes, how='left', left_on='ADMIN', right_on='country')
 
 # Plotting
 fig, ax = plt.subplots(1, 1, figsize=(15, 10))
-world.boundary.plot(ax=ax, color='black')
+plot_boundaries(ax, color='black')
 
 # Plot the countries with stake weight
 world.plot(column='stake_percentage', ax=ax, legend=True,
@@ -0,0 +1,49 @@
+# Reference implementations from analysis scripts that run their analysis on import, reproduced here
+# so the benchmarks can check the fast paths against them
+import numpy as np
+from numpy.linalg import eig
+
+from utils.normalization import Normalization
+
+
+def normalize(values):
+    """Normalize the values to the range [0, 1] (analysis/gini_index.py)."""
+    min_val = np.min(values)
+    max_val = np.max(values)
+    return (values - min_val) / (max_val - min_val) if max_val > min_val else values
+
+
+def gini_coefficient(values, normalize_values=True):
+    """Pairwise Gini coefficient (analysis/gini_index.py; without normalization as in the centrality scripts)."""
+    if len(values) == 0:
+        return 0
+    if normalize_values:
+        values = normalize(values)
+    mean = np.mean(values)
+    sum_diff = np.sum(np.abs(np.subtract.outer(values, values)))
+    return (sum_diff / (2 * len(values) ** 2 * mean)) if mean != 0 else 0
+
+
+def create_weighted_adjacency_matrix(distance_matrix, df, col="stake_weight"):
+    """Weighted adjacency matrix (analysis/results_tests/wc_eigenvector_centrality_gini.py)."""
+    df = Normalization.normalize_column(df, col)
+    max_distance = np.max(distance_matrix)
+    n = len(df)
+    weighted_adjacency_matrix = np.zeros((n, n))
+    for i in range(n):
+        for j in range(n):
+            if i != j:
+                stake_weight_i = df.iloc[i][col]
+                stake_weight_j = df.iloc[j][col]
+                distance = distance_matrix[i, j]
+                d = 1 - (distance / max_distance)
+                weighted_adjacency_matrix[i, j] = stake_weight_i * stake_weight_j * d
+    return weighted_adjacency_matrix
+
+
+def compute_eigenvector_centrality(weighted_adjacency_matrix):
+    """Eigenvector centrality (analysis/results_tests/wc_eigenvector_centrality_gini.py)."""
+    eigenvalues, eigenvectors = eig(weighted_adjacency_matrix)
+    max_index = np.argmax(eigenvalues)
+    principal_eigenvector = np.real(eigenvectors[:, max_index])
+    return principal_eigenvector / np.sum(principal_eigenvector)
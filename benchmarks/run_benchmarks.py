@@ -0,0 +1,201 @@
+import os
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import reference
+from benchmarks.synthetic import generate_validators
+from geodec_scripts.geodec_merge_data import ValidatorMerger
+from geodec_scripts.server_index import ServerIndex
+from pre_processing.data_cleaner import DataCleaner
+from pre_processing.gdi_calculator import GDI_Calculator
+from pre_processing.validator_set import ValidatorSet
+from utils.bootstrap import centrality_gini, mean_gdi
+from utils.gini import gini_coefficient
+from utils.spatial import haversine_matrix
+
+
+def _quiet(message):
+    pass
+
+
+def measure(records, size, stage, function, *args, trace_memory=False):
+    """
+    Runs one stage and records either its wall time or its tracemalloc peak (Python and NumPy allocations).
+    Tracing slows down allocation-heavy code, so time and memory come from separate runs.
+
+    :param records: List the measurement is appended to.
+    :param size: Number of generated validators.
+    :param stage: Stage name.
+    :param trace_memory: Record the memory peak instead of the time.
+    :return: Result of function(*args).
+    """
+    if trace_memory:
+        tracemalloc.start()
+        result = function(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        records.append({"size": size, "stage": stage, "peak_mb": peak / 2 ** 20})
+        print(f"  {stage:<30} {peak / 2 ** 20:10.1f} MB")
+    else:
+        start_time = time.perf_counter()
+        result = function(*args)
+        records.append({"size": size, "stage": stage, "seconds": time.perf_counter() - start_time})
+        print(f"  {stage:<30} {records[-1]['seconds']:10.3f} s")
+    return result
+
+
+def clean(df):
+    cleaner = DataCleaner(df.copy(), logger=_quiet)
+    cleaner.clean_data(threshold_percentage=33.0)
+    return cleaner.get_cleaned_data().reset_index(drop=True)
+
+
+def clean_set(validators):
+    cleaner = DataCleaner(validators, logger=_quiet)
+    cleaner.clean_data(threshold_percentage=33.0)
+    return cleaner.get_cleaned_data()
+
+
+def set_mean_gdi(validators):
+    return GDI_Calculator(validators, logger=_quiet).calculate_GDI()["GDI"].mean()
+
+
+def map_to_servers(df, servers_df, server_index):
+    merger = ValidatorMerger(df, servers_df, logger=_quiet, server_index=server_index)
+    merger.map_validators_to_servers()
+    merger.aggregate_stake_weights()
+    return merger
+
+
+def sorted_neighbours(distances):
+    order = np.argsort(distances, axis=1, kind="stable")
+    return order, np.take_along_axis(distances, order, axis=1)
+
+
+def fast_mean_gdi(df, order, sorted_distances):
+    return mean_gdi(np.arange(len(df))[None, :], order, sorted_distances, df["stake_weight"].to_numpy(dtype=float))[0]
+
+
+def fast_centrality_gini(df, distances):
+    stakes = df["stake_weight"].to_numpy(dtype=float)
+    return centrality_gini(np.arange(len(df))[None, :], distances, stakes)[0]
+
+
+def reference_mean_gdi(df):
+    return GDI_Calculator(df.copy(), logger=_quiet).calculate_GDI()["GDI"].mean()
+
+
+def reference_centrality_gini(df):
+    distances = haversine_matrix(df["latitude"], df["longitude"])
+    adjacency = reference.create_weighted_adjacency_matrix(distances, df[["stake_weight"]].astype(float).copy())
+    return reference.gini_coefficient(reference.compute_eigenvector_centrality(adjacency), normalize_values=False)
+
+
+def run_size(size, seed, servers_df, server_index, quadratic_max_size, trace_memory=False):
+    """
+    Measures the fast stages on a generated set; stages that hold an (n, n) matrix only up to quadratic_max_size.
+
+    :param trace_memory: Measure memory peaks instead of times (see measure).
+    :return: List of measurement rows.
+    """
+    records = []
+
+    def stage(name, function, *args):
+        return measure(records, size, name, function, *args, trace_memory=trace_memory)
+
+    df = stage("generate", generate_validators, size, seed, servers_df)
+    cleaned_df = stage("DataCleaner.clean_data", clean, df)
+    validators = stage("ValidatorSet.from_dataframe", ValidatorSet.from_dataframe, df)
+    cleaned_set = stage("DataCleaner.clean_data (set)", clean_set, validators)
+    stage("gini_coefficient", gini_coefficient, cleaned_df["stake_weight"].to_numpy(dtype=float))
+
+    merger = stage("ValidatorMerger.map", map_to_servers, cleaned_df, servers_df, server_index)
+    stage("ValidatorMerger.agglomerative", merger.merge_validators_agglomerative, 64)
+
+    if size <= quadratic_max_size:
+        distances = stage("haversine_matrix", haversine_matrix, cleaned_df["latitude"], cleaned_df["longitude"])
+        order, sorted_distances = stage("sorted_neighbours", sorted_neighbours, distances)
+        stage("mean_gdi", fast_mean_gdi, cleaned_df, order, sorted_distances)
+        stage("centrality_gini", fast_centrality_gini, cleaned_df, distances)
+        stage("GDI_Calculator (set)", set_mean_gdi, cleaned_set)
+    for record in records:
+        uncleaned = record["stage"] in ("generate", "ValidatorSet.from_dataframe")
+        record["rows"] = size if uncleaned else len(cleaned_df)
+    return records
+
+
+def run_checks(size, seed, servers_df, server_index):
+    """
+    Times the reference implementations on a small generated set and compares the fast paths with them.
+
+    :return: Tuple (measurement rows, check rows).
+    """
+    records = []
+    df = generate_validators(size, seed, servers_df)
+    cleaned_df = clean(df)
+    cleaned_set = clean_set(ValidatorSet.from_dataframe(df))
+    stakes = cleaned_df["stake_weight"].to_numpy(dtype=float)
+    distances = haversine_matrix(cleaned_df["latitude"], cleaned_df["longitude"])
+    order, sorted_distances = sorted_neighbours(distances)
+
+    calculator = measure(records, size, "reference GDI_Calculator.init", GDI_Calculator, cleaned_df.copy(), _quiet)
+    gdi = measure(records, size, "reference calculate_GDI", reference_mean_gdi, cleaned_df)
+    gini = measure(records, size, "reference gini", reference.gini_coefficient, stakes)
+    centrality = measure(records, size, "reference centrality_gini", reference_centrality_gini, cleaned_df)
+    merger = map_to_servers(cleaned_df, servers_df, server_index)
+    measure(records, size, "reference threshold merge", merger.merge_validators_incrementally, 64)
+    for record in records:
+        record["rows"] = len(cleaned_df)
+
+    checks = [
+        ("haversine_matrix", calculator.dist_matrix.to_numpy(dtype=float), distances),
+        ("mean_gdi", gdi, fast_mean_gdi(cleaned_df, order, sorted_distances)),
+        ("gini_coefficient", gini, gini_coefficient(stakes)),
+        ("centrality_gini", centrality, fast_centrality_gini(cleaned_df, distances)),
+        ("DataCleaner (set)", cleaned_df["stake_weight"].to_numpy(), cleaned_set["stake_weight"]),
+        ("GDI_Calculator (set)", gdi, set_mean_gdi(cleaned_set)),
+    ]
+    check_rows = []
+    for name, expected, actual in checks:
+        difference = float(np.max(np.abs(np.asarray(expected) - np.asarray(actual))))
+        scale = float(np.max(np.abs(expected))) or 1.0
+        check_rows.append({"size": size, "check": name, "max_abs_difference": difference,
+                           "passed": difference <= 1e-6 * scale})
+        print(f"  check {name:<22} max abs difference {difference:.3g} {'ok' if check_rows[-1]['passed'] else 'FAILED'}")
+    return records, check_rows
+
+
+if __name__ == "__main__":
+    sizes = [1000, 5000, 10000, 100000, 1000000]
+    seed = 0
+    quadratic_max_size = 5000  # Largest size for stages with an (n, n) distance matrix
+    check_size = 300  # Size of the comparison against the reference implementations
+    output_folder = "results/benchmarks/"
+
+    servers_df = pd.read_csv("servers.csv")
+    server_index = ServerIndex(servers_df)
+    records_list = []
+
+    print(f"Reference checks on {check_size} validators...")
+    records, check_rows = run_checks(check_size, seed, servers_df, server_index)
+    records_list.extend(records)
+
+    memory_list = []
+    for size in sizes:
+        print(f"Benchmarking {size} validators...")
+        records_list.extend(run_size(size, seed, servers_df, server_index, quadratic_max_size))
+        memory_list.extend(run_size(size, seed, servers_df, server_index, quadratic_max_size, trace_memory=True))
+
+    os.makedirs(output_folder, exist_ok=True)
+    results_df = pd.DataFrame(records_list).merge(
+        pd.DataFrame(memory_list)[["size", "stage", "peak_mb"]], on=["size", "stage"], how="left"
+    )
+    results_df = results_df[["size", "rows", "stage", "seconds", "peak_mb"]]
+    results_df.to_csv(os.path.join(output_folder, "timings.csv"), index=False)
+    pd.DataFrame(check_rows).to_csv(os.path.join(output_folder, "checks.csv"), index=False)
+    print(f"Results saved to {output_folder}")
+    if not all(row["passed"] for row in check_rows):
+        raise SystemExit("Fast paths disagree with the reference implementations.")
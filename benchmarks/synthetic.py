@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+# km per degree of latitude
+KM_PER_DEGREE = 111.195
+
+
+def generate_validators(
+    n,
+    seed=0,
+    cities_df=None,
+    city_exponent=1.1,
+    spread_km=30,
+    stake_alpha=1.2,
+    duplicate_fraction=0.3,
+    zero_fraction=0.02,
+    decimals=4,
+):
+    """
+    Seeded synthetic validator set shaped like the crawled data in data/.
+
+    Validators are placed around datacenter cities (the rows of servers.csv by default), with city popularity
+    following a Zipf law and a Gaussian spread around each city. Stakes are Pareto distributed. A fraction of
+    validators reuses the exact coordinates of another validator, and a fraction has no location (0, 0),
+    which exercises the duplicate merge and the zero-coordinate rule of DataCleaner.
+
+    :param n: Number of validators.
+    :param seed: Seed of the generator; the same seed and parameters give the same set.
+    :param cities_df: DataFrame with 'latitude' and 'longitude' of the cities, defaults to servers.csv.
+    :param city_exponent: Zipf exponent of the city popularity.
+    :param spread_km: Standard deviation of the distance from the city centre.
+    :param stake_alpha: Pareto shape of the stake distribution (smaller is more concentrated).
+    :param duplicate_fraction: Fraction of validators sharing the coordinates of another validator.
+    :param zero_fraction: Fraction of validators at (0, 0).
+    :param decimals: Decimals the coordinates are rounded to, as geolocation services report them.
+    :return: DataFrame with 'uuid', 'latitude', 'longitude' and 'stake_weight'.
+    """
+    rng = np.random.default_rng(seed)
+    if cities_df is None:
+        cities_df = pd.read_csv("servers.csv")
+    city_latitudes = cities_df["latitude"].to_numpy(dtype=float)
+    city_longitudes = cities_df["longitude"].to_numpy(dtype=float)
+
+    popularity = 1 / np.arange(1, len(city_latitudes) + 1) ** city_exponent
+    cities = rng.permutation(len(city_latitudes))[
+        rng.choice(len(city_latitudes), size=n, p=popularity / popularity.sum())
+    ]
+
+    latitudes = np.clip(city_latitudes[cities] + rng.normal(0, spread_km, n) / KM_PER_DEGREE, -90, 90)
+    stretch = np.maximum(np.cos(np.radians(latitudes)), 0.01)
+    longitudes = city_longitudes[cities] + rng.normal(0, spread_km, n) / (KM_PER_DEGREE * stretch)
+    longitudes = (longitudes + 180) % 360 - 180
+    latitudes, longitudes = np.round(latitudes, decimals), np.round(longitudes, decimals)
+
+    duplicates = rng.random(n) < duplicate_fraction
+    sources = rng.choice(np.flatnonzero(~duplicates), size=duplicates.sum()) if (~duplicates).any() else []
+    latitudes[duplicates] = latitudes[sources]
+    longitudes[duplicates] = longitudes[sources]
+
+    zero = rng.random(n) < zero_fraction
+    latitudes[zero] = 0
+    longitudes[zero] = 0
+
+    stakes = np.floor((rng.pareto(stake_alpha, n) + 1) * 1000).astype(np.int64)
+    # Random high bits and the position as low bits keep the ids unique; hex-encoded in one pass
+    keys = (rng.integers(0, 2 ** 32, size=n, dtype=np.uint64) << np.uint64(32)) | np.arange(n, dtype=np.uint64)
+    uuids = np.frombuffer(keys.astype(">u8").tobytes().hex().encode(), dtype="S16").astype(str)
+    return pd.DataFrame({
+        "uuid": np.char.add("0x", uuids),
+        "latitude": latitudes,
+        "longitude": longitudes,
+        "stake_weight": stakes,
+    })
@@ -0,0 +1,184 @@
+import heapq
+
+import numpy as np
+
+from utils.spatial import SphericalIndex, haversine_distances, to_unit_vectors
+
+LINKAGES = ("representative", "centroid")
+
+
+def labels_from_merges(n, merges):
+    """
+    Replays merges on n singleton clusters and returns the cluster slot of every original point.
+
+    :param n: Number of original points.
+    :param merges: Sequence of (survivor, removed) slot pairs, in merge order.
+    :return: Int array of length n with the surviving slot each point belongs to.
+    """
+    parent = np.arange(n)
+    for survivor, removed in merges:
+        parent[removed] = survivor
+
+    # Follow parent links to the root; each pass halves the remaining path lengths
+    labels = parent.copy()
+    while True:
+        next_labels = parent[labels]
+        if np.array_equal(next_labels, labels):
+            return labels
+        labels = next_labels
+
+
+class AgglomerativeMerger:
+    def __init__(self, latitudes, longitudes, stakes, linkage="representative"):
+        """
+        Agglomerative stake-aware merging of validators: repeatedly merges the two closest clusters.
+
+        Every active cluster keeps its exact nearest neighbour; a priority queue over those holds the
+        globally closest pair. After a merge only the merged cluster and clusters whose nearest neighbour
+        was one of the two merged clusters need a distance row, so no distance matrix is ever rebuilt.
+
+        :param latitudes: Array of validator latitudes.
+        :param longitudes: Array of validator longitudes.
+        :param stakes: Array of validator stake weights.
+        :param linkage: 'representative' keeps the location of the higher-stake cluster for the merged cluster,
+                        'centroid' moves it to the stake-weighted centroid on the sphere.
+        """
+        if linkage not in LINKAGES:
+            raise ValueError(f"Unknown linkage '{linkage}'. Expected one of {LINKAGES}.")
+
+        self.linkage = linkage
+        self.latitudes = np.array(latitudes, dtype=float)
+        self.longitudes = np.array(longitudes, dtype=float)
+        self.stakes = np.array(stakes, dtype=float)
+        self.n = len(self.stakes)
+
+        # Cluster state, indexed by slot. A merged cluster reuses the slot of one of its parts.
+        self.active = np.ones(self.n, dtype=bool)
+        self.vectors = to_unit_vectors(self.latitudes, self.longitudes) * np.maximum(self.stakes, 1e-12)[:, None]
+        self.nn = np.full(self.n, -1)
+        self.nn_dist = np.full(self.n, np.inf)
+        self.version = np.zeros(self.n, dtype=np.int64)
+        self.heap = []
+
+        # Merge history: (survivor slot, removed slot, distance in km, merged stake)
+        self.merges = []
+        self.pairs_evaluated = 0
+
+        self._init_nearest_neighbours()
+
+    def _init_nearest_neighbours(self):
+        """
+        Finds the initial nearest neighbour of every validator with a spatial index.
+        """
+        if self.n < 2:
+            return
+        distances, indices = SphericalIndex(self.latitudes, self.longitudes).query(
+            self.latitudes, self.longitudes, k=2
+        )
+        self.pairs_evaluated += 2 * self.n
+
+        # With duplicate coordinates the point itself may come second
+        slots = np.arange(self.n)
+        first_is_self = indices[:, 0] == slots
+        self.nn = np.where(first_is_self, indices[:, 1], indices[:, 0])
+        self.nn_dist = np.where(first_is_self, distances[:, 1], distances[:, 0])
+        self.heap = [(d, i, 0) for i, d in enumerate(self.nn_dist)]
+        heapq.heapify(self.heap)
+
+    def _distance_row(self, slot):
+        """
+        Distances (in km) from a cluster to all clusters; inf for inactive clusters and the cluster itself.
+        """
+        row = haversine_distances(self.latitudes[slot], self.longitudes[slot], self.latitudes, self.longitudes)
+        row[~self.active] = np.inf
+        row[slot] = np.inf
+        self.pairs_evaluated += int(self.active.sum())
+        return row
+
+    def _set_nn(self, slot, neighbour, distance):
+        self.nn[slot] = neighbour
+        self.nn_dist[slot] = distance
+        self.version[slot] += 1
+        heapq.heappush(self.heap, (distance, slot, self.version[slot]))
+
+    def _merge_pair(self, a, b, distance):
+        """
+        Merges clusters a and b into one slot and updates the nearest neighbours.
+        """
+        # Survivor slot: the higher-stake cluster, ties resolved towards the lower slot
+        if self.stakes[b] > self.stakes[a] or (self.stakes[b] == self.stakes[a] and b < a):
+            a, b = b, a
+
+        self.stakes[a] += self.stakes[b]
+        self.active[b] = False
+        if self.linkage == "centroid":
+            self.vectors[a] += self.vectors[b]
+            x, y, z = self.vectors[a] / np.linalg.norm(self.vectors[a])
+            self.latitudes[a] = np.degrees(np.arcsin(np.clip(z, -1, 1)))
+            self.longitudes[a] = np.degrees(np.arctan2(y, x))
+        self.merges.append((a, b, distance, self.stakes[a]))
+
+        if self.active.sum() < 2:
+            return
+
+        # Nearest neighbour of the merged cluster, and clusters for which it became the nearest
+        row = self._distance_row(a)
+        neighbour = int(np.argmin(row))
+        self._set_nn(a, neighbour, row[neighbour])
+
+        # With representative linkage the surviving cluster keeps its location, so only
+        # clusters whose nearest neighbour was removed are affected
+        if self.linkage == "representative":
+            stale = self.active & (self.nn == b)
+        else:
+            stale = self.active & ((self.nn == a) | (self.nn == b))
+        stale[a] = False
+        closer = self.active & ~stale & (row < self.nn_dist)
+        for slot in np.flatnonzero(closer):
+            self._set_nn(slot, a, row[slot])
+
+        # Clusters whose nearest neighbour was merged away (or moved) need a fresh search
+        for slot in np.flatnonzero(stale):
+            slot_row = self._distance_row(slot)
+            neighbour = int(np.argmin(slot_row))
+            self._set_nn(slot, neighbour, slot_row[neighbour])
+
+    def merge(self, target_count):
+        """
+        Merges clusters until exactly target_count remain (or one, if target_count < 1).
+
+        :param target_count: Desired number of clusters.
+        :return: self
+        """
+        target_count = max(1, int(target_count))
+        count = int(self.active.sum())
+        while count > target_count and self.heap:
+            distance, slot, version = heapq.heappop(self.heap)
+            if not self.active[slot] or version != self.version[slot]:
+                continue  # Outdated entry
+            self._merge_pair(slot, int(self.nn[slot]), distance)
+            count -= 1
+        return self
+
+    def get_labels(self):
+        """
+        Returns the surviving cluster slot of every original validator.
+        """
+        return labels_from_merges(self.n, [(a, b) for a, b, _, _ in self.merges])
+
+    def get_clusters(self):
+        """
+        Returns the current clusters.
+
+        :return: Dictionary of arrays: 'slot' (index of the representative validator), 'latitude', 'longitude',
+                 'stake_weight' and 'size' (number of merged validators), one entry per cluster.
+        """
+        slots = np.flatnonzero(self.active)
+        sizes = np.bincount(self.get_labels(), minlength=self.n)
+        return {
+            "slot": slots,
+            "latitude": self.latitudes[slots],
+            "longitude": self.longitudes[slots],
+            "stake_weight": self.stakes[slots],
+            "size": sizes[slots],
+        }
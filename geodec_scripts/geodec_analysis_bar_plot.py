@@ -4,6 +4,8 @@ import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
+from utils.figure_jobs import FigureJob, run_figure_jobs, save_figure
+
 plt.rcParams['text.usetex'] = True
 plt.rcParams['font.family'] = 'serif'
 plt.rcParams['font.serif'] = ['Times New Roman']  # LNCS compatible font
@@ -147,60 +149,63 @@ def plot_combined(all_data_hotstuff, all_data_cometbft, output_folder):
     plt.subplots_adjust(top=0.85, bottom=0.15)  # Adjust top to fit the main title and bottom for legend
 
     plot_filename = os.path.join(output_folder, "combined_plot_all.pdf")
-    plt.savefig(plot_filename, format='pdf', dpi=300, transparent=True)
+    plot_filename = save_figure(plot_filename, format='pdf', dpi=300, transparent=True)
     plt.close()  # Close the plot to free memory
 
     print(f"Combined plot saved to {plot_filename}")
 
 
-# Define the input and output folders for Hotstuff and CometBFT
-input_folder_hotstuff = 'data/geodec_hotstuff_2'
-input_folder_cometbft = 'data/geodec_cometbft'
-output_folder_base = 'results/geodec/plots'
-
-# Get all CSV files from the input folders
-csv_files_hotstuff = get_all_files(input_folder_hotstuff)
-csv_files_cometbft = get_all_files(input_folder_cometbft)
-
-# List to store data from all CSV files
-all_data_hotstuff = []
-all_data_cometbft = []
-
-# Process each CSV file and collect the data for Hotstuff
-for csv_file in csv_files_hotstuff:
-    csv_file_path = os.path.join(input_folder_hotstuff, csv_file)
-    chain = csv_file.replace('.csv', '').capitalize()
-
-    df = process_csv_file(csv_file_path) 
-    print(chain)
-    if chain == 'Ethernodes':
-        chain = 'Ethereum\nnodes'
-    df['blockchain'] = chain
-    all_data_hotstuff.append((df, csv_file_path))
-
-# Sort all_data by blockchain name for Hotstuff
-all_data_hotstuff.sort(key=lambda x: x[0]['blockchain'].iloc[0])  
-
-# Process each CSV file and collect the data for CometBFT
-for csv_file in csv_files_cometbft:
-    csv_file_path = os.path.join(input_folder_cometbft, csv_file)
-    chain = csv_file.replace('.csv', '').capitalize()
-
-    df = process_csv_file(csv_file_path) 
-    if chain == 'Ethernodes':
-        chain = 'Ethereum\nnodes'
-    df['blockchain'] = chain
-    all_data_cometbft.append((df, csv_file_path))
-
-# Sort all_data by blockchain name for CometBFT
-all_data_cometbft.sort(key=lambda x: x[0]['blockchain'].iloc[0])  
-
-# print(all_data_hotstuff)
-# print(all_data_cometbft)
-
-# # Create an output folder if it doesn't exist
-if not os.path.exists(output_folder_base):
-    os.makedirs(output_folder_base)
-
-# # Generate and save the combined plots for both Hotstuff and CometBFT
-plot_combined(all_data_hotstuff, all_data_cometbft, output_folder_base)
+if __name__ == "__main__":
+    # Define the input and output folders for Hotstuff and CometBFT
+    input_folder_hotstuff = 'data/geodec_hotstuff_2'
+    input_folder_cometbft = 'data/geodec_cometbft'
+    output_folder_base = 'results/geodec/plots'
+
+    # Get all CSV files from the input folders
+    csv_files_hotstuff = get_all_files(input_folder_hotstuff)
+    csv_files_cometbft = get_all_files(input_folder_cometbft)
+
+    # List to store data from all CSV files
+    all_data_hotstuff = []
+    all_data_cometbft = []
+
+    # Process each CSV file and collect the data for Hotstuff
+    for csv_file in csv_files_hotstuff:
+        csv_file_path = os.path.join(input_folder_hotstuff, csv_file)
+        chain = csv_file.replace('.csv', '').capitalize()
+
+        df = process_csv_file(csv_file_path) 
+        print(chain)
+        if chain == 'Ethernodes':
+            chain = 'Ethereum\nnodes'
+        df['blockchain'] = chain
+        all_data_hotstuff.append((df, csv_file_path))
+
+    # Sort all_data by blockchain name for Hotstuff
+    all_data_hotstuff.sort(key=lambda x: x[0]['blockchain'].iloc[0])  
+
+    # Process each CSV file and collect the data for CometBFT
+    for csv_file in csv_files_cometbft:
+        csv_file_path = os.path.join(input_folder_cometbft, csv_file)
+        chain = csv_file.replace('.csv', '').capitalize()
+
+        df = process_csv_file(csv_file_path) 
+        if chain == 'Ethernodes':
+            chain = 'Ethereum\nnodes'
+        df['blockchain'] = chain
+        all_data_cometbft.append((df, csv_file_path))
+
+    # Sort all_data by blockchain name for CometBFT
+    all_data_cometbft.sort(key=lambda x: x[0]['blockchain'].iloc[0])  
+
+    # print(all_data_hotstuff)
+    # print(all_data_cometbft)
+
+    # # Create an output folder if it doesn't exist
+    if not os.path.exists(output_folder_base):
+        os.makedirs(output_folder_base)
+
+    # # Generate and save the combined plots for both Hotstuff and CometBFT
+    run_figure_jobs([FigureJob("combined_plot_all", plot_combined,
+                               args=(all_data_hotstuff, all_data_cometbft, output_folder_base),
+                               outputs=[os.path.join(output_folder_base, "combined_plot_all.pdf")])])
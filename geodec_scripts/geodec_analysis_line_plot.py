@@ -3,6 +3,8 @@ import os
 import matplotlib.pyplot as plt
 import pandas as pd
 
+from utils.figure_jobs import FigureJob, run_figure_jobs, save_figure
+
 plt.rcParams.update(plt.rcParamsDefault)
 # Enable LaTeX and set fonts for better formatting
 plt.rcParams['text.usetex'] = True
@@ -56,7 +58,7 @@ def plot_category_across_files(all_data, category, output_folder, agg_type):
 
     # Save the plot as PDF in the specified folder
     plot_filename = os.path.join(output_folder, f"{category}_{agg_type}.pdf")
-    plt.savefig(plot_filename, format='pdf', dpi=300, transparent=True)
+    plot_filename = save_figure(plot_filename, format='pdf', dpi=300, transparent=True)
     plt.close()  # Close the plot to free memory
 
     print(f"Comparison plot for {category} ({agg_type}) saved to {plot_filename}")
@@ -86,41 +88,59 @@ def process_csv_file(csv_file_path, agg_type):
 
     return df_grouped
 
-def plot_and_save_all_categories(all_data, output_folder, agg_type):
+def get_category_jobs(all_data, output_folder, agg_type):
     """
-    Plots each category across all CSV files.
+    Returns one figure job per category, plotting the category across all CSV files.
     """
     categories = ['consensus_tps', 'consensus_latency', 'end_to_end_tps', 'end_to_end_latency']
 
-    for category in categories:
-        plot_category_across_files(all_data, category, output_folder, agg_type)
+    return [
+        FigureJob(f"{output_folder}/{category}/{agg_type}", plot_category_across_files,
+                  args=(all_data, category, output_folder, agg_type),
+                  outputs=[os.path.join(output_folder, f"{category}_{agg_type}.pdf")])
+        for category in categories
+    ]
+
+def plot_and_save_all_categories(all_data, output_folder, agg_type, processes=None):
+    """
+    Plots each category across all CSV files.
+    """
+    run_figure_jobs(get_category_jobs(all_data, output_folder, agg_type), processes=processes)
+
+if __name__ == "__main__":
+    # Define the input folders, plots are saved in a 'plots' subfolder of each
+    input_folders = ['data/geodec_hotstuff', 'data/geodec_cometbft']
+
+    # Aggregation types to plot ('min', 'median', 'max', ...)
+    agg_types = ['min', 'median', 'max']
 
-# Define the input and output folders
-input_folder = 'data/geodec_cometbft'
-output_folder_base = 'data/geodec_cometbft/plots'
+    # Collect the figures of all protocols and aggregation types, then render them in one pool
+    jobs = []
+    for input_folder in input_folders:
+        output_folder_base = os.path.join(input_folder, 'plots')
 
-# Get all CSV files from the input folder
-csv_files = get_all_files(input_folder)
+        # Get all CSV files from the input folder
+        csv_files = get_all_files(input_folder)
 
-# Choose aggregation type ('median' or 'max')
-agg_type = 'min'  # Set to 'max' if you want to plot the max values
+        for agg_type in agg_types:
+            # List to store data from all CSV files
+            all_data = []
 
-# List to store data from all CSV files
-all_data = []
+            # Process each CSV file and collect the data
+            for csv_file in csv_files:
+                csv_file_path = os.path.join(input_folder, csv_file)
 
-# Process each CSV file and collect the data
-for csv_file in csv_files:
-    csv_file_path = os.path.join(input_folder, csv_file)
+                # Process the CSV file and get the aggregated data
+                df_aggregated = process_csv_file(csv_file_path, agg_type)
 
-    # Process the CSV file and get the aggregated data
-    df_aggregated = process_csv_file(csv_file_path, agg_type)
+                # Append the data and the csv file name to the list
+                all_data.append((df_aggregated, csv_file_path))
 
-    # Append the data and the csv file name to the list
-    all_data.append((df_aggregated, csv_file_path))
+            jobs.extend(get_category_jobs(all_data, output_folder_base, agg_type))
 
-# Create an output folder if it doesn't exist
-if not os.path.exists(output_folder_base):
-    os.makedirs(output_folder_base)
+        # Create an output folder if it doesn't exist
+        if not os.path.exists(output_folder_base):
+            os.makedirs(output_folder_base)
 
-# Generate and save the comparison plots for all categories
-plot_and_save_all_categories(all_data, output_folder_base, agg_type)
\ No newline at end of file
+    # Generate and save the comparison plots for all categories
+    run_figure_jobs(jobs)
@@ -2,91 +2,124 @@ import logging
 import os
 import uuid
 
-import haversine as hs  # Install using: pip install haversine
+import numpy as np
 import pandas as pd
 
+from geodec_scripts.agglomerative_merge import AgglomerativeMerger
+from geodec_scripts.capacity_assignment import assign_with_capacity
+from geodec_scripts.merge_hierarchy import MergeHierarchy
+from geodec_scripts.server_index import ServerIndex
+from pre_processing.instrumentation import Instrumentation
+from pre_processing.stake_units import group_sum
+from pre_processing.validator_set import ValidatorSet
+
 
 class ValidatorMerger:
-    def __init__(self, validators_df, servers_df, server_threshold=500, logger=None):
+    def __init__(self, validators_df, servers_df, server_threshold=500, logger=None, server_index=None):
         """
         Initialize the ValidatorMerger class with validators and servers DataFrames.
 
-        :param validators_df: DataFrame containing validators with 'uuid', 'latitude', 'longitude', 'stake_weight'.
+        :param validators_df: DataFrame or ValidatorSet containing validators with 'uuid', 'latitude', 'longitude',
+                              'stake_weight'. A ValidatorSet is used as is; its unit vectors serve the server lookup.
         :param servers_df: DataFrame containing servers with 'id', 'latitude', 'longitude'.
         :param server_threshold: Maximum allowed distance (in km) between a validator and a server.
         :param logger: Logger function to handle logging instead of print.
+        :param server_index: Prebuilt ServerIndex over servers_df, to share one index across chains.
         """
-        self.validators_df = validators_df.reset_index(drop=True)
+        if isinstance(validators_df, ValidatorSet):
+            self.validators_df = validators_df
+        else:
+            self.validators_df = validators_df.reset_index(drop=True)
         self.servers_df = servers_df.reset_index(drop=True)
         self.server_threshold = server_threshold
         self.logger = logger if logger else print  # Default to print if no logger provided
+        self.server_index = server_index if server_index else ServerIndex(self.servers_df)
         # self.mapping_log = []
         self.distance_log = []
+        self.counters = {}  # Algorithm totals for the instrumentation
 
-    def map_validators_to_servers(self):
-        """
-        Maps each validator to the nearest server location using the Haversine formula.
-        Validators exceeding the server_threshold distance are logged.
-        """
-        mapped_validators = []
-        for idx, validator in self.validators_df.iterrows():
-            v_uuid = validator["uuid"]
-            v_coords = (validator["latitude"], validator["longitude"])
-            min_distance = float("inf")
-            nearest_server_id = None
-            nearest_server_coords = None
-
-            # Find the nearest server
-            for _, server in self.servers_df.iterrows():
-                s_id = server["id"]
-                s_coords = (server["latitude"], server["longitude"])
-                distance = hs.haversine(v_coords, s_coords)
-
-                if distance < min_distance:
-                    min_distance = distance
-                    nearest_server_id = s_id
-                    nearest_server_coords = s_coords
-
-            # Log if distance exceeds threshold
-            if min_distance > self.server_threshold:
-                self.logger(f"Validator {v_uuid} exceeds server threshold with distance {min_distance:.2f} km.")
-                # self.mapping_log.append(
-                #     f"Validator {v_uuid} exceeds server threshold with distance {min_distance:.2f} km."
-                # )
-
-            # Append mapping information
-            mapped_validators.append(
-                {
-                    "uuid": v_uuid,
-                    "stake_weight": validator["stake_weight"],
-                    "id": nearest_server_id,
-                    "latitude": nearest_server_coords[0],
-                    "longitude": nearest_server_coords[1],
-                    "distance_km": min_distance,
-                }
-            )
+    def map_validators_to_servers(self, capacity=None, capacity_type="stake", k=8):
+        """
+        Maps each validator to the nearest server location using great-circle distances.
+        Validators exceeding the server_threshold distance are flagged in self.exceeds_threshold.
 
-            # Log distance
-            self.distance_log.append(min_distance)
-            # self.logger(f"Validator: {v_uuid} Server mapped: {nearest_server_id} Distance {min_distance:.2f} km.")
+        With a capacity, validators are instead assigned to one of their k nearest servers such that no server
+        exceeds its capacity and the total stake-weighted distance is minimal (see assign_with_capacity).
+
+        :param capacity: Optional capacity per server (scalar or one value per server row).
+        :param capacity_type: 'stake' (capacity as a fraction of total stake) or 'count' (number of validators).
+        :param k: Number of candidate servers per validator for the capacity-constrained assignment.
+        """
+        latitudes = self.validators_df["latitude"]
+        longitudes = self.validators_df["longitude"]
+        if capacity is None:
+            points = self.validators_df.unit if isinstance(self.validators_df, ValidatorSet) else None
+            nearest = self.server_index.nearest(latitudes, longitudes, threshold=self.server_threshold, points=points)
+        else:
+            assignment = assign_with_capacity(
+                self.server_index,
+                latitudes,
+                longitudes,
+                self.validators_df["stake_weight"],
+                capacity,
+                capacity_type=capacity_type,
+                k=k,
+            )
+            servers = assignment["server"]
+            nearest = {
+                "id": self.server_index.ids[servers],
+                "latitude": self.server_index.latitudes[servers],
+                "longitude": self.server_index.longitudes[servers],
+                "distance_km": assignment["distance_km"],
+                "exceeds_threshold": assignment["distance_km"] > self.server_threshold,
+            }
+            overloaded = int(np.sum(assignment["server_load"] > np.asarray(capacity) + 1e-9))
+            self.logger(
+                f"Capacity-constrained assignment ({capacity_type} cap {capacity}, k={k}): "
+                f"{int(assignment['split'].sum())} split validators placed, {overloaded} servers over capacity."
+            )
 
         # Create a DataFrame of mapped validators
-        self.mapped_df = pd.DataFrame(mapped_validators)
+        self.mapped_df = pd.DataFrame(
+            {
+                "uuid": np.asarray(self.validators_df["uuid"]),
+                "stake_weight": np.asarray(self.validators_df["stake_weight"]),
+                "id": nearest["id"],
+                "latitude": nearest["latitude"],
+                "longitude": nearest["longitude"],
+                "distance_km": nearest["distance_km"],
+            }
+        )
 
-        # Log the number of validators exceeding the threshold
-        threshold_exceeded = sum(1 for dist in self.distance_log if dist > self.server_threshold)
+        # Log distances and validators exceeding the threshold
+        self.distance_log = nearest["distance_km"].tolist()
+        self.exceeds_threshold = nearest["exceeds_threshold"]
+        threshold_exceeded = int(self.exceeds_threshold.sum())
+        self.counters["validators_mapped"] = len(self.mapped_df)
+        self.counters["threshold_exceeded"] = threshold_exceeded
         self.logger(f"Validators exceeding threshold: {threshold_exceeded}")
+        if threshold_exceeded:
+            farthest = self.mapped_df[self.exceeds_threshold].nlargest(10, "distance_km")
+            self.logger(
+                "Farthest validators: "
+                + ", ".join(f"{row.uuid} ({row.distance_km:.2f} km)" for row in farthest.itertuples())
+            )
 
     def aggregate_stake_weights(self):
         """
         Aggregates stake weights for validators mapped to the same server.
         """
-        self.aggregated_df = self.mapped_df.groupby(["id", "latitude", "longitude"], as_index=False).agg(
+        grouped = self.mapped_df.groupby(["id", "latitude", "longitude"])
+        self.aggregated_df = grouped.agg(
             {
                 "stake_weight": "sum",
                 "uuid": lambda x: ",".join(x),
                 "distance_km": "mean",  # Average distance for logging purposes
             }
+        ).reset_index()
+        # Exact stake sums in base units (pandas int64 sums wrap silently on high-denomination chains)
+        self.aggregated_df["stake_weight"] = group_sum(
+            self.mapped_df["stake_weight"].to_numpy(), grouped.ngroup().to_numpy(), len(self.aggregated_df)
         )
 
         # New uuid for each aggregated server
@@ -107,14 +140,45 @@ class ValidatorMerger:
             self.logger(
                 f"Current validator count: {len(self.aggregated_df)}. Trying to merge with threshold: {threshold} km."
             )
-            self._merge_validators_within_threshold(threshold)
+            self._merge_validators_within_threshold(threshold, target_count)
             threshold += increment
 
-    def _merge_validators_within_threshold(self, threshold):
+    def merge_validators_agglomerative(self, target_count=64, linkage="representative"):
+        """
+        Merges the closest pair of validators, one pair at a time, until exactly target_count remain.
+
+        :param target_count: Desired number of validators after merging.
+        :param linkage: 'representative' keeps the server of the higher-stake side of every merge,
+                        'centroid' places merged validators at their stake-weighted centroid.
+        """
+        df = self.aggregated_df.reset_index(drop=True)
+        engine = AgglomerativeMerger(df["latitude"], df["longitude"], df["stake_weight"], linkage=linkage)
+        engine.merge(target_count)
+        clusters = engine.get_clusters()
+
+        # One row per cluster, taken from its representative server; stake is summed exactly from the members
+        merged_df = df.iloc[clusters["slot"]].copy()
+        merged_df["stake_weight"] = group_sum(df["stake_weight"].to_numpy(), engine.get_labels(), len(df))[
+            clusters["slot"]
+        ]
+        merged_df["latitude"] = clusters["latitude"]
+        merged_df["longitude"] = clusters["longitude"]
+        self.aggregated_df = merged_df.reset_index(drop=True)
+        self.counters["pairs_evaluated"] = self.counters.get("pairs_evaluated", 0) + engine.pairs_evaluated
+        self.counters["merges"] = self.counters.get("merges", 0) + len(engine.merges)
+
+        self.logger(
+            f"Merged {len(engine.merges)} validator pairs ({linkage} linkage), "
+            f"largest merge distance {max((m[2] for m in engine.merges), default=0):.2f} km. "
+            f"Validator count after merging: {len(self.aggregated_df)}"
+        )
+
+    def _merge_validators_within_threshold(self, threshold, target_count=64):
         """
         Merges validators that are within a specified distance threshold.
 
         :param threshold: Distance threshold (in km) for merging validators.
+        :param target_count: Merging stops once the number of validators reaches target_count.
         """
         merged = False
         dist_matrix = self._get_distance_matrix(self.aggregated_df)
@@ -126,6 +190,10 @@ class ValidatorMerger:
                 distance = dist_matrix.iloc[idx1, idx2]
                 if distance <= threshold:
                     pairs_to_merge.append((idx1, idx2, distance))
+        self.counters["pairs_evaluated"] = self.counters.get("pairs_evaluated", 0) + len(dist_matrix) * (
+            len(dist_matrix) - 1
+        ) // 2
+        self.counters["merge_candidates"] = self.counters.get("merge_candidates", 0) + len(pairs_to_merge)
 
         if not pairs_to_merge:
             self.logger(f"No pairs found within {threshold} km threshold.")
@@ -137,6 +205,7 @@ class ValidatorMerger:
         # Merge pairs
         indices_to_drop = set()
         net_validator_count = len(self.aggregated_df)
+        largest_distance = 0
 
         for idx1, idx2, dist in pairs_to_merge:
             if idx1 in indices_to_drop or idx2 in indices_to_drop:
@@ -149,18 +218,22 @@ class ValidatorMerger:
             # Mark idx2 for dropping
             indices_to_drop.add(idx2)
             merged = True
-            self.logger(f"Merged validators at index {idx1} and {idx2}, distance {dist:.2f} km.")
+            largest_distance = dist
 
             # Number of validators after merging
             net_validator_count -= 1
-            self.logger(f"Validator count after merging: {net_validator_count}")
-            if net_validator_count <= 64:
+            if net_validator_count <= target_count:
                 break
 
         # Drop merged validators
         if merged:
             self.aggregated_df.drop(list(indices_to_drop), inplace=True)
             self.aggregated_df.reset_index(drop=True, inplace=True)
+            self.counters["merges"] = self.counters.get("merges", 0) + len(indices_to_drop)
+            self.logger(
+                f"Merged {len(indices_to_drop)} validator pairs within {threshold} km, "
+                f"largest merge distance {largest_distance:.2f} km. Validator count after merging: {net_validator_count}"
+            )
         else:
             self.logger(f"No validators merged at threshold {threshold} km.")
 
@@ -171,6 +244,8 @@ class ValidatorMerger:
         :param df: DataFrame with 'server_latitude' and 'server_longitude'.
         :return: A symmetric DataFrame representing pairwise distances.
         """
+        import haversine as hs  # Install using: pip install haversine
+
         coords = list(zip(df["latitude"], df["longitude"]))
         dist_matrix = pd.DataFrame(index=range(len(coords)), columns=range(len(coords)))
 
@@ -193,12 +268,41 @@ class ValidatorMerger:
 
 
 class Preprocessing:
-    def __init__(self, input_folder="data/", output_folder="data/pre_processed_data/", server_threshold=500):
+    def __init__(
+        self,
+        input_folder="data/",
+        output_folder="data/pre_processed_data/",
+        server_threshold=500,
+        target_count=64,
+        linkage="representative",
+        capacity=None,
+        capacity_type="stake",
+        trace_memory=False,
+    ):
+        """
+        Maps the validators of every chain to servers and merges them down to target_count validators.
+
+        :param input_folder: Folder with one validators CSV per chain.
+        :param output_folder: Folder for the merged CSVs and the processing log.
+        :param server_threshold: Maximum allowed distance (in km) between a validator and a server.
+        :param target_count: Number of validators to merge each chain down to.
+        :param linkage: Linkage of the agglomerative merge, 'representative' or 'centroid'.
+        :param capacity: Optional per-server capacity for the validator-to-server assignment, see
+                         ValidatorMerger.map_validators_to_servers. None maps every validator to its nearest server.
+        :param capacity_type: 'stake' (fraction of total stake) or 'count' (number of validators).
+        :param trace_memory: Also record the tracemalloc peak of every stage in the metrics.
+        """
         self.input_folder = input_folder
         self.output_folder = output_folder
         self.files = self._get_all_files()
         self.server_threshold = server_threshold
+        self.target_count = target_count
+        self.linkage = linkage
+        self.capacity = capacity
+        self.capacity_type = capacity_type
         self.log = []
+        # Per-stage time, memory and counters, saved as metrics.jsonl and metrics.prom
+        self.instrumentation = Instrumentation(trace_memory=trace_memory)
 
         # Ensure the output folder exists
         if not os.path.exists(self.output_folder):
@@ -232,49 +336,147 @@ class Preprocessing:
         logging.info(message)
         print(message)
 
+    def save_metrics(self):
+        """
+        Saves the per-stage measurements as JSON lines (appended) and in the Prometheus text format.
+        """
+        self.instrumentation.write_jsonl(os.path.join(self.output_folder, "metrics.jsonl"))
+        self.instrumentation.write_prometheus(os.path.join(self.output_folder, "metrics.prom"))
+        self.logger(f"Metrics saved to {self.output_folder}")
+
+    def _load_validators(self, file, chain):
+        """
+        Reads a chain's validators and drops rows without coordinates.
+
+        :return: ValidatorSet of the validators.
+        """
+        with self.instrumentation.stage("read", chain):
+            validators_df = pd.read_csv(os.path.join(self.input_folder, file))
+            self.instrumentation.count("rows", len(validators_df))
+            self.logger(f"Initial number of validators: {len(validators_df)}")
+            validators = ValidatorSet.from_dataframe(validators_df)
+            validators = validators[~(np.isnan(validators["latitude"]) | np.isnan(validators["longitude"]))]
+        return validators
+
+    def _map_validators(self, validators, servers_df, server_index, chain):
+        """
+        Maps a chain's validators to servers and aggregates them per server.
+        """
+        with self.instrumentation.stage("map_to_servers", chain):
+            merger = ValidatorMerger(
+                validators,
+                servers_df,
+                server_threshold=self.server_threshold,
+                logger=self.logger,
+                server_index=server_index,
+            )
+            merger.map_validators_to_servers(capacity=self.capacity, capacity_type=self.capacity_type)
+            merger.aggregate_stake_weights()
+            self.instrumentation.add_counters(merger.counters)
+            self.instrumentation.count("servers", len(merger.aggregated_df))
+        return merger
+
     def process_files(self):
         """
         Processes each file: maps validators to servers, merges validators based on thresholds,
         and saves the processed files into the output folder.
         """
-        # Load servers data once
+        # Load and index servers data once
         servers_df = pd.read_csv("servers.csv")
+        server_index = ServerIndex(servers_df)
 
         for file in self.files:
             if file == "servers.csv":
                 continue  # Skip the servers file
 
+            chain = os.path.splitext(file)[0]
             self.logger(f"Processing file: {file}")
-            validators_df = pd.read_csv(os.path.join(self.input_folder, file))
-            self.logger(f"Initial number of validators: {len(validators_df)}")
-
-            # Clean data
-            validators_df.dropna(subset=["latitude", "longitude"], inplace=True)
-            validators_df["latitude"] = validators_df["latitude"].astype(float)
-            validators_df["longitude"] = validators_df["longitude"].astype(float)
-            validators_df.reset_index(drop=True, inplace=True)
+            validators = self._load_validators(file, chain)
 
             # Map validators to servers
-            merger = ValidatorMerger(
-                validators_df, servers_df, server_threshold=self.server_threshold, logger=self.logger
-            )
-            merger.map_validators_to_servers()
-            merger.aggregate_stake_weights()
-
-            # If number of validators exceeds 64, merge incrementally
-            if len(merger.aggregated_df) > 64:
-                self.logger(f"Validator count exceeds 64 after initial mapping: {len(merger.aggregated_df)}")
-                merger.merge_validators_incrementally(target_count=64)
+            merger = self._map_validators(validators, servers_df, server_index, chain)
+
+            # If number of validators exceeds the target, merge the closest validators
+            if len(merger.aggregated_df) > self.target_count:
+                self.logger(
+                    f"Validator count exceeds {self.target_count} after initial mapping: {len(merger.aggregated_df)}"
+                )
+                with self.instrumentation.stage("merge", chain):
+                    merger.merge_validators_agglomerative(target_count=self.target_count, linkage=self.linkage)
+                    self.instrumentation.add_counters(
+                        {name: merger.counters[name] for name in ("pairs_evaluated", "merges")}
+                    )
             else:
                 self.logger(f"Validator count is within limit after initial mapping: {len(merger.aggregated_df)}")
 
             # Save results and logs
-            output_file = os.path.join(self.output_folder, f"{file}")
-            merger.save_results(output_file)
+            with self.instrumentation.stage("save", chain):
+                output_file = os.path.join(self.output_folder, f"{file}")
+                merger.save_results(output_file)
+
+            self.logger(f"Finished processing file: {file}\n")
+
+        self.logger(f"All files processed. Results saved in {self.output_folder}")
+        self.save_metrics()
+
+    def process_files_hierarchy(self, committee_sizes=(16, 32, 64, 128)):
+        """
+        Processes each file once for all committee sizes: maps validators to servers, builds (or reuses)
+        the persisted merge hierarchy of the chain and cuts it at every committee size.
+
+        Outputs, per committee size k: '<output_folder>/<k>/<file>' with the merged validators and
+        '<output_folder>/<k>/<chain>_provenance.csv' mapping original validator uuids to merged node uuids.
+        Hierarchies are stored in '<output_folder>/hierarchy/<chain>.npz'.
+
+        :param committee_sizes: Committee sizes to produce.
+        """
+        servers_df = pd.read_csv("servers.csv")
+        server_index = ServerIndex(servers_df)
+        hierarchy_folder = os.path.join(self.output_folder, "hierarchy")
+        os.makedirs(hierarchy_folder, exist_ok=True)
+
+        for file in self.files:
+            if file == "servers.csv":
+                continue  # Skip the servers file
+
+            chain = os.path.splitext(file)[0]
+            self.logger(f"Processing file: {file}")
+            validators = self._load_validators(file, chain)
+            merger = self._map_validators(validators, servers_df, server_index, chain)
+
+            # Reuse the persisted hierarchy if it was built from the same servers and stakes
+            hierarchy_file = os.path.join(hierarchy_folder, f"{chain}.npz")
+            with self.instrumentation.stage("hierarchy", chain):
+                hierarchy = MergeHierarchy.load(hierarchy_file) if os.path.exists(hierarchy_file) else None
+                if (
+                    hierarchy is None
+                    or hierarchy.linkage != self.linkage
+                    or not hierarchy.matches(merger.aggregated_df)
+                ):
+                    hierarchy = MergeHierarchy.build(merger.aggregated_df, linkage=self.linkage)
+                    hierarchy.save(hierarchy_file)
+                    self.instrumentation.count("merges", len(hierarchy.merges))
+                    self.logger(f"Merge hierarchy built and saved to {hierarchy_file}")
+                else:
+                    self.instrumentation.count("reused", 1)
+                    self.logger(f"Merge hierarchy reused from {hierarchy_file}")
+
+            for committee_size in committee_sizes:
+                size_folder = os.path.join(self.output_folder, str(committee_size))
+                os.makedirs(size_folder, exist_ok=True)
+
+                with self.instrumentation.stage(f"cut_{committee_size}", chain):
+                    nodes_df, _ = hierarchy.cut(committee_size)
+                    nodes_df.to_csv(os.path.join(size_folder, file), index=False)
+                    hierarchy.provenance(committee_size, merger.mapped_df).to_csv(
+                        os.path.join(size_folder, f"{chain}_provenance.csv"), index=False
+                    )
+                self.logger(f"Committee size {committee_size}: {len(nodes_df)} validators saved in {size_folder}")
 
             self.logger(f"Finished processing file: {file}\n")
 
         self.logger(f"All files processed. Results saved in {self.output_folder}")
+        self.save_metrics()
 
 
 # USAGE
@@ -5,6 +5,7 @@ from datetime import datetime
 import pandas as pd
 
 from pre_processing.gdi_calculator import GDI_Calculator
+from pre_processing.validator_set import ValidatorSet
 from utils.normalization import Normalization
 from utils.weight_computation import WeightComputation
 
@@ -48,11 +49,11 @@ class Preprocessing:
         try:
             # Read the CSV file
             self.logger.info(f"Reading CSV file {file}...")
-            df = pd.read_csv(os.path.join(self.input_folder, file))
+            validators = ValidatorSet.from_dataframe(pd.read_csv(os.path.join(self.input_folder, file)))
 
             # Calculate GDI
             self.logger.info(f"Calculating GDI for {file}...")
-            gdi_calc = GDI_Calculator(df, self.logger)
+            gdi_calc = GDI_Calculator(validators, self.logger)
             df_with_gdi = gdi_calc.calculate_GDI()
 
             # Calculate weights
@@ -70,7 +71,7 @@ class Preprocessing:
 
             # Save the processed data to CSV
             output_filename = os.path.join(self.output_folder, f"{file}")
-            final_df.to_csv(output_filename, index=False)
+            final_df.to_dataframe().to_csv(output_filename, index=False)
             self.logger.info(f"Results saved to {output_filename}")
 
         except Exception as e:
@@ -0,0 +1,130 @@
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from geodec_scripts.agglomerative_merge import AgglomerativeMerger, labels_from_merges
+from pre_processing.stake_units import group_sum
+from utils.spatial import to_unit_vectors
+
+
+class MergeHierarchy:
+    def __init__(self, leaves_df, merges, linkage="representative"):
+        """
+        Full merge hierarchy (dendrogram) of a chain's server-aggregated validators.
+        Any committee size is produced by cutting the hierarchy, without merging again.
+
+        :param leaves_df: DataFrame of the aggregated validators with 'id', 'latitude', 'longitude', 'stake_weight'.
+        :param merges: (n - 1, 4) array of merges: survivor leaf slot, removed leaf slot, distance (km), merged stake.
+        :param linkage: Linkage the hierarchy was built with, 'representative' or 'centroid'.
+        """
+        # Leaf uuids are regenerated on every aggregation; merged nodes get derived uuids in cut()
+        self.leaves_df = leaves_df.drop(columns="uuid", errors="ignore").reset_index(drop=True)
+        self.merges = np.asarray(merges, dtype=float).reshape(-1, 4)
+        self.linkage = linkage
+
+    @classmethod
+    def build(cls, leaves_df, linkage="representative"):
+        """
+        Merges the leaves all the way down to a single cluster and keeps the merge order.
+
+        :param leaves_df: DataFrame of the aggregated validators with 'id', 'latitude', 'longitude', 'stake_weight'.
+        :param linkage: 'representative' or 'centroid', see AgglomerativeMerger.
+        :return: MergeHierarchy
+        """
+        leaves_df = leaves_df.reset_index(drop=True)
+        engine = AgglomerativeMerger(
+            leaves_df["latitude"], leaves_df["longitude"], leaves_df["stake_weight"], linkage=linkage
+        )
+        engine.merge(1)
+        return cls(leaves_df, engine.merges, linkage)
+
+    def save(self, path):
+        """
+        Persists the hierarchy as a .npz file.
+
+        :param path: Output file path.
+        """
+        columns = {col: self.leaves_df[col].to_numpy() for col in self.leaves_df.columns}
+        np.savez(path, linkage=np.array(self.linkage), merges=self.merges, columns=np.array(list(columns)), **columns)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a hierarchy saved with save().
+
+        :param path: Path to the .npz file.
+        :return: MergeHierarchy
+        """
+        with np.load(path) as data:
+            leaves_df = pd.DataFrame({str(col): data[str(col)] for col in data["columns"]})
+            return cls(leaves_df, data["merges"], str(data["linkage"]))
+
+    def matches(self, leaves_df):
+        """
+        Checks whether the hierarchy was built from the given leaves, so a persisted hierarchy can be reused.
+        """
+        cols = ["id", "latitude", "longitude", "stake_weight"]
+        leaves_df = leaves_df.reset_index(drop=True)
+        return len(leaves_df) == len(self.leaves_df) and all(
+            np.array_equal(leaves_df[col].to_numpy(), self.leaves_df[col].to_numpy()) for col in cols
+        )
+
+    def leaf_labels(self, committee_size):
+        """
+        Returns the cluster (surviving leaf slot) of every leaf when cutting the hierarchy at committee_size nodes.
+        """
+        n = len(self.leaves_df)
+        merge_count = max(0, n - max(1, int(committee_size)))
+        return labels_from_merges(n, self.merges[:merge_count, :2].astype(int))
+
+    def cut(self, committee_size):
+        """
+        Produces the aggregated validator set with committee_size nodes.
+
+        :param committee_size: Number of merged nodes. Sizes above the number of leaves return all leaves.
+        :return: Tuple (aggregated DataFrame with one row per node, leaf labels). Merged node uuids are derived
+                 from the member server ids, so the same node gets the same uuid in every cut and run.
+        """
+        labels = self.leaf_labels(committee_size)
+        slots = np.unique(labels)
+
+        # Representative server of every node; stake is summed exactly from the members
+        nodes_df = self.leaves_df.iloc[slots].copy()
+        node_stakes = group_sum(self.leaves_df["stake_weight"].to_numpy(), labels, len(self.leaves_df))
+        nodes_df["stake_weight"] = node_stakes[slots]
+
+        if self.linkage == "centroid":
+            stakes = np.maximum(self.leaves_df["stake_weight"].to_numpy(dtype=float), 1e-12)
+            vectors = to_unit_vectors(self.leaves_df["latitude"], self.leaves_df["longitude"]) * stakes[:, None]
+            sums = np.zeros((len(self.leaves_df), 3))
+            np.add.at(sums, labels, vectors)
+            x, y, z = (sums[slots] / np.linalg.norm(sums[slots], axis=1, keepdims=True)).T
+            nodes_df["latitude"] = np.degrees(np.arcsin(np.clip(z, -1, 1)))
+            nodes_df["longitude"] = np.degrees(np.arctan2(y, x))
+
+        members = self.leaves_df.groupby(labels)["id"].apply(lambda ids: ",".join(map(str, sorted(ids))))
+        nodes_df.insert(
+            nodes_df.columns.get_loc("stake_weight") + 1,
+            "uuid",
+            [str(uuid.uuid5(uuid.NAMESPACE_OID, members[slot])) for slot in slots],
+        )
+        return nodes_df.reset_index(drop=True), labels
+
+    def provenance(self, committee_size, mapped_df):
+        """
+        Maps original validator uuids to the merged node they end up in.
+
+        :param committee_size: Number of merged nodes.
+        :param mapped_df: DataFrame of the original validators with 'uuid' and their server 'id'
+                          (ValidatorMerger.mapped_df).
+        :return: DataFrame with 'uuid', 'id' (server) and 'node_uuid' (merged node).
+        """
+        nodes_df, labels = self.cut(committee_size)
+        node_uuid_of_slot = dict(zip(np.unique(labels), nodes_df["uuid"]))
+        node_uuid_of_server = {
+            server_id: node_uuid_of_slot[label] for server_id, label in zip(self.leaves_df["id"], labels)
+        }
+        provenance_df = mapped_df[["uuid", "id"]].copy()
+        provenance_df["node_uuid"] = provenance_df["id"].map(node_uuid_of_server)
+        return provenance_df
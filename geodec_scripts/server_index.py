@@ -0,0 +1,54 @@
+import numpy as np
+
+from utils.spatial import SphericalIndex
+
+
+class ServerIndex:
+    def __init__(self, servers_df):
+        """
+        Indexes server coordinates once for nearest-server queries.
+
+        :param servers_df: DataFrame containing servers with 'id', 'latitude', 'longitude'.
+        """
+        self.ids = servers_df["id"].to_numpy()
+        self.latitudes = servers_df["latitude"].to_numpy(dtype=float)
+        self.longitudes = servers_df["longitude"].to_numpy(dtype=float)
+        self.index = SphericalIndex(self.latitudes, self.longitudes)
+
+    def nearest(self, latitudes, longitudes, threshold=None, points=None):
+        """
+        Finds the nearest server of every validator in one call.
+
+        :param latitudes: Array of validator latitudes.
+        :param longitudes: Array of validator longitudes.
+        :param threshold: Maximum allowed distance (in km); None disables the check.
+        :param points: Precomputed unit vectors of the validators (e.g. ValidatorSet.unit), used instead of
+                       converting the coordinates again.
+        :return: Dictionary of arrays: 'id', 'latitude', 'longitude', 'distance_km' of the nearest server,
+                 and 'exceeds_threshold' flagging validators farther than threshold from it.
+        """
+        if points is None:
+            distances, indices = self.index.query(latitudes, longitudes, k=1)
+        else:
+            distances, indices = self.index.query_points(points, k=1)
+        exceeds = distances > threshold if threshold is not None else np.zeros(len(distances), dtype=bool)
+        return {
+            "id": self.ids[indices],
+            "latitude": self.latitudes[indices],
+            "longitude": self.longitudes[indices],
+            "distance_km": distances,
+            "exceeds_threshold": exceeds,
+        }
+
+    def k_nearest(self, latitudes, longitudes, k):
+        """
+        Finds the k nearest servers of every validator.
+
+        :param latitudes: Array of validator latitudes.
+        :param longitudes: Array of validator longitudes.
+        :param k: Number of servers per validator (capped at the number of servers).
+        :return: Tuple (distances in km, server positions in servers_df), both of shape (n, k), nearest first.
+        """
+        k = min(int(k), len(self.ids))
+        distances, indices = self.index.query(latitudes, longitudes, k=k)
+        return distances.reshape(-1, k), indices.reshape(-1, k)
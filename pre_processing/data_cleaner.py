@@ -1,27 +1,40 @@
+import numpy as np
 import pandas as pd
 
+from pre_processing.stake_units import StakeUnits, group_sum
+from pre_processing.validator_set import ValidatorSet
+
 class DataCleaner:
     def __init__(self, df, logger=None):
         """
         Initializes the DataCleaner class with a pandas DataFrame and a logger.
         
-        :param df: pandas DataFrame with 'uuid', 'latitude', 'longitude', 'stake_weight'.
+        :param df: pandas DataFrame or ValidatorSet with 'uuid', 'latitude', 'longitude', 'stake_weight'.
+                   A ValidatorSet is cleaned on its arrays and returned as a ValidatorSet.
         :param logger: Logger function to handle logging instead of print.
         """
         self.df = df
         self.total_stake_weight = self.df['stake_weight'].sum()
         self.logger = logger if logger else print  # Default to print if no logger provided
+        self.counters = {}  # Algorithm totals for the instrumentation
 
     def _merge_duplicate_coordinates(self):
         """
         Merges rows in the DataFrame with the same 'latitude' and 'longitude',
         summing their 'stake_weight'. Logs the number of rows merged.
         """
-        # Group by 'latitude' and 'longitude', and sum the 'stake_weight' for duplicates
-        merged_df = self.df.groupby(['latitude', 'longitude'], as_index=False).agg({
-            'stake_weight': 'sum',
-            'uuid': 'first'  # Keep the first 'uuid'
-        })
+        if isinstance(self.df, ValidatorSet):
+            merged_df = self._merge_duplicate_coordinates_set(self.df)
+        else:
+            # Group by 'latitude' and 'longitude', and sum the 'stake_weight' for duplicates
+            grouped = self.df.groupby(['latitude', 'longitude'])
+            merged_df = grouped.agg({
+                'stake_weight': 'sum',
+                'uuid': 'first'  # Keep the first 'uuid'
+            }).reset_index()
+            # Exact sums in base units (pandas int64 sums wrap silently, float sums round)
+            merged_df['stake_weight'] = group_sum(self.df['stake_weight'].to_numpy(), grouped.ngroup().to_numpy(),
+                                                  len(merged_df))
         
         # Calculate the number of rows that have been merged
         original_row_count = len(self.df)
@@ -30,9 +43,27 @@ class DataCleaner:
         
         # Log the number of rows merged
         self.logger(f"Number of rows merged due to same latitude, longitude: {merged_rows_count}")
+        self.counters['duplicate_rows_merged'] = merged_rows_count
         
         self.df = merged_df
 
+    @staticmethod
+    def _merge_duplicate_coordinates_set(validators):
+        """
+        The groupby of _merge_duplicate_coordinates on a ValidatorSet: rows sorted by coordinates, stakes
+        summed per coordinate pair and the first uuid (in input order) kept.
+        """
+        latitudes, longitudes = validators['latitude'], validators['longitude']
+        order = np.lexsort((longitudes, latitudes))  # Stable, so the first row of a group is the first in input order
+        new_group = np.ones(len(order), dtype=bool)
+        new_group[1:] = (np.diff(latitudes[order]) != 0) | (np.diff(longitudes[order]) != 0)
+        starts = np.flatnonzero(new_group)
+        merged = validators.take(order[starts]).select(['latitude', 'longitude', 'stake_weight', 'uuid'])
+        labels = np.empty(len(order), dtype=np.intp)
+        labels[order] = np.cumsum(new_group) - 1
+        merged['stake_weight'] = group_sum(validators['stake_weight'], labels, len(starts))
+        return merged
+
     def _get_total_stake_zero_lat_lon(self):
         """
         Filters the DataFrame for rows where both 'latitude' and 'longitude' are 0,
@@ -52,22 +83,37 @@ class DataCleaner:
         Logs the number of data points dropped and the percentage of total stake weight dropped.
         """
         # Fill empty values as zero and convert to float
-        self.df[['latitude', 'longitude']] = self.df[['latitude', 'longitude']].fillna(0).astype(float)
+        if isinstance(self.df, ValidatorSet):
+            for column in ('latitude', 'longitude'):
+                if np.isnan(self.df[column]).any():
+                    self.df[column] = np.nan_to_num(self.df[column], nan=0.0)
+        else:
+            self.df[['latitude', 'longitude']] = self.df[['latitude', 'longitude']].fillna(0).astype(float)
 
-        # Get the total stake weight for rows with zero latitude and longitude
-        total_stake_zero = self._get_total_stake_zero_lat_lon()
+        # Number of rows and stake to be dropped
+        zero_lat_lon = np.asarray((self.df['latitude'] == 0) & (self.df['longitude'] == 0))
+        total_rows_to_drop = int(zero_lat_lon.sum())
+        self.counters['zero_coordinate_rows'] = total_rows_to_drop
 
-        # Calculate the percentage of stake with zero latitude and longitude
-        percentage_zero_stake = (total_stake_zero / self.total_stake_weight) * 100
+        stakes = StakeUnits.from_stakes(np.asarray(self.df['stake_weight']))
+        if stakes is not None:
+            # Exact comparison in base units: zero stake < threshold_percentage % of the total
+            zero_units = stakes.sum(zero_lat_lon)
+            percentage_zero_stake = 100 * zero_units / stakes.total if stakes.total else float('nan')
+            drop_rows = zero_units < stakes.threshold(threshold_percentage / 100)
+        else:
+            # Get the total stake weight for rows with zero latitude and longitude
+            total_stake_zero = self._get_total_stake_zero_lat_lon()
 
-        # Number of rows and stake to be dropped
-        zero_lat_lon_rows = self.df[(self.df['latitude'] == 0) & (self.df['longitude'] == 0)]
-        total_rows_to_drop = len(zero_lat_lon_rows)
+            # Calculate the percentage of stake with zero latitude and longitude
+            percentage_zero_stake = (total_stake_zero / self.total_stake_weight) * 100
+            drop_rows = percentage_zero_stake < threshold_percentage
 
         # Drop rows if the percentage of zero stake is below the threshold
-        if percentage_zero_stake < threshold_percentage:
+        if drop_rows:
             self.logger(f"Dropping {total_rows_to_drop} rows with {percentage_zero_stake:.2f}% of total stake.")
             self.df = self.df[(self.df['latitude'] != 0) | (self.df['longitude'] != 0)]
+            self.counters['zero_coordinate_rows_dropped'] = total_rows_to_drop
         else:
             self.logger("No rows dropped. Dataset is not reliable")
 
@@ -78,8 +124,8 @@ class DataCleaner:
 
     def get_cleaned_data(self):
         """
-        Returns the cleaned DataFrame after applying the cleaning rules.
+        Returns the cleaned data after applying the cleaning rules.
 
-        :return: Cleaned pandas DataFrame
+        :return: Cleaned pandas DataFrame, or ValidatorSet if one was given
         """
         return self.df
\ No newline at end of file
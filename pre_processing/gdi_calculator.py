@@ -1,16 +1,82 @@
 import haversine as hs  # Install using: pip install haversine
+import numpy as np
 import pandas as pd
 
+from pre_processing.stake_units import StakeUnits, group_sum
+from pre_processing.validator_set import ValidatorSet
+
+
+def closest_merge_owners(dist_matrix, threshold_distance=20):
+    """
+    The greedy merge of GDI_Calculator.merge_closest_validators on a distance array: pairs closer than the
+    threshold, in row-major order stably sorted by distance, merge unless either side was already absorbed.
+
+    :param dist_matrix: (n, n) distance array in km, rows in the order of the validators.
+    :param threshold_distance: The distance threshold (in km) for merging validators.
+    :return: Tuple (owner, merged, candidates): the remaining validator that holds the stake of each one,
+             the mask of absorbed validators and the number of candidate pairs.
+    """
+    n = len(dist_matrix)
+    candidates = dist_matrix < threshold_distance
+    np.fill_diagonal(candidates, False)
+    # Row-major pairs, stably sorted by distance: the order in which the DataFrame path visits them
+    sources, destinations = np.nonzero(candidates)
+    order = np.argsort(dist_matrix[sources, destinations], kind='stable')
+
+    # Record which validator absorbs which; stakes are summed exactly per final owner afterwards
+    owner = np.arange(n)
+    merged = np.zeros(n, dtype=bool)
+    for source, destination in zip(sources[order].tolist(), destinations[order].tolist()):
+        if not merged[destination] and not merged[source]:
+            owner[destination] = source
+            merged[destination] = True
+
+    # A validator that absorbed others can itself be absorbed later: follow owners to the remaining one
+    while (owner[owner] != owner).any():
+        owner = owner[owner]
+    return owner, merged, len(sources)
+
+
+def gdi_from_distances(dist_matrix, stakes, fraction=2 / 3):
+    """
+    GDI of every validator from a distance array: every row is sorted once and the quorum is found with a
+    cumulative sum instead of a loop over neighbours. Stakes with a common base unit (see StakeUnits) are
+    compared with the quorum exactly.
+
+    :param dist_matrix: (n, n) distance array in km.
+    :param stakes: Stake of every validator.
+    :param fraction: Stake fraction of the quorum.
+    :return: Tuple (GDI per validator, number of neighbours visited).
+    """
+    stakes = np.asarray(stakes)
+    order = np.argsort(dist_matrix, axis=1, kind='stable')
+
+    units = StakeUnits.from_stakes(stakes)
+    if units is not None:
+        # Exact: integer unit sums against the smallest integer at least fraction of the total
+        reached = units.cumsum_reaches(order, units.threshold(fraction), axis=1)
+    else:
+        reached = np.cumsum(stakes[order], axis=1) >= stakes.sum() * fraction
+    # Position of the neighbour completing the quorum (the last one if rounding keeps it out of reach)
+    crossing = np.where(reached.any(axis=1), np.argmax(reached, axis=1), len(stakes) - 1)
+    travelled = np.cumsum(np.take_along_axis(dist_matrix, order, axis=1), axis=1)
+
+    gdi = np.take_along_axis(travelled, crossing[:, None], axis=1)[:, 0] if len(stakes) else np.zeros(0)
+    return gdi, int((crossing + 1).sum())
+
 
 class GDI_Calculator:
     def __init__(self, df, logger=None):
         """
         Initialize the GDI_Calculator class with a pandas DataFrame and a logger.
 
-        :param df: A pandas DataFrame with 'uuid', 'latitude', 'longitude', and 'stake_weight'.
+        :param df: A pandas DataFrame or ValidatorSet with 'uuid', 'latitude', 'longitude', and 'stake_weight'.
+                   A ValidatorSet is processed on its arrays: the distance matrix is a NumPy array (see
+                   ValidatorSet.distance_matrix), and the results are ValidatorSets.
         :param logger: Logger function to handle logging instead of print.
         """
         self.df = df
+        self.counters = {}  # Algorithm totals for the instrumentation
         self.dist_matrix = self._getDistanceMatrix()
         self.logger = logger if logger else print  # Default to print if no logger provided
 
@@ -18,8 +84,13 @@ class GDI_Calculator:
         """
         Calculates the distance matrix between servers using the Haversine formula.
 
-        :return: A pandas DataFrame representing the distance matrix between all servers.
+        :return: A pandas DataFrame representing the distance matrix between all servers
+                 (a NumPy array in row order for a ValidatorSet).
         """
+        if isinstance(self.df, ValidatorSet):
+            self.counters['distances_computed'] = len(self.df) ** 2
+            return self.df.distance_matrix()
+
         dist = pd.DataFrame(columns=self.df["uuid"], index=self.df["uuid"])
 
         for source in self.df.index:
@@ -30,6 +101,7 @@ class GDI_Calculator:
                 d_coords = (self.df["latitude"][destination], self.df["longitude"][destination])
                 # Calculate distance using Haversine formula
                 dist.at[s_uuid, d_uuid] = hs.haversine(s_coords, d_coords)
+        self.counters['distances_computed'] = len(self.df) ** 2
         return dist
 
     def merge_closest_validators(self, threshold_distance=20):
@@ -38,8 +110,11 @@ class GDI_Calculator:
         Precompute all pairs below the threshold, then merge them.
 
         :param threshold_distance: The distance threshold (in km) for merging validators.
-        :return: A cleaned pandas DataFrame.
+        :return: A cleaned pandas DataFrame (ValidatorSet for a ValidatorSet).
         """
+        if isinstance(self.df, ValidatorSet):
+            return self._merge_closest_validators_set(threshold_distance)
+
         # Step 1: Precompute all pairs below the threshold distance
         dist_matrix = self.dist_matrix
         merge_pairs = []
@@ -52,6 +127,9 @@ class GDI_Calculator:
                 ):
                     merge_pairs.append((source_uuid, destination_uuid, dist_matrix.at[source_uuid, destination_uuid]))
 
+        self.counters['pairs_evaluated'] = len(dist_matrix.columns) * len(dist_matrix.index)
+        self.counters['merge_candidates'] = len(merge_pairs)
+
         # Sort pairs by distance to prioritize merging closer pairs
         merge_pairs.sort(key=lambda x: x[2])  # Sort by the distance (3rd element in tuple)
 
@@ -70,6 +148,8 @@ class GDI_Calculator:
                     # Mark destination UUID for removal
                     merged_uuids.add(destination_uuid)
 
+        self.counters['merges'] = len(merged_uuids)
+
         # Step 3: Drop merged UUIDs from the dataframe and dist_matrix
         self.df = self.df[~self.df["uuid"].isin(merged_uuids)]
         dist_matrix.drop(index=merged_uuids, columns=merged_uuids, inplace=True)
@@ -78,6 +158,37 @@ class GDI_Calculator:
         self.logger(f"No. of rows post close proximity merge, under {threshold_distance}km: {len(self.df)}")
         return self.df
 
+    def _merge_closest_validators_set(self, threshold_distance):
+        """
+        merge_closest_validators on a ValidatorSet. Candidate pairs are found on the distance array in one pass;
+        only the greedy merge of the sorted candidates, which depends on earlier merges, is a loop.
+        """
+        n = len(self.df)
+        owner, merged, candidates = closest_merge_owners(self.dist_matrix, threshold_distance)
+        self.counters['pairs_evaluated'] = n * n
+        self.counters['merge_candidates'] = candidates
+        self.counters['merges'] = int(merged.sum())
+        stakes = group_sum(self.df['stake_weight'], owner, n)
+
+        self.df = self.df[~merged]
+        self.df['stake_weight'] = stakes[~merged]
+        self.dist_matrix = self.dist_matrix[~merged][:, ~merged]
+
+        self.logger(f"No. of rows post close proximity merge, under {threshold_distance}km: {len(self.df)}")
+        return self.df
+
+    def _calculate_GDI_set(self):
+        """
+        calculate_GDI on a ValidatorSet, see gdi_from_distances.
+        """
+        gdi, neighbours_visited = gdi_from_distances(self.dist_matrix, self.df['stake_weight'])
+        self.df = self.df[:]
+        self.df['GDI'] = gdi if len(gdi) else 0.0
+        self.counters['neighbours_visited'] = neighbours_visited
+
+        print(f"GDI calculation completed. ValidatorSet size: {len(self.df)} rows")
+        return self.df
+
     def calculate_GDI(self):
         """
         Calculates the GeoSpatial Diversity Index (GDI) for the servers based on their pairwise distances
@@ -85,24 +196,29 @@ class GDI_Calculator:
 
         The GDI metric is added as a new column 'GDI' in self.df.
         """
+        if isinstance(self.df, ValidatorSet):
+            return self._calculate_GDI_set()
+
         # Get the distance matrix
         dist_matrix = self.dist_matrix
 
-        # Calculate the total stake weight
-        total_weight = self.df["stake_weight"].sum()
-
-        # Define the two-third weight threshold
-        two_third_weight_threshold = total_weight * (2 / 3)
+        # Get the stake weight of each server in the distance matrix, in exact base units where possible
+        units = StakeUnits.from_stakes(self.df["stake_weight"].to_numpy())
+        if units is not None:
+            server_weights = pd.Series(units.units, index=self.df["uuid"].to_numpy())
+            two_third_weight_threshold = units.threshold(2 / 3)
+        else:
+            server_weights = self.df.set_index("uuid")["stake_weight"]
+            # Calculate the total stake weight and define the two-third weight threshold
+            two_third_weight_threshold = self.df["stake_weight"].sum() * (2 / 3)
 
         # Initialize the 'GDI' column in the DataFrame
         self.df = self.df.copy()
         self.df.loc[:, "GDI"] = 0.0
 
         # Loop through each server and calculate the GDI metric
+        neighbours_visited = 0
         for uuid in self.df["uuid"]:
-            # Get the stake weight of each server in the distance matrix
-            server_weights = self.df.set_index("uuid")["stake_weight"]
-
             total_weight_accumulated = 0
             two_third_sum = 0
 
@@ -111,8 +227,9 @@ class GDI_Calculator:
 
             for dest_uuid, dist in sorted_distances:
                 # Accumulate the stake weight until the two-thirds threshold is reached
-                total_weight_accumulated += server_weights[dest_uuid]
+                total_weight_accumulated += server_weights[dest_uuid].item()  # Python number, cannot overflow
                 two_third_sum += dist
+                neighbours_visited += 1
 
                 if total_weight_accumulated >= two_third_weight_threshold:
                     break
@@ -120,6 +237,8 @@ class GDI_Calculator:
             # Directly update the 'GDI' column for the current uuid
             self.df.loc[self.df["uuid"] == uuid, "GDI"] = two_third_sum
 
+        self.counters['neighbours_visited'] = neighbours_visited
+
         # Log the final DataFrame with GDI calculated
         print(f"GDI calculation completed. DataFrame size: {len(self.df)} rows")
         return self.df
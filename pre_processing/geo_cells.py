@@ -0,0 +1,107 @@
+import numpy as np
+
+# Cell ids of level L use 2 * L bits, so levels up to 30 fit in int64
+MAX_LEVEL = 30
+
+
+def _spread_bits(values):
+    """
+    Spreads the lower 32 bits of each value to the even bit positions (Morton / z-order encoding).
+    """
+    values = values.astype(np.uint64) & np.uint64(0xFFFFFFFF)
+    for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+                        (2, 0x3333333333333333), (1, 0x5555555555555555)):
+        values = (values | (values << np.uint64(shift))) & np.uint64(mask)
+    return values
+
+
+def _compact_bits(values):
+    """
+    Inverse of _spread_bits: collects the even bits of each value.
+    """
+    values = values.astype(np.uint64) & np.uint64(0x5555555555555555)
+    for shift, mask in ((1, 0x3333333333333333), (2, 0x0F0F0F0F0F0F0F0F), (4, 0x00FF00FF00FF00FF),
+                        (8, 0x0000FFFF0000FFFF), (16, 0x00000000FFFFFFFF)):
+        values = (values | (values >> np.uint64(shift))) & np.uint64(mask)
+    return values
+
+
+def cell_column(level):
+    """
+    Name of the cell id column of a level.
+    """
+    return f'cell_{level}'
+
+
+def cell_ids(latitudes, longitudes, level):
+    """
+    Equal-area hierarchical cell id of every coordinate.
+
+    The sphere is mapped to the unit square with the cylindrical equal-area projection
+    (x from longitude, y from sin(latitude)) and split into 4^level cells of equal area.
+    Cells are numbered in z-order, so the parent of a cell is simply cell >> 2.
+
+    :param latitudes: Array of latitudes.
+    :param longitudes: Array of longitudes.
+    :param level: Resolution; each level splits every cell into four.
+    :return: int64 array of cell ids.
+    """
+    if not 0 <= level <= MAX_LEVEL:
+        raise ValueError(f'Cell level must be between 0 and {MAX_LEVEL}, got {level}.')
+    size = 2 ** level
+    x = (np.asarray(longitudes, dtype=float) + 180) / 360
+    y = (np.sin(np.radians(np.asarray(latitudes, dtype=float))) + 1) / 2
+    column = np.clip(np.floor(x * size), 0, size - 1)
+    row = np.clip(np.floor(y * size), 0, size - 1)
+    return (_spread_bits(column) | (_spread_bits(row) << np.uint64(1))).astype(np.int64)
+
+
+def parent_cells(cells, level, parent_level):
+    """
+    Maps cell ids of a level to the cells containing them at a coarser level.
+    """
+    if parent_level > level:
+        raise ValueError(f'Parent level {parent_level} is finer than level {level}.')
+    return np.asarray(cells, dtype=np.int64) >> (2 * (level - parent_level))
+
+
+def cell_centers(cells, level):
+    """
+    Latitude and longitude of the centre of each cell (in the equal-area projection).
+
+    :return: Tuple (latitudes, longitudes).
+    """
+    cells = np.asarray(cells, dtype=np.int64).astype(np.uint64)
+    size = 2 ** level
+    x = (_compact_bits(cells).astype(float) + 0.5) / size
+    y = (_compact_bits(cells >> np.uint64(1)).astype(float) + 0.5) / size
+    return np.degrees(np.arcsin(2 * y - 1)), 360 * x - 180
+
+
+class GeoCellIndexer:
+    def __init__(self, df, logger=None):
+        """
+        Initializes the GeoCellIndexer with a pandas DataFrame and a logger.
+
+        :param df: pandas DataFrame with 'latitude' and 'longitude'.
+        :param logger: Logger function to handle logging instead of print.
+        """
+        self.df = df
+        self.logger = logger if logger else print  # Default to print if no logger provided
+
+    def assign_cells(self, levels=(4, 6, 8, 10)):
+        """
+        Adds an integer cell id column 'cell_<level>' for every level. At level L a cell covers
+        about 510 million km² / 4^L (level 4: ~1400 km across, level 8: ~90 km, level 10: ~22 km).
+
+        :param levels: Cell resolutions to store.
+        """
+        for level in levels:
+            self.df[cell_column(level)] = cell_ids(self.df['latitude'], self.df['longitude'], level)
+            self.logger(f'Level {level} cells: {self.df[cell_column(level)].nunique()}')
+
+    def get_indexed_data(self):
+        """
+        Returns the DataFrame with the cell id columns.
+        """
+        return self.df
@@ -0,0 +1,133 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def max_rss_mb():
+    """
+    Peak resident set size of the process so far in MB, or None where the platform does not report it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+class Instrumentation:
+    def __init__(self, trace_memory=False):
+        """
+        Records wall time, CPU time, memory and algorithm counters per stage and chain.
+
+        Measurements happen once at the start and end of a stage; counters are added once per stage from
+        totals the algorithms keep themselves, so nothing is printed or written inside loops.
+
+        :param trace_memory: Also record the tracemalloc peak of every stage (slows down allocation-heavy code).
+        """
+        self.trace_memory = trace_memory
+        self.records = []
+        self._active = []
+
+    @contextmanager
+    def stage(self, stage, chain=None):
+        """
+        Context manager measuring one stage. Stages can be nested; counters go to the innermost one.
+
+        :param stage: Stage name.
+        :param chain: Chain (input file) the stage works on.
+        """
+        record = {'chain': chain, 'stage': stage, 'counters': {}}
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                record['_started_tracing'] = True
+            elif self._active:
+                # Keep the enclosing stage's peak before resetting it for this one
+                parent = self._active[-1]
+                parent['_peak'] = max(parent.get('_peak', 0), tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self._active.append(record)
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall_seconds'] = time.perf_counter() - wall_start
+            record['cpu_seconds'] = time.process_time() - cpu_start
+            record['max_rss_mb'] = max_rss_mb()
+            self._active.pop()
+            if self.trace_memory:
+                peak = max(record.pop('_peak', 0), tracemalloc.get_traced_memory()[1])
+                record['tracemalloc_peak_mb'] = peak / 2 ** 20
+                if record.pop('_started_tracing', False):
+                    tracemalloc.stop()
+                elif self._active:
+                    self._active[-1]['_peak'] = max(self._active[-1].get('_peak', 0), peak)
+            self.records.append(record)
+
+    def count(self, name, value=1):
+        """
+        Adds to a counter of the innermost open stage (ignored outside of stages).
+        """
+        if self._active:
+            counters = self._active[-1]['counters']
+            counters[name] = counters.get(name, 0) + value
+
+    def add_counters(self, counters):
+        """
+        Adds a dictionary of counter totals to the innermost open stage.
+        """
+        for name, value in counters.items():
+            self.count(name, value)
+
+    def write_jsonl(self, path):
+        """
+        Appends one JSON line per finished stage, with a timestamp, so repeated runs build up a history.
+        """
+        timestamp = time.time()
+        with open(path, 'a') as f:
+            for record in self.records:
+                f.write(json.dumps({'timestamp': timestamp, **record}) + '\n')
+
+    def write_prometheus(self, path, prefix='geo_analysis'):
+        """
+        Writes the latest run in the Prometheus text exposition format (e.g. for the node exporter textfile
+        collector). The file is replaced atomically.
+        """
+        metrics = {
+            'wall_seconds': ('gauge', 'Wall time of the stage in seconds.'),
+            'cpu_seconds': ('gauge', 'CPU time of the stage in seconds.'),
+            'max_rss_mb': ('gauge', 'Peak resident set size of the process at the end of the stage in MB.'),
+            'tracemalloc_peak_mb': ('gauge', 'Peak traced allocations during the stage in MB.'),
+        }
+        lines = []
+        for metric, (kind, description) in metrics.items():
+            samples = [record for record in self.records if record.get(metric) is not None]
+            if not samples:
+                continue
+            lines += [f'# HELP {prefix}_stage_{metric} {description}', f'# TYPE {prefix}_stage_{metric} {kind}']
+            lines += [f'{prefix}_stage_{metric}{{{_labels(record)}}} {record[metric]}' for record in samples]
+
+        counter_lines = [
+            f'{prefix}_stage_counter{{{_labels(record)},counter="{name}"}} {value}'
+            for record in self.records for name, value in record['counters'].items()
+        ]
+        if counter_lines:
+            lines += [f'# HELP {prefix}_stage_counter Algorithm counters of the stage.',
+                      f'# TYPE {prefix}_stage_counter gauge'] + counter_lines
+
+        temporary_path = f'{path}.tmp'
+        with open(temporary_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(temporary_path, path)
+
+
+def _labels(record):
+    return f'chain="{record["chain"] or ""}",stage="{record["stage"]}"'
@@ -1,16 +1,21 @@
 import os
 import pandas as pd
 
-from data_cleaner import DataCleaner
-from gdi_calculator import GDI_Calculator
-from opencage.geocoder import OpenCageGeocode
+from pre_processing.data_cleaner import DataCleaner
+from pre_processing.gdi_calculator import GDI_Calculator
+from pre_processing.geo_cells import GeoCellIndexer
+from pre_processing.instrumentation import Instrumentation
+from pre_processing.validator_set import ValidatorSet
 
 class Preprocessing:
-    def __init__(self, require_country=False, key='0', input_folder='data/', output_folder='data/pre_processed_data/'):
+    def __init__(self, require_country=False, key='0', input_folder='data/', output_folder='data/pre_processed_data/', cell_levels=(4, 6, 8, 10), trace_memory=False):
         self.input_folder = input_folder
+        self.cell_levels = cell_levels
         self.files = self._get_all_files()
         self.output_folder = output_folder
         self.log = []
+        # Per-stage time, memory and counters, saved as metrics.jsonl and metrics.prom
+        self.instrumentation = Instrumentation(trace_memory=trace_memory)
 
         # Ensure the output folder exists
         if not os.path.exists(self.output_folder):
@@ -18,6 +23,8 @@ class Preprocessing:
         
         self.require_country = require_country
         if self.require_country:
+            # Only needed for reverse geocoding; keeps the default run free of the HTTP client stack
+            from opencage.geocoder import OpenCageGeocode
             self.geocoder = OpenCageGeocode(key)
     
     def _get_all_files(self):
@@ -57,30 +64,54 @@ class Preprocessing:
         then save the processed files into the pre_processed_data folder.
         """
         for file in self.files:
-            df = pd.read_csv(os.path.join(self.input_folder, file),encoding='ISO-8859-1')
+            chain = os.path.splitext(file)[0]
+            with self.instrumentation.stage('read', chain):
+                df = pd.read_csv(os.path.join(self.input_folder, file),encoding='ISO-8859-1')
+                self.instrumentation.count('rows', len(df))
+                # One set of arrays shared by the cleaning, merge and GDI stages
+                validators = ValidatorSet.from_dataframe(df)
             self.log_message(f'{file} rows: {len(df)}')
 
             # Clean the data with the logger passed down
-            cleaner = DataCleaner(df, logger=self.log_message)
-            # 1. If latitude, longitude are missing, drop them. Format them in float.    
-            # 2. If latitude and longitude are same value, merge them and add stake weight
-            cleaner.clean_data(threshold_percentage=33.0)
-            cleaned_df = cleaner.get_cleaned_data()
+            with self.instrumentation.stage('clean_data', chain):
+                cleaner = DataCleaner(validators, logger=self.log_message)
+                # 1. If latitude, longitude are missing, drop them. Format them in float.    
+                # 2. If latitude and longitude are same value, merge them and add stake weight
+                cleaner.clean_data(threshold_percentage=33.0)
+                cleaned_df = cleaner.get_cleaned_data()
+                self.instrumentation.add_counters(cleaner.counters)
 
             # Distance and GDI Calculations for validators
-            gdi_calculator = GDI_Calculator(cleaned_df, logger=self.log_message)
+            with self.instrumentation.stage('distance_matrix', chain):
+                gdi_calculator = GDI_Calculator(cleaned_df, logger=self.log_message)
+                self.instrumentation.add_counters(gdi_calculator.counters)
             # Merge validators within 20km proximity (units=km)
             # NOTE: 20km is arbitrary, can be any value  
-            gdi_calculator.merge_closest_validators(threshold_distance=20)
-            gdi_results = gdi_calculator.calculate_GDI()
+            with self.instrumentation.stage('proximity_merge', chain):
+                gdi_calculator.merge_closest_validators(threshold_distance=20)
+                self.instrumentation.add_counters({name: gdi_calculator.counters[name]
+                                                   for name in ('pairs_evaluated', 'merge_candidates', 'merges')})
+            with self.instrumentation.stage('calculate_GDI', chain):
+                gdi_results = gdi_calculator.calculate_GDI().to_dataframe()
+                self.instrumentation.count('neighbours_visited', gdi_calculator.counters['neighbours_visited'])
             
             if self.require_country:
-                gdi_results['country'] = gdi_results.apply(lambda row: self.get_country(row['latitude'], row['longitude']), axis=1)
+                with self.instrumentation.stage('geocode', chain):
+                    gdi_results['country'] = gdi_results.apply(lambda row: self.get_country(row['latitude'], row['longitude']), axis=1)
+                    self.instrumentation.count('geocoder_calls', len(gdi_results))
                 self.log_message('Added country data using OpenCage API')
+
+            # Hierarchical equal-area cell ids, for region metrics without a geocoder
+            with self.instrumentation.stage('cell_index', chain):
+                indexer = GeoCellIndexer(gdi_results, logger=self.log_message)
+                indexer.assign_cells(levels=self.cell_levels)
+                gdi_results = indexer.get_indexed_data()
                 
             # Save the data to CSV
-            output_file_path = os.path.join(self.output_folder, file)
-            gdi_results.to_csv(output_file_path, index=False)
+            with self.instrumentation.stage('save', chain):
+                output_file_path = os.path.join(self.output_folder, file)
+                gdi_results.to_csv(output_file_path, index=False)
+                self.instrumentation.count('rows', len(gdi_results))
             self.log_message(f'File saved: {output_file_path}\n')
 
         # Print where the files are saved
@@ -88,6 +119,7 @@ class Preprocessing:
 
         # Save all logs to a log file
         self.save_logs()
+        self.save_metrics()
 
     def save_logs(self):
         """
@@ -99,7 +131,15 @@ class Preprocessing:
                 f.write(entry + '\n')
         print(f"Log saved to: {log_file}")
 
-# USAGE
+    def save_metrics(self):
+        """
+        Save the per-stage measurements as JSON lines (appended) and in the Prometheus text format.
+        """
+        self.instrumentation.write_jsonl(os.path.join(self.output_folder, 'metrics.jsonl'))
+        self.instrumentation.write_prometheus(os.path.join(self.output_folder, 'metrics.prom'))
+        print(f"Metrics saved to: {self.output_folder}")
+
+# USAGE (from the repository root): python -m pre_processing.pre_process_data
 preprocessing = Preprocessing() 
 # preprocessing = Preprocessing(require_country=True,key='key') # Replace with your OpenCage API key if you need country data, else you do not need it. 
 preprocessing.process_files()
\ No newline at end of file
@@ -0,0 +1,220 @@
+from fractions import Fraction
+
+import numpy as np
+
+# Stakes are split into two int64 limbs, value = high * 2 ** 32 + low, so sums of up to 2 ** 31 values
+# cannot overflow either limb
+LIMB_BITS = 32
+LIMB_MASK = (1 << LIMB_BITS) - 1
+MAX_LENGTH = 1 << 31
+INT64_MAX = int(np.iinfo(np.int64).max)
+
+# Decimal places tried when rescaling float stakes (e.g. 56.73 -> 5673 units of 0.01)
+MAX_DECIMALS = 9
+
+
+def to_fraction(value, max_denominator=10 ** 6):
+    """
+    Exact fraction of a quorum or threshold given as a float, e.g. 2 / 3 -> Fraction(2, 3), 0.33 -> Fraction(33, 100).
+    """
+    if isinstance(value, Fraction):
+        return value
+    return Fraction(value).limit_denominator(max_denominator)
+
+
+def to_base_units(stakes, max_decimals=MAX_DECIMALS):
+    """
+    Rescales stakes to int64 multiples of a common base unit, stake = units * unit.
+
+    Integer stakes are divided by their greatest common divisor. Float stakes are scaled by the smallest power of
+    ten (up to 10 ** max_decimals) that makes all of them integral up to float rounding, then divided the same way.
+
+    :param stakes: Array of stakes.
+    :param max_decimals: Largest number of decimal places of float stakes.
+    :return: Tuple (units, unit) with an int64 array and the unit as a Fraction, or None if the stakes have no
+             such representation (negative, not finite, too many decimals or beyond int64).
+    """
+    stakes = np.asarray(stakes)
+    if stakes.dtype.kind in 'iub':
+        if stakes.size and (stakes.min() < 0 or int(stakes.max()) > INT64_MAX):
+            return None
+        units, decimals = stakes.astype(np.int64), 0
+    elif stakes.dtype.kind == 'f':
+        if not np.isfinite(stakes).all() or (stakes < 0).any():
+            return None
+        tolerance = 4 * np.finfo(float).eps
+        for decimals in range(max_decimals + 1):
+            scaled = stakes * 10.0 ** decimals
+            if (scaled >= 2.0 ** 63).any():
+                return None
+            rounded = np.rint(scaled)
+            if np.all(np.abs(scaled - rounded) <= tolerance * scaled):
+                units = rounded.astype(np.int64)
+                break
+        else:
+            return None
+    else:
+        return None
+
+    divisor = int(np.gcd.reduce(units)) if units.size else 0
+    if divisor > 1:
+        units = units // divisor
+    return units, Fraction(max(divisor, 1), 10 ** decimals)
+
+
+def _check_length(length):
+    if length >= MAX_LENGTH:
+        raise OverflowError(f'Sums over {length} stakes can overflow the int64 limbs (limit {MAX_LENGTH - 1}).')
+
+
+def exact_sum(units):
+    """
+    Exact sum of non-negative int64 units as a Python int, accumulated in two int64 limbs.
+    """
+    units = np.asarray(units, dtype=np.int64).ravel()
+    _check_length(len(units))
+    return (int(np.sum(units >> LIMB_BITS)) << LIMB_BITS) + int(np.sum(units & LIMB_MASK))
+
+
+def cumulative_limbs(units, axis=-1):
+    """
+    Exact cumulative sums of non-negative int64 units along an axis, as two int64 limbs.
+
+    :return: Tuple (high, low) with sum = high * 2 ** 32 + low and 0 <= low < 2 ** 32.
+    """
+    _check_length(units.shape[axis])
+    high = np.cumsum(units >> LIMB_BITS, axis=axis)
+    low = np.cumsum(units & LIMB_MASK, axis=axis)
+    return high + (low >> LIMB_BITS), low & LIMB_MASK
+
+
+def limbs_at_least(high, low, threshold):
+    """
+    Compares sums given as limbs (see cumulative_limbs) with a non-negative Python int threshold.
+    """
+    threshold_high, threshold_low = threshold >> LIMB_BITS, threshold & LIMB_MASK
+    if threshold_high > INT64_MAX:
+        return np.zeros(high.shape, dtype=bool)
+    return (high > threshold_high) | ((high == threshold_high) & (low >= threshold_low))
+
+
+class StakeUnits:
+    def __init__(self, units, unit):
+        """
+        Stakes as int64 counts of a common base unit, for exact totals, group sums and quorum comparisons.
+
+        The total is exact at any size (two-limb accumulation). While it fits in int64, every partial or
+        group sum of the non-negative units does too, so plain int64 cumulative sums are used; beyond that the
+        cumulative sums are taken in limbs. No step uses Python objects per element.
+
+        :param units: Non-negative int64 array, see to_base_units.
+        :param unit: Stake of one unit as a Fraction.
+        """
+        self.units = units
+        self.unit = unit
+        self.total = exact_sum(units)
+
+    @classmethod
+    def from_stakes(cls, stakes, max_decimals=MAX_DECIMALS):
+        """
+        Builds the exact representation of an array of stakes.
+
+        :return: StakeUnits, or None if the stakes have no common base unit (see to_base_units).
+        """
+        base = to_base_units(stakes, max_decimals)
+        return cls(*base) if base is not None else None
+
+    def __len__(self):
+        return len(self.units)
+
+    def sum(self, mask=None):
+        """
+        Exact number of units of all stakes, or of the masked ones, as a Python int.
+        """
+        return self.total if mask is None else exact_sum(self.units[mask])
+
+    def total_stake(self):
+        """
+        Exact total stake: a Python int for integral stakes, the nearest float otherwise.
+        """
+        total = self.total * self.unit
+        return total.numerator if total.denominator == 1 else float(total)
+
+    def threshold(self, fraction, strict=False):
+        """
+        Smallest number of units at least (strict: more than) fraction of the total, so that comparisons of
+        integer sums with it are exact.
+
+        :param fraction: Fraction of the total stake, as a float (e.g. 2 / 3) or Fraction.
+        """
+        fraction = to_fraction(fraction)
+        if strict:
+            return fraction.numerator * self.total // fraction.denominator + 1
+        return -(-fraction.numerator * self.total // fraction.denominator)
+
+    def cumsum_reaches(self, positions, threshold, axis=-1):
+        """
+        Flags where the cumulative sum of the units at the given positions reaches the threshold.
+
+        :param positions: Index array into the stakes, e.g. every validator's neighbours sorted by distance.
+        :param threshold: Number of units, see threshold.
+        :param axis: Axis of the accumulation.
+        :return: Boolean array shaped like positions.
+        """
+        units = self.units[positions]
+        if self.total <= INT64_MAX:
+            return np.cumsum(units, axis=axis) >= threshold
+        return limbs_at_least(*cumulative_limbs(units, axis=axis), threshold)
+
+    def to_stakes(self, units):
+        """
+        Converts unit counts back to stakes: int64 for integral stakes that fit, float64 otherwise (the nearest
+        float to the decimal value while the scaled count stays below 2 ** 53).
+        """
+        units = np.asarray(units, dtype=np.int64)
+        numerator, denominator = self.unit.numerator, self.unit.denominator
+        fits = units.size == 0 or int(units.max()) * numerator <= INT64_MAX
+        if fits and denominator == 1:
+            return units * numerator
+        if fits:
+            return units * numerator / denominator
+        return units.astype(float) * (numerator / denominator)
+
+    def group_sums(self, labels, n_groups):
+        """
+        Exact stake per group.
+
+        :param labels: Group (0 to n_groups - 1) of every stake.
+        :param n_groups: Number of groups.
+        :return: Array of n_groups stakes, see to_stakes; float64 if a group exceeds int64 units.
+        """
+        labels = np.asarray(labels, dtype=np.intp).ravel()
+        if self.total <= INT64_MAX:
+            sums = np.zeros(n_groups, dtype=np.int64)
+            np.add.at(sums, labels, self.units)
+            return self.to_stakes(sums)
+        _check_length(len(self.units))
+        high, low = np.zeros(n_groups, dtype=np.int64), np.zeros(n_groups, dtype=np.int64)
+        np.add.at(high, labels, self.units >> LIMB_BITS)
+        np.add.at(low, labels, self.units & LIMB_MASK)
+        high, low = high + (low >> LIMB_BITS), low & LIMB_MASK
+        if not n_groups or int(high.max()) <= INT64_MAX >> LIMB_BITS:
+            return self.to_stakes((high << LIMB_BITS) + low)
+        return (high.astype(float) * 2.0 ** LIMB_BITS + low) * (self.unit.numerator / self.unit.denominator)
+
+
+def group_sum(stakes, labels, n_groups):
+    """
+    Stake per group, summed exactly in base units when the stakes have one (see StakeUnits.group_sums) and
+    in float64 otherwise.
+
+    :param stakes: Array of stakes.
+    :param labels: Group (0 to n_groups - 1) of every stake.
+    :param n_groups: Number of groups.
+    :return: Array of n_groups stakes.
+    """
+    units = StakeUnits.from_stakes(stakes)
+    if units is not None:
+        return units.group_sums(labels, n_groups)
+    return np.bincount(np.asarray(labels, dtype=np.intp).ravel(), weights=np.asarray(stakes, dtype=float),
+                       minlength=n_groups)
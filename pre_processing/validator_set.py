@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+
+from utils.spatial import haversine_matrix, to_unit_vectors
+
+CORE_COLUMNS = ('uuid', 'latitude', 'longitude', 'stake_weight')
+
+
+def _stake_array(values):
+    """
+    Stakes keep an integer dtype when they are integral (exact sums), anything else becomes float64.
+    """
+    values = np.asarray(values)
+    return np.ascontiguousarray(values, dtype=np.int64 if values.dtype.kind in 'iub' else float)
+
+
+class ValidatorSet:
+    def __init__(self, uuid_codes, uuid_table, latitudes, longitudes, stakes, columns=None, unit=None):
+        """
+        Validators as contiguous NumPy arrays (struct of arrays), shared by the pre-processing stages
+        instead of copying DataFrames between them.
+
+        Rows are indexed like a DataFrame: a column name returns the column array, a slice returns a set
+        whose arrays are views of this one, and a boolean mask or index array returns a set with the selected
+        rows gathered once. Assigning a column rebinds it on this set only, so sets sharing arrays never see
+        each other's updates. Uuids are interned: every row holds a code into one table shared by all sets
+        derived from the same source.
+
+        :param uuid_codes: Integer code of every row's uuid in uuid_table.
+        :param uuid_table: Array of the distinct uuids.
+        :param latitudes: Latitudes in degrees.
+        :param longitudes: Longitudes in degrees.
+        :param stakes: Stake weights, int64 when integral and float64 otherwise.
+        :param columns: Optional dictionary of further columns (e.g. 'GDI'), in column order.
+        :param unit: Precomputed (n, 3) unit vectors of the coordinates, computed when not given.
+        """
+        self.uuid_codes = np.asarray(uuid_codes)
+        self.uuid_table = uuid_table
+        self._data = {
+            'latitude': np.ascontiguousarray(latitudes, dtype=float),
+            'longitude': np.ascontiguousarray(longitudes, dtype=float),
+            'stake_weight': _stake_array(stakes),
+        }
+        self.columns = list(CORE_COLUMNS)
+        for name, values in (columns or {}).items():
+            self._data[name] = np.asarray(values)
+            self.columns.append(name)
+        self.unit = unit if unit is not None else to_unit_vectors(self._data['latitude'], self._data['longitude'])
+
+    @classmethod
+    def from_arrays(cls, uuids, latitudes, longitudes, stakes, **columns):
+        """
+        Builds a set from plain arrays, interning the uuids.
+        """
+        codes, table = pd.factorize(np.asarray(uuids, dtype=object), use_na_sentinel=False)
+        return cls(codes, np.asarray(table, dtype=object), latitudes, longitudes, stakes, columns)
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """
+        Builds a set from a DataFrame with 'uuid', 'latitude', 'longitude', 'stake_weight' and optional
+        further columns, which are kept. Float columns are taken without a copy where pandas allows it.
+        """
+        missing = [column for column in CORE_COLUMNS if column not in df.columns]
+        if missing:
+            raise ValueError(f"Columns {missing} are missing. 'uuid', 'latitude', 'longitude' and 'stake_weight' are required.")
+        validators = cls.from_arrays(
+            df['uuid'].to_numpy(),
+            df['latitude'].to_numpy(dtype=float),
+            df['longitude'].to_numpy(dtype=float),
+            df['stake_weight'].to_numpy(),
+            **{column: df[column].to_numpy() for column in df.columns if column not in CORE_COLUMNS},
+        )
+        # Keep the column order of the DataFrame for the round trip
+        validators.columns = list(df.columns)
+        return validators
+
+    def to_dataframe(self):
+        """
+        Returns the set as a DataFrame in column order; only the uuid column is materialized from the table.
+        """
+        return pd.DataFrame({column: self[column] for column in self.columns})
+
+    def __len__(self):
+        return len(self.uuid_codes)
+
+    def __repr__(self):
+        return f'ValidatorSet({len(self)} validators, columns={self.columns})'
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key == 'uuid':
+                return self.uuid_table[self.uuid_codes]
+            if key not in self._data:
+                raise KeyError(key)
+            return self._data[key]
+        return self._rows(key)
+
+    def __setitem__(self, name, values):
+        """
+        Sets a column. Scalars are broadcast; new coordinates update the unit vectors.
+        """
+        values = np.asarray(values)
+        if values.ndim == 0:
+            values = np.full(len(self), values[()])
+        if len(values) != len(self):
+            raise ValueError(f"Column '{name}' has {len(values)} values for {len(self)} validators.")
+        if name == 'uuid':
+            codes, table = pd.factorize(values.astype(object), use_na_sentinel=False)
+            self.uuid_codes, self.uuid_table = codes, np.asarray(table, dtype=object)
+        elif name == 'stake_weight':
+            self._data[name] = _stake_array(values)
+        elif name in ('latitude', 'longitude'):
+            self._data[name] = np.ascontiguousarray(values, dtype=float)
+            self.unit = to_unit_vectors(self._data['latitude'], self._data['longitude'])
+        else:
+            self._data[name] = values
+        if name not in self.columns:
+            self.columns.append(name)
+
+    def _rows(self, key):
+        """
+        Row selection: slices give views of every array, masks and index arrays gather the rows.
+        The uuid table is shared either way.
+        """
+        if not isinstance(key, slice):
+            key = np.asarray(key)
+            if key.dtype == bool and len(key) != len(self):
+                raise IndexError(f'Mask of length {len(key)} for {len(self)} validators.')
+        columns = {name: self._data[name][key] for name in self.columns if name not in CORE_COLUMNS}
+        validators = ValidatorSet(
+            self.uuid_codes[key],
+            self.uuid_table,
+            self._data['latitude'][key],
+            self._data['longitude'][key],
+            self._data['stake_weight'][key],
+            columns,
+            unit=self.unit[key],
+        )
+        validators.columns = list(self.columns)
+        return validators
+
+    def take(self, indices):
+        """
+        Returns the rows at the given positions.
+        """
+        return self._rows(np.asarray(indices, dtype=np.intp))
+
+    def select(self, columns):
+        """
+        Returns a set with the given columns in that order, sharing all arrays. The core columns are always
+        kept, after the given ones if they are not listed.
+        """
+        validators = self[:]
+        validators._data = {name: values for name, values in validators._data.items()
+                            if name in CORE_COLUMNS or name in columns}
+        validators.columns = [name for name in columns if name == 'uuid' or name in validators._data]
+        validators.columns += [name for name in CORE_COLUMNS if name not in validators.columns]
+        return validators
+
+    def copy(self):
+        """
+        Returns a set with its own copy of every array (the uuid table stays shared, it is never modified).
+        """
+        columns = {name: self._data[name].copy() for name in self.columns if name not in CORE_COLUMNS}
+        validators = ValidatorSet(
+            self.uuid_codes.copy(),
+            self.uuid_table,
+            self._data['latitude'].copy(),
+            self._data['longitude'].copy(),
+            self._data['stake_weight'].copy(),
+            columns,
+            unit=self.unit.copy(),
+        )
+        validators.columns = list(self.columns)
+        return validators
+
+    def head(self, n=5):
+        """
+        First n rows as a DataFrame, for printing.
+        """
+        return self[:n].to_dataframe()
+
+    def distance_matrix(self, other=None, block_size=1024):
+        """
+        Pairwise great-circle distances in km (see utils.spatial.haversine_matrix), the haversine formula of the
+        DataFrame path of GDI_Calculator, so equal distances (frequent with coarse coordinates) tie the same way
+        in its merges and neighbour orders.
+
+        :param other: Second set, defaults to this one.
+        :param block_size: Rows per block, bounds the temporaries.
+        :return: (n, m) float array.
+        """
+        other = self if other is None else other
+        distances = np.empty((len(self), len(other)))
+        for start in range(0, len(self), block_size):
+            rows = slice(start, start + block_size)
+            distances[rows] = haversine_matrix(self['latitude'][rows], self['longitude'][rows],
+                                               other['latitude'], other['longitude'])
+        return distances
@@ -0,0 +1,180 @@
+import numpy as np
+
+from utils.spatial import SphericalIndex
+
+
+def knn_weights(latitudes, longitudes, k=8):
+    """
+    Sparse k-nearest-neighbour spatial weights (binary, without self-neighbours).
+
+    :param latitudes: Array of latitudes.
+    :param longitudes: Array of longitudes.
+    :param k: Number of neighbours per point.
+    :return: scipy.sparse.csr_matrix of shape (n, n).
+    """
+    from scipy.sparse import csr_matrix
+
+    n = len(latitudes)
+    k = min(int(k), n - 1)
+    index = SphericalIndex(latitudes, longitudes)
+    _, neighbours = index.query(latitudes, longitudes, k=k + 1)
+    neighbours = neighbours.reshape(n, k + 1)
+
+    # Drop the point itself, which is not always first when coordinates repeat
+    is_self = neighbours == np.arange(n)[:, None]
+    keep = ~is_self
+    keep[~is_self.any(axis=1), -1] = False
+    columns = neighbours[keep].reshape(n, k)
+    return csr_matrix((np.ones(n * k), (np.repeat(np.arange(n), k), columns.ravel())), shape=(n, n))
+
+
+def distance_band_weights(latitudes, longitudes, radius_km):
+    """
+    Sparse distance-band spatial weights: 1 for pairs within radius_km (without self-neighbours).
+
+    :return: scipy.sparse.csr_matrix of shape (n, n).
+    """
+    from scipy.sparse import csr_matrix
+
+    n = len(latitudes)
+    pairs = SphericalIndex(latitudes, longitudes).query_pairs(radius_km)
+    rows = np.concatenate((pairs[:, 0], pairs[:, 1]))
+    cols = np.concatenate((pairs[:, 1], pairs[:, 0]))
+    return csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, n))
+
+
+def row_standardize(weights):
+    """
+    Scales every row of the weights to sum to 1 (rows without neighbours stay empty).
+    """
+    from scipy.sparse import diags
+
+    row_sums = np.asarray(weights.sum(axis=1)).ravel()
+    return diags(np.divide(1, row_sums, out=np.zeros_like(row_sums), where=row_sums > 0)) @ weights
+
+
+def _standardize(values):
+    """
+    Centres every column of values; returns the (n, W) deviations.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    return values - values.mean(axis=0)
+
+
+def _pseudo_p_values(observed, simulated, count):
+    """
+    Folded permutation p-values: share of simulated statistics at least as extreme in the observed direction.
+    """
+    greater = (simulated >= observed[..., None]).sum(axis=-1)
+    return (np.minimum(greater, count - greater) + 1) / (count + 1)
+
+
+def _global_statistics(z, weights, s0, weight_sums):
+    """
+    Moran's I and Geary's C of every column of the centred values z (n, B).
+    """
+    n = z.shape[0]
+    squares = (z ** 2).sum(axis=0)
+    cross = (z * (weights @ z)).sum(axis=0)
+    # sum_ij w_ij (z_i - z_j)^2 = sum_i z_i^2 (row_i + col_i) - 2 z'Wz
+    differences = (z ** 2 * weight_sums[:, None]).sum(axis=0) - 2 * cross
+    morans_i = n / s0 * cross / squares
+    gearys_c = (n - 1) * differences / (2 * s0 * squares)
+    return morans_i, gearys_c
+
+
+def global_autocorrelation(values, weights, permutations=999, seed=None, batch_size=100):
+    """
+    Global Moran's I and Geary's C with permutation p-values, for several value columns.
+
+    Permuted value vectors are evaluated batch_size at a time as one sparse-dense product.
+
+    :param values: Array of shape (n,) or (n, W), e.g. stake_weight and the wc weight columns.
+    :param weights: Sparse spatial weights from knn_weights or distance_band_weights.
+    :param permutations: Number of random permutations.
+    :param seed: Seed for the permutations.
+    :param batch_size: Permutations per batch.
+    :return: Dictionary of (W,) arrays: 'morans_i', 'morans_p', 'gearys_c', 'gearys_p'.
+    """
+    weights = weights.tocsr()
+    z = _standardize(values)
+    n, columns = z.shape
+    s0 = weights.sum()
+    weight_sums = np.asarray(weights.sum(axis=1)).ravel() + np.asarray(weights.sum(axis=0)).ravel()
+    morans_i, gearys_c = _global_statistics(z, weights, s0, weight_sums)
+
+    rng = np.random.default_rng(seed)
+    simulated_i = np.empty((columns, permutations))
+    simulated_c = np.empty((columns, permutations))
+    for start in range(0, permutations, batch_size):
+        count = min(batch_size, permutations - start)
+        order = np.argsort(rng.random((count, n)), axis=1)
+        permuted = z[order.T].reshape(n, count * columns)  # (n, count, W) flattened
+        batch_i, batch_c = _global_statistics(permuted, weights, s0, weight_sums)
+        simulated_i[:, start:start + count] = batch_i.reshape(count, columns).T
+        simulated_c[:, start:start + count] = batch_c.reshape(count, columns).T
+
+    return {
+        "morans_i": morans_i,
+        "morans_p": _pseudo_p_values(morans_i, simulated_i, permutations),
+        "gearys_c": gearys_c,
+        "gearys_p": _pseudo_p_values(gearys_c, simulated_c, permutations),
+    }
+
+
+def local_autocorrelation(values, weights, permutations=999, seed=None, batch_size=100):
+    """
+    Local Moran's I and local Geary's C of every point, with conditional permutation p-values.
+
+    For every point its neighbours' values are replaced by values drawn at random from the other points
+    (with replacement, which for n much larger than the neighbour count matches the usual conditional
+    permutation), batch_size permutations at a time for all points at once.
+
+    :param values: Array of shape (n,).
+    :param weights: Sparse spatial weights from knn_weights or distance_band_weights.
+    :param permutations: Number of random permutations.
+    :param seed: Seed for the permutations.
+    :param batch_size: Permutations per batch.
+    :return: Dictionary of (n,) arrays: 'local_i', 'local_i_p', 'local_c', 'local_c_p' and 'quadrant'
+             (1 high-high, 2 low-high, 3 low-low, 4 high-low; for a point and its neighbours).
+    """
+    weights = weights.tocsr()
+    z = _standardize(values)[:, 0]
+    n = len(z)
+    m2 = (z ** 2).sum() / n
+
+    # Neighbour weights padded to the largest neighbour count
+    counts = np.diff(weights.indptr)
+    width = max(int(counts.max()), 1) if n else 1
+    padded = np.zeros((n, width))
+    slots = np.arange(weights.nnz) - np.repeat(weights.indptr[:-1], counts)
+    padded[np.repeat(np.arange(n), counts), slots] = weights.data
+
+    lag = weights @ z
+    row_sums = np.asarray(weights.sum(axis=1)).ravel()
+    local_i = z / m2 * lag
+    local_c = (weights @ (z ** 2) - 2 * z * lag + z ** 2 * row_sums) / m2
+
+    rng = np.random.default_rng(seed)
+    simulated_i = np.empty((n, permutations))
+    simulated_c = np.empty((n, permutations))
+    for start in range(0, permutations, batch_size):
+        count = min(batch_size, permutations - start)
+        # Random other points: draw from n - 1 and skip the point itself
+        drawn = rng.integers(0, n - 1, size=(n, count, width))
+        drawn += drawn >= np.arange(n)[:, None, None]
+        neighbour_values = z[drawn]
+        simulated_i[:, start:start + count] = z[:, None] / m2 * np.einsum("nk,nbk->nb", padded, neighbour_values)
+        squared = (z[:, None, None] - neighbour_values) ** 2
+        simulated_c[:, start:start + count] = np.einsum("nk,nbk->nb", padded, squared) / m2
+
+    quadrant = np.where(z >= 0, np.where(lag >= 0, 1, 4), np.where(lag >= 0, 2, 3))
+    return {
+        "local_i": local_i,
+        "local_i_p": _pseudo_p_values(local_i, simulated_i, permutations),
+        "local_c": local_c,
+        "local_c_p": _pseudo_p_values(local_c, simulated_c, permutations),
+        "quadrant": quadrant,
+    }
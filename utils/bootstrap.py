@@ -0,0 +1,179 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.gini import gini_coefficient
+
+
+def bootstrap_indices(rng, n, replicates):
+    """
+    Draws bootstrap replicates of n validators (with replacement) as one index matrix.
+
+    Every drawn validator keeps its stake, so the metrics of a replicate are stake-weighted
+    over the resampled validator set.
+
+    :param rng: numpy Generator.
+    :param n: Number of validators.
+    :param replicates: Number of replicates.
+    :return: (replicates, n) int array of validator positions.
+    """
+    return rng.integers(0, n, size=(replicates, n))
+
+
+def multiplicities(indices, n):
+    """
+    Number of copies of every validator in each replicate.
+
+    :return: (replicates, n) int array.
+    """
+    replicates = len(indices)
+    offsets = np.arange(replicates)[:, None] * n
+    return np.bincount((indices + offsets).ravel(), minlength=replicates * n).reshape(replicates, n)
+
+
+def percentile_interval(samples, confidence=0.95):
+    """
+    Percentile bootstrap interval of every metric.
+
+    :param samples: (replicates, ...) array of bootstrap estimates.
+    :param confidence: Coverage of the interval.
+    :return: Tuple (lower, upper) bounds.
+    """
+    tail = (1 - confidence) / 2 * 100
+    return np.percentile(samples, tail, axis=0), np.percentile(samples, 100 - tail, axis=0)
+
+
+def group_gini(indices, groups, stakes):
+    """
+    Gini of the stake summed per group (e.g. country) for every replicate, over the groups present in it.
+
+    :param indices: (replicates, n) index matrix.
+    :param groups: Int array of group codes (0 .. G-1), one per validator.
+    :param stakes: Array of validator stakes.
+    :return: (replicates,) array.
+    """
+    replicates = len(indices)
+    count = int(groups.max()) + 1
+    keys = (groups[indices] + np.arange(replicates)[:, None] * count).ravel()
+    sums = np.bincount(keys, weights=stakes[indices].ravel(), minlength=replicates * count)
+    present = np.bincount(keys, minlength=replicates * count) > 0
+    return gini_coefficient(sums.reshape(replicates, count), mask=present.reshape(replicates, count))
+
+
+def distance_gini(indices, adjacency, stakes):
+    """
+    Distance-based Gini (see calculate_distance_based_gini): every validator's stake is replaced by the stake
+    of all validators of the replicate within the distance threshold, itself included.
+
+    :param indices: (replicates, n) index matrix.
+    :param adjacency: Sparse (n, n) matrix with 1 for pairs within the threshold, diagonal included.
+    :param stakes: Array of validator stakes.
+    :return: (replicates,) array.
+    """
+    copies = multiplicities(indices, len(stakes))
+    aggregated = adjacency @ (copies * stakes).T  # (n, replicates)
+    return gini_coefficient(np.take_along_axis(aggregated.T, indices, axis=1))
+
+
+def mean_gdi(indices, order, sorted_distances, stakes, fraction=2 / 3, batch_size=8):
+    """
+    Mean GDI of every replicate, recomputing each validator's GDI over the resampled validators: the sum of
+    distances to the closest validators holding at least fraction of the stake (see GDI_Calculator).
+
+    :param indices: (replicates, n) index matrix.
+    :param order: (n, n) positions of all validators sorted by distance from each validator.
+    :param sorted_distances: (n, n) matching distances in km.
+    :param stakes: Array of validator stakes.
+    :param fraction: Stake fraction of the quorum.
+    :param batch_size: Replicates evaluated at once.
+    :return: (replicates,) array.
+    """
+    copies = multiplicities(indices, len(stakes))
+    sorted_stakes = stakes[order]
+    result = np.empty(len(indices))
+    for start in range(0, len(indices), batch_size):
+        counts = copies[start:start + batch_size]
+        sorted_copies = counts[:, order]  # (batch, n, n)
+        accumulated = np.cumsum(sorted_copies * sorted_stakes, axis=2)
+        threshold = fraction * accumulated[:, :, -1:]
+        crossing = np.argmax(accumulated >= threshold, axis=2)[:, :, None]
+
+        # Only as many copies of the crossing validator as needed to reach the threshold
+        crossing_copies = np.take_along_axis(sorted_copies, crossing, axis=2)
+        crossing_stake = np.take_along_axis(np.broadcast_to(sorted_stakes, sorted_copies.shape), crossing, axis=2)
+        before = np.take_along_axis(accumulated, crossing, axis=2) - crossing_copies * crossing_stake
+        needed = np.ceil((threshold - before) / np.where(crossing_stake > 0, crossing_stake, 1))
+        unused = crossing_copies - np.clip(needed, 1, crossing_copies)
+
+        travelled = np.cumsum(sorted_copies * sorted_distances, axis=2)
+        crossing_distance = np.take_along_axis(np.broadcast_to(sorted_distances, sorted_copies.shape), crossing, 2)
+        gdi = (np.take_along_axis(travelled, crossing, axis=2) - unused * crossing_distance)[:, :, 0]
+        result[start:start + batch_size] = (counts * gdi).sum(axis=1) / counts.sum(axis=1)
+    return result
+
+
+def centrality_gini(indices, distances, stakes, batch_size=8, iterations=500, tolerance=1e-12):
+    """
+    Gini of the eigenvector centrality (see wc_eigenvector_centrality_gini) of every replicate. The adjacency
+    of a replicate is s_i * s_j * (1 - d_ij / d_max) between distinct nodes; its principal eigenvector is found
+    by power iteration for batch_size replicates at a time.
+
+    :param indices: (replicates, n) index matrix.
+    :param distances: (n, n) distance matrix in km.
+    :param stakes: Array of validator stakes.
+    :return: (replicates,) array.
+    """
+    result = np.empty(len(indices))
+    for start in range(0, len(indices), batch_size):
+        batch = indices[start:start + batch_size]
+        weights = stakes[batch] / stakes[batch].sum(axis=1, keepdims=True)
+        kernel = distances[batch[:, :, None], batch[:, None, :]]
+        kernel = 1 - kernel / kernel.max(axis=(1, 2), keepdims=True)
+
+        vectors = np.full(weights.shape, 1 / weights.shape[1])
+        for _ in range(iterations):
+            updated = weights * (kernel @ (weights * vectors)[:, :, None])[:, :, 0] - weights ** 2 * vectors
+            updated /= updated.sum(axis=1, keepdims=True)
+            converged = np.max(np.abs(updated - vectors)) < tolerance
+            vectors = updated
+            if converged:
+                break
+        result[start:start + batch_size] = gini_coefficient(vectors, normalize=False)
+    return result
+
+
+def _bootstrap_chunk(metric, n, replicates, seed, args):
+    rng = np.random.default_rng(seed)
+    return metric(bootstrap_indices(rng, n, replicates), *args)
+
+
+def run_bootstrap(metric, n, args=(), replicates=1000, seed=0, processes=None, chunk_size=100):
+    """
+    Evaluates a batched metric on bootstrap replicates, chunk by chunk over a process pool.
+
+    Every chunk gets its own child of SeedSequence(seed), so the replicates only depend on the seed and the
+    chunk size, not on the number of processes.
+
+    :param metric: Top-level function metric(indices, *args) returning one value per replicate.
+    :param n: Number of validators.
+    :param args: Further arguments of the metric.
+    :param replicates: Number of bootstrap replicates.
+    :param seed: Seed of the replicates.
+    :param processes: Number of worker processes (defaults to the CPU count, 1 runs inline).
+    :param chunk_size: Replicates per task.
+    :return: (replicates,) array of bootstrap estimates.
+    """
+    counts = [min(chunk_size, replicates - start) for start in range(0, replicates, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(counts))
+    processes = processes or os.cpu_count() or 1
+
+    if processes == 1 or len(counts) == 1:
+        chunks = [_bootstrap_chunk(metric, n, count, child, args) for count, child in zip(counts, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(processes, len(counts))) as executor:
+            futures = [
+                executor.submit(_bootstrap_chunk, metric, n, count, child, args) for count, child in zip(counts, seeds)
+            ]
+            chunks = [future.result() for future in futures]
+    return np.concatenate(chunks)
@@ -0,0 +1,69 @@
+import numpy as np
+
+from utils.spatial import SphericalIndex
+
+
+def chain_shares(stakes, chains):
+    """
+    Stake of every validator as a fraction of its own chain's stake.
+
+    :param stakes: Array of validator stake weights.
+    :param chains: Int array of chain codes (0 .. K-1), one per validator.
+    :return: Float array.
+    """
+    stakes = np.asarray(stakes, dtype=float)
+    totals = np.bincount(chains, weights=stakes)
+    return stakes / totals[chains]
+
+
+def colocation_matrix(latitudes, longitudes, stakes, chains, radius_km):
+    """
+    Pairwise co-located stake of several chains, from one spatial index over all their validators.
+
+    Entry (a, b) is the fraction of chain a's stake held by validators with at least one chain-b validator
+    within radius_km. The diagonal is 1 (every validator is within range of itself).
+
+    :param latitudes: Array of latitudes of the validators of all chains.
+    :param longitudes: Array of longitudes.
+    :param stakes: Array of stake weights.
+    :param chains: Int array of chain codes (0 .. K-1), one per validator.
+    :param radius_km: Co-location radius in km.
+    :return: (K, K) float array.
+    """
+    from scipy.sparse import csr_matrix
+
+    chains = np.asarray(chains)
+    n = len(chains)
+    k = int(chains.max()) + 1
+    shares = chain_shares(stakes, chains)
+
+    index = SphericalIndex(latitudes, longitudes)
+    pairs = index.distance_matrix(index, radius_km)
+    one_hot = csr_matrix((np.ones(n), (np.arange(n), chains)), shape=(n, k))
+    adjacency = csr_matrix((np.ones(pairs.nnz), (pairs.row, pairs.col)), shape=(n, n))
+
+    # near[i, b]: validator i has a chain-b validator in range
+    near = (adjacency @ one_hot).toarray() > 0
+    return np.asarray(one_hot.T @ (near * shares[:, None]))
+
+
+def shared_hotspots(cells, stakes, chains, min_chains=2):
+    """
+    Cells holding stake of several chains, ranked by their combined share of the chains' stake.
+
+    :param cells: Int array of geo cell ids, one per validator.
+    :param stakes: Array of stake weights.
+    :param chains: Int array of chain codes (0 .. K-1).
+    :param min_chains: Minimum number of chains present in a cell.
+    :return: Tuple (cell ids, (C, K) array of each chain's stake share in the cell), sorted by the sum of shares.
+    """
+    chains = np.asarray(chains)
+    k = int(chains.max()) + 1
+    unique_cells, inverse = np.unique(np.asarray(cells), return_inverse=True)
+    inverse = inverse.ravel()
+    shares = np.zeros((len(unique_cells), k))
+    np.add.at(shares, (inverse, chains), chain_shares(stakes, chains))
+
+    shared = (shares > 0).sum(axis=1) >= min_chains
+    order = np.argsort(-shares[shared].sum(axis=1), kind="stable")
+    return unique_cells[shared][order], shares[shared][order]
@@ -0,0 +1,150 @@
+import numpy as np
+
+from utils.gini import gini_coefficient
+
+
+class AliasTable:
+    def __init__(self, weights):
+        """
+        Vose alias table for O(1) sampling of validators in proportion to their weight.
+
+        :param weights: Array of non-negative weights (e.g. a stake weighting column).
+        """
+        weights = np.asarray(weights, dtype=float)
+        n = len(weights)
+        scaled = weights * n / weights.sum()
+        self.probability = np.ones(n)
+        self.alias = np.arange(n)
+
+        small = list(np.flatnonzero(scaled < 1))
+        large = list(np.flatnonzero(scaled >= 1))
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+        # Leftovers are 1 up to rounding
+        self.probability[small + large] = 1
+
+    def sample(self, rng, size):
+        """
+        Draws validator positions with probability proportional to their weight (with replacement).
+
+        :param rng: numpy Generator.
+        :param size: Output shape, e.g. (committees, committee_size).
+        :return: Int array of validator positions.
+        """
+        columns = rng.integers(0, len(self.probability), size=size)
+        return np.where(rng.random(size) < self.probability[columns], columns, self.alias[columns])
+
+
+def committee_metrics(committees, distances, countries, fraction=2 / 3):
+    """
+    Geographic metrics of every committee. Every seat counts equally, so a validator drawn twice holds two seats.
+
+    :param committees: (C, k) array of validator positions.
+    :param distances: (n, n) precomputed distance matrix in km.
+    :param countries: Int array of country codes (0 .. G-1), one per validator.
+    :param fraction: Seat fraction of the quorum used for the GDI.
+    :return: Dictionary of (C,) arrays: 'gdi' (mean over members of the summed distance to the closest seats
+             forming the quorum, see GDI_Calculator), 'country_gini' and 'max_country_share'.
+    """
+    count, size = committees.shape
+    quorum = int(np.ceil(fraction * size - 1e-9))
+    member_distances = np.sort(distances[committees[:, :, None], committees[:, None, :]], axis=2)
+    gdi = member_distances[:, :, :quorum].sum(axis=2).mean(axis=1)
+
+    groups = int(countries.max()) + 1
+    keys = (countries[committees] + np.arange(count)[:, None] * groups).ravel()
+    seats = np.bincount(keys, minlength=count * groups).reshape(count, groups)
+    return {
+        "gdi": gdi,
+        "country_gini": gini_coefficient(seats, mask=seats > 0),
+        "max_country_share": seats.max(axis=1) / size,
+    }
+
+
+class StreamingSummary:
+    def __init__(self, low, high, bins=2000):
+        """
+        Running mean, standard deviation, extremes and histogram quantiles of a stream of values,
+        in constant memory.
+
+        :param low: Lower edge of the histogram.
+        :param high: Upper edge of the histogram (values outside are clipped into the end bins).
+        :param bins: Number of histogram bins; quantiles are accurate to one bin width.
+        """
+        self.edges = np.linspace(low, high, bins + 1)
+        self.histogram = np.zeros(bins, dtype=np.int64)
+        self.count = 0
+        self.mean = 0.0
+        self.squares = 0.0  # Sum of squared deviations from the mean
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        """
+        Adds a batch of values (parallel update of the mean and variance).
+        """
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+        batch_mean = values.mean()
+        delta = batch_mean - self.mean
+        total = self.count + len(values)
+        self.squares += ((values - batch_mean) ** 2).sum() + delta ** 2 * self.count * len(values) / total
+        self.mean += delta * len(values) / total
+        self.count = total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        positions = np.clip(np.searchsorted(self.edges, values, side="right") - 1, 0, len(self.histogram) - 1)
+        self.histogram += np.bincount(positions, minlength=len(self.histogram))
+
+    def quantile(self, q):
+        """
+        Approximate quantile from the histogram (bin midpoint).
+        """
+        position = np.searchsorted(np.cumsum(self.histogram), q * self.count, side="left")
+        position = min(position, len(self.histogram) - 1)
+        return float(np.clip((self.edges[position] + self.edges[position + 1]) / 2, self.min, self.max))
+
+    def summary(self, quantiles=(0.05, 0.5, 0.95)):
+        """
+        :return: Dictionary with 'count', 'mean', 'std', 'min', 'max' and 'p<q>' for every quantile.
+        """
+        result = {
+            "count": self.count,
+            "mean": self.mean,
+            "std": np.sqrt(self.squares / self.count) if self.count else np.nan,
+            "min": self.min,
+            "max": self.max,
+        }
+        result.update({f"p{round(q * 100)}": self.quantile(q) for q in quantiles})
+        return result
+
+
+def simulate_committees(table, distances, countries, committee_size, committees=100000, chunk_size=2000, seed=0):
+    """
+    Samples committees by stake and summarizes their geographic metrics, chunk by chunk.
+
+    :param table: AliasTable of the weighting scheme.
+    :param distances: (n, n) precomputed distance matrix in km.
+    :param countries: Int array of country codes, one per validator.
+    :param committee_size: Seats per committee.
+    :param committees: Number of committees to sample.
+    :param chunk_size: Committees drawn and evaluated at once; bounds the memory use.
+    :param seed: Seed of the sampler.
+    :return: Dictionary of metric name to StreamingSummary.
+    """
+    rng = np.random.default_rng(seed)
+    summaries = {
+        "gdi": StreamingSummary(0, distances.max() * committee_size),
+        "country_gini": StreamingSummary(0, 1),
+        "max_country_share": StreamingSummary(0, 1),
+    }
+    for start in range(0, committees, chunk_size):
+        batch = table.sample(rng, (min(chunk_size, committees - start), committee_size))
+        for name, values in committee_metrics(batch, distances, countries).items():
+            summaries[name].update(values)
+    return summaries
@@ -0,0 +1,80 @@
+import numpy as np
+
+from utils.gini import gini_coefficient
+from utils.spatial import SphericalIndex
+
+NOISE = -1
+
+
+def stake_dbscan(latitudes, longitudes, stakes, eps_km=100, min_stake=0.01):
+    """
+    DBSCAN with a stake-weighted density: a validator is a core point when the validators within eps_km
+    (itself included) hold at least min_stake of the total stake. Core points within eps_km of each other
+    form one cluster; other validators join the cluster of their nearest core point in range, or are noise.
+
+    Validators sharing exact coordinates are handled as one location, and neighbourhoods come from a
+    spherical KD-tree, so the cost grows with the number of neighbour pairs instead of n².
+
+    :param latitudes: Array of validator latitudes.
+    :param longitudes: Array of validator longitudes.
+    :param stakes: Array of validator stake weights.
+    :param eps_km: Neighbourhood radius in km.
+    :param min_stake: Minimum neighbourhood stake of a core point, as a fraction of the total stake.
+    :return: Int array of cluster labels (0 .. k-1), NOISE (-1) for validators outside every cluster.
+    """
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    coordinates = np.column_stack((np.asarray(latitudes, dtype=float), np.asarray(longitudes, dtype=float)))
+    stakes = np.asarray(stakes, dtype=float)
+    if len(stakes) == 0:
+        return np.zeros(0, dtype=int)
+    locations, inverse = np.unique(coordinates, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    location_stakes = np.bincount(inverse, weights=stakes, minlength=len(locations))
+
+    index = SphericalIndex(locations[:, 0], locations[:, 1])
+    pairs = index.distance_matrix(index, eps_km)  # Includes every location itself, at distance zero
+    adjacency = csr_matrix((np.ones(pairs.nnz), (pairs.row, pairs.col)), shape=pairs.shape)
+    core = adjacency @ location_stakes >= min_stake * stakes.sum()
+
+    # Clusters are the connected components of the core points
+    labels = np.full(len(locations), NOISE)
+    core_ids = np.flatnonzero(core)
+    _, components = connected_components(adjacency[core_ids][:, core_ids], directed=False)
+    labels[core_ids] = components
+
+    # Border points: nearest core point within range
+    is_border_edge = ~core[pairs.row] & core[pairs.col]
+    if is_border_edge.any():
+        rows, cols, km = pairs.row[is_border_edge], pairs.col[is_border_edge], pairs.data[is_border_edge]
+        order = np.lexsort((km, rows))
+        border_ids, first = np.unique(rows[order], return_index=True)
+        labels[border_ids] = labels[cols[order][first]]
+
+    # Number clusters by decreasing stake
+    if len(core_ids):
+        cluster_stakes = np.bincount(labels[labels != NOISE], weights=location_stakes[labels != NOISE])
+        rank = np.empty(len(cluster_stakes), dtype=int)
+        rank[np.argsort(-cluster_stakes, kind="stable")] = np.arange(len(cluster_stakes))
+        labels[labels != NOISE] = rank[labels[labels != NOISE]]
+    return labels[inverse]
+
+
+def cluster_summary(labels, stakes):
+    """
+    Stake share of every cluster and the Gini coefficient across clusters.
+
+    :param labels: Cluster labels from stake_dbscan.
+    :param stakes: Array of validator stake weights.
+    :return: Dictionary with 'stake_share' (array, one entry per cluster), 'noise_share' and 'gini'.
+    """
+    labels = np.asarray(labels)
+    stakes = np.asarray(stakes, dtype=float)
+    clustered = labels != NOISE
+    shares = np.bincount(labels[clustered], weights=stakes[clustered]) / stakes.sum()
+    return {
+        "stake_share": shares,
+        "noise_share": stakes[~clustered].sum() / stakes.sum(),
+        "gini": gini_coefficient(shares),
+    }
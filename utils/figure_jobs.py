@@ -0,0 +1,329 @@
+import ast
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+
+TEX_CACHE_FOLDER = ".cache/tex"
+FIGURE_CACHE_FILE = ".cache/figures/manifest.json"
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DRAFT_DPI = 72
+
+# Set per process by _init_worker
+_draft = False
+
+
+class FigureJob:
+    def __init__(self, name, func, args=(), kwargs=None, outputs=None):
+        """
+        A single independent figure to render.
+
+        :param name: Label used in the timing summary, e.g. 'sui/consensus_tps/max'.
+        :param func: Module-level plotting function that renders the figure and saves it with save_figure.
+        :param args: Positional arguments for func. Must be picklable.
+        :param kwargs: Keyword arguments for func. Must be picklable.
+        :param outputs: Files written by func. Jobs without outputs are never skipped by the figure cache.
+        """
+        self.name = name
+        self.func = func
+        self.args = tuple(args)
+        self.kwargs = kwargs if kwargs else {}
+        self.outputs = list(outputs) if outputs else []
+
+
+def draft_path(path):
+    """
+    Returns the file a figure is written to in draft mode: same name, PNG format.
+    """
+    return os.path.splitext(path)[0] + ".png"
+
+
+def _to_mathtext(fig):
+    """
+    Rewrites LaTeX-only markup (\\textbf{...}) of all texts in a figure so mathtext can render it.
+    """
+    from matplotlib.text import Text
+
+    for text in fig.findobj(Text):
+        label = text.get_text()
+        if "\\textbf" in label:
+            text.set_text(re.sub(r"\\textbf\{(.*?)\}", r"\1", label))
+
+
+def save_figure(path, **kwargs):
+    """
+    Saves the current figure like plt.savefig. In draft mode the figure is written as a low DPI PNG
+    next to path instead, with mathtext rendering.
+
+    :param path: Output file for the publication build.
+    :param kwargs: Keyword arguments for plt.savefig.
+    :return: The file actually written.
+    """
+    import matplotlib.pyplot as plt
+
+    if _draft:
+        _to_mathtext(plt.gcf())
+        path = draft_path(path)
+        kwargs.update(format="png", dpi=DRAFT_DPI)
+    plt.savefig(path, **kwargs)
+    return path
+
+
+def _hash_value(value, digest):
+    """
+    Feeds a job argument into a hashlib digest. DataFrames and arrays are hashed by content,
+    paths to existing files by the file content.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(value, pd.DataFrame):
+        digest.update(repr((list(value.columns), list(value.dtypes.astype(str)), value.shape)).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(repr((value.dtype.str, value.shape)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _hash_value(item, digest)
+    elif isinstance(value, dict):
+        digest.update(f"dict{len(value)}".encode())
+        for key in sorted(value, key=repr):
+            _hash_value(key, digest)
+            _hash_value(value[key], digest)
+    elif isinstance(value, str) and os.path.isfile(value):
+        digest.update(value.encode())
+        with open(value, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    else:
+        digest.update(repr(value).encode())
+
+
+def _imported_files(path):
+    """
+    Returns the source files of the modules imported anywhere in a source file, including imports
+    inside functions.
+    """
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), filename=path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module)
+            names.update(f"{node.module}.{alias.name}" for alias in node.names)
+    files = set()
+    for name in names:
+        top = name.split(".")[0]
+        if not (os.path.isdir(os.path.join(REPO_ROOT, top)) or os.path.isfile(os.path.join(REPO_ROOT, f"{top}.py"))):
+            continue  # Installed package, never imported here
+        try:
+            spec = importlib.util.find_spec(name)
+        except (ImportError, ValueError):
+            continue
+        if spec is not None and spec.origin and spec.origin.endswith(".py"):
+            files.add(os.path.abspath(spec.origin))
+    return files
+
+
+def local_sources(path):
+    """
+    Returns the source file and, recursively, the repo-local modules it imports, sorted.
+    """
+    path = os.path.abspath(path)
+    sources, pending = set(), [path]
+    while pending:
+        source = pending.pop()
+        if source in sources:
+            continue
+        sources.add(source)
+        pending.extend(file for file in _imported_files(source) if file.startswith(REPO_ROOT + os.sep))
+    return sorted(sources)
+
+
+def figure_key(job, draft=False):
+    """
+    Returns the cache key of a figure: a hash of its input data, the source of the module defining
+    the plotting function and of the repo-local modules it imports (e.g. utils/world_geometry.py),
+    the current rcParams and the render mode.
+    """
+    import matplotlib
+
+    digest = hashlib.sha256()
+    digest.update(f"{job.func.__module__}.{job.func.__qualname__}|draft={draft}".encode())
+    try:
+        sources = local_sources(inspect.getsourcefile(job.func))
+    except (TypeError, OSError):
+        digest.update(job.func.__code__.co_code)
+    else:
+        for source in sources:
+            digest.update(os.path.relpath(source, REPO_ROOT).encode())
+            with open(source, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+    digest.update(repr(sorted((k, repr(v)) for k, v in matplotlib.rcParams.items())).encode())
+    _hash_value(job.args, digest)
+    _hash_value(job.kwargs, digest)
+    return digest.hexdigest()
+
+
+def _load_manifest(cache_file):
+    if cache_file and os.path.exists(cache_file):
+        with open(cache_file) as f:
+            return json.load(f)
+    return {}
+
+
+def _save_manifest(manifest, cache_file):
+    os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+    tmp_file = cache_file + ".tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_file, cache_file)
+
+
+def _init_worker(tex_cache_folder, draft=False):
+    """
+    Points matplotlib's TeX cache of a worker process to the shared tex_cache_folder,
+    so DVI/PNG files produced by one worker are reused by all others and by later runs.
+    In draft mode, LaTeX rendering is replaced by mathtext.
+    """
+    global _draft
+    import matplotlib.pyplot as plt
+    from matplotlib.texmanager import TexManager
+
+    os.makedirs(tex_cache_folder, exist_ok=True)
+    TexManager._cache_dir = Path(os.path.abspath(tex_cache_folder))
+
+    _draft = draft
+    if draft:
+        plt.rcParams["text.usetex"] = False
+        plt.rcParams["mathtext.fontset"] = "dejavuserif"
+
+
+@contextmanager
+def _in_process(tex_cache_folder, draft=False):
+    """
+    Applies the worker settings of _init_worker to the current process and restores the caller's
+    rcParams, TeX cache and render mode afterwards.
+    """
+    global _draft
+    import matplotlib
+    from matplotlib.texmanager import TexManager
+
+    previous = _draft, TexManager._cache_dir
+    with matplotlib.rc_context():
+        try:
+            _init_worker(tex_cache_folder, draft)
+            yield
+        finally:
+            _draft, TexManager._cache_dir = previous
+
+
+def _run_job(job):
+    """
+    Renders one figure and returns (name, wall time in seconds, error message or None).
+    """
+    import matplotlib.pyplot as plt
+
+    start = time.perf_counter()
+    error = None
+    try:
+        job.func(*job.args, **job.kwargs)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        plt.close("all")  # Never leak figures between jobs sharing a worker
+    return job.name, time.perf_counter() - start, error
+
+
+def run_figure_jobs(
+    jobs,
+    processes=None,
+    tex_cache_folder=TEX_CACHE_FOLDER,
+    draft=None,
+    cache_file=FIGURE_CACHE_FILE,
+    logger=None,
+):
+    """
+    Renders independent figures in a process pool and logs a per-figure timing summary.
+
+    Figures whose outputs exist and whose cache key (see figure_key) is unchanged since they were
+    last written are skipped.
+
+    :param jobs: List of FigureJob instances.
+    :param processes: Number of worker processes. Defaults to the CPU count; 1 renders in the current process.
+    :param tex_cache_folder: TeX cache folder shared by all workers.
+    :param draft: Render low DPI PNGs with mathtext instead of LaTeX PDFs. Defaults to the GEO_PLOTS_DRAFT
+                  environment variable being set to 1.
+    :param cache_file: Manifest of the figure cache. None disables the cache.
+    :param logger: Logger function to handle logging instead of print.
+    :return: List of (name, seconds, error) tuples in job order; skipped figures have error 'cached'.
+    :raises RuntimeError: If any figure failed, after the summary is logged and the other figures are saved.
+    """
+    logger = logger if logger else print
+    if draft is None:
+        draft = os.environ.get("GEO_PLOTS_DRAFT") == "1"
+
+    # Skip figures whose inputs are unchanged
+    manifest = _load_manifest(cache_file)
+    keys = {}
+    pending = []
+    results = [None] * len(jobs)
+    for idx, job in enumerate(jobs):
+        outputs = [draft_path(out) if draft else out for out in job.outputs]
+        if cache_file and outputs:
+            keys[idx] = figure_key(job, draft)
+            if all(os.path.exists(out) and manifest.get(out) == keys[idx] for out in outputs):
+                results[idx] = (job.name, 0.0, "cached")
+                continue
+        pending.append(idx)
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(pending)))
+
+    start = time.perf_counter()
+    if processes == 1:
+        with _in_process(tex_cache_folder, draft):
+            for idx in pending:
+                results[idx] = _run_job(jobs[idx])
+    else:
+        with ProcessPoolExecutor(
+            max_workers=processes, initializer=_init_worker, initargs=(tex_cache_folder, draft)
+        ) as executor:
+            futures = {executor.submit(_run_job, jobs[idx]): idx for idx in pending}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+    wall_time = time.perf_counter() - start
+
+    # Record the rendered figures in the cache manifest
+    if cache_file and keys:
+        for idx, key in keys.items():
+            if idx in pending and results[idx][2] is None:
+                for out in jobs[idx].outputs:
+                    manifest[draft_path(out) if draft else out] = key
+        _save_manifest(manifest, cache_file)
+
+    # Timing summary, slowest figures first
+    mode = "draft" if draft else "publication"
+    logger(
+        f"Rendered {len(pending)} {mode} figures with {processes} process(es) in {wall_time:.2f} s, "
+        f"{len(jobs) - len(pending)} unchanged figures skipped"
+    )
+    for name, seconds, error in sorted(results, key=lambda r: r[1], reverse=True):
+        status = "cached" if error == "cached" else (f"FAILED ({error})" if error else "ok")
+        logger(f"  {seconds:8.2f} s  {name}  {status}")
+    logger(f"Sum of figure times: {sum(r[1] for r in results):.2f} s")
+
+    failed = [name for name, _, error in results if error not in (None, "cached")]
+    if failed:
+        raise RuntimeError(f"{len(failed)} figure(s) failed: {', '.join(failed)}")
+    return results
@@ -0,0 +1,39 @@
+import numpy as np
+
+
+def gini_coefficient(values, normalize=True, axis=-1, mask=None):
+    """
+    Gini coefficient (mean absolute difference / (2 * mean)) computed in O(n log n) from the sorted values.
+
+    For sorted x_1 <= ... <= x_n, sum_ij |x_i - x_j| = 2 * sum_i (2i - n - 1) x_i, which avoids the n x n
+    outer difference. Gives the same result as the gini_coefficient helpers of the analysis scripts.
+
+    :param values: Array of values; with more than one dimension a coefficient is computed along axis.
+    :param normalize: Min-max normalize the values first, as the analysis scripts do.
+    :param axis: Axis holding the values of one distribution.
+    :param mask: Optional boolean array shaped like values; only True entries belong to the distribution
+                 (e.g. groups present in a bootstrap replicate).
+    :return: Gini coefficient (float, or array for multi-dimensional input). 0 for empty or all-zero input.
+    """
+    values = np.moveaxis(np.asarray(values, dtype=float), axis, -1)
+    if values.shape[-1] == 0:
+        return np.zeros(values.shape[:-1]) if values.ndim > 1 else 0
+    if mask is None:
+        mask = np.ones(values.shape, dtype=bool)
+    else:
+        mask = np.broadcast_to(np.moveaxis(np.asarray(mask, dtype=bool), axis, -1), values.shape)
+    n = mask.sum(axis=-1, keepdims=True)
+
+    if normalize:
+        low = np.min(values, axis=-1, keepdims=True, where=mask, initial=np.inf)
+        spread = np.max(values, axis=-1, keepdims=True, where=mask, initial=-np.inf) - low
+        values = np.where(spread > 0, (values - low) / np.where(spread > 0, spread, 1), values)
+
+    # Masked-out entries sort last and are dropped
+    positions = np.arange(1, values.shape[-1] + 1)
+    ranked = np.sort(np.where(mask, values, np.inf), axis=-1)
+    weighted = np.sum(np.where(positions <= n, ranked * (2 * positions - n - 1), 0), axis=-1)
+    totals = np.sum(values, axis=-1, where=mask)
+    denominator = n[..., 0] * totals
+    gini = np.divide(weighted, denominator, out=np.zeros_like(totals), where=denominator != 0)
+    return gini if values.ndim > 1 else float(gini)
@@ -0,0 +1,108 @@
+import heapq
+
+import numpy as np
+
+from pre_processing.stake_units import StakeUnits, group_sum
+
+# Byzantine thresholds: more than 1/3 of stake halts consensus, more than 2/3 controls it
+THRESHOLDS = (1 / 3, 2 / 3)
+
+
+def group_stakes(group_ids, weights):
+    """
+    Sums stake per group, for several weight columns at once.
+
+    :param group_ids: Array of group labels (any dtype), one per validator.
+    :param weights: Array of shape (n,) or (n, W) with the stake of every validator under W weightings.
+    :return: Tuple (groups, sums) with the unique group labels and a (G, W) array of stake per group.
+             Integer stakes are summed exactly (see group_sum) and stay int64 while the sums fit.
+    """
+    weights = np.asarray(weights)
+    if weights.ndim == 1:
+        weights = weights[:, None]
+    groups, inverse = np.unique(np.asarray(group_ids), return_inverse=True)
+    if weights.dtype.kind in "iu" and np.can_cast(weights.dtype, np.int64) and weights.shape[1]:
+        return groups, np.column_stack([group_sum(column, inverse, len(groups)) for column in weights.T])
+    weights = weights.astype(float)
+    sums = np.zeros((len(groups), weights.shape[1]))
+    np.add.at(sums, inverse.ravel(), weights)
+    return groups, sums
+
+
+def nakamoto_from_group_stakes(sums, thresholds=THRESHOLDS):
+    """
+    Minimum number of groups that together hold more than each threshold fraction of the total stake.
+
+    Groups are sorted by stake (largest first) per column; the coefficient is one more than the number of
+    prefix sums that stay at or below the threshold. Integer stakes are compared exactly in base units.
+
+    :param sums: (G, W) array of stake per group.
+    :param thresholds: Fractions of total stake.
+    :return: (len(thresholds), W) int array.
+    """
+    sums = np.asarray(sums)
+    if sums.ndim == 1:
+        sums = sums[:, None]
+    if sums.dtype.kind in "iu" and np.can_cast(sums.dtype, np.int64) and sums.size and sums.min() >= 0:
+        return np.stack([_exact_nakamoto(column, thresholds) for column in sums.T], axis=1)
+    sums = sums.astype(float)
+    prefix = np.cumsum(-np.sort(-sums, axis=0), axis=0)
+    totals = prefix[-1]
+    return np.stack([np.sum(prefix <= t * totals, axis=0) + 1 for t in thresholds])
+
+
+def _exact_nakamoto(stakes, thresholds):
+    """
+    Nakamoto coefficients of one column of integer group stakes, without float rounding or int64 overflow.
+    """
+    units = StakeUnits.from_stakes(stakes)
+    order = np.argsort(-units.units, kind="stable")
+    # Prefix sums at or below t * total are those below the smallest integer above it
+    return [np.sum(~units.cumsum_reaches(order, units.threshold(t, strict=True))) + 1 for t in thresholds]
+
+
+def nakamoto_coefficients(group_ids, weights, thresholds=THRESHOLDS):
+    """
+    Geographic Nakamoto coefficients: minimum number of groups (countries, clusters, neighbourhoods)
+    controlling more than each threshold fraction of stake, for all weight columns at once.
+
+    :param group_ids: Array of group labels, one per validator.
+    :param weights: Array of shape (n,) or (n, W).
+    :param thresholds: Fractions of total stake.
+    :return: (len(thresholds), W) int array.
+    """
+    _, sums = group_stakes(group_ids, weights)
+    return nakamoto_from_group_stakes(sums, thresholds)
+
+
+def radius_groups(latitudes, longitudes, radius_km):
+    """
+    Partitions validators into R-km neighbourhoods: the disk of radius_km around the validator with the most
+    ungrouped validators in range becomes a group, and so on until every validator is grouped.
+    The partition depends on locations only, so it is shared by all weight columns.
+
+    :param latitudes: Array of validator latitudes.
+    :param longitudes: Array of validator longitudes.
+    :param radius_km: Neighbourhood radius in km.
+    :return: Int array of group labels (the index of each group's centre validator).
+    """
+    from utils.spatial import SphericalIndex
+
+    index = SphericalIndex(latitudes, longitudes)
+    neighbours = index.query_radius(latitudes, longitudes, radius_km)
+    labels = np.full(len(index), -1)
+
+    # Lazy greedy: disk counts only shrink, so an entry whose count is still current is the maximum
+    heap = [(-len(members), centre) for centre, members in enumerate(neighbours)]
+    heapq.heapify(heap)
+    while heap:
+        negative_count, centre = heapq.heappop(heap)
+        if labels[centre] != -1:
+            continue
+        members = np.asarray(neighbours[centre], dtype=int)
+        members = members[labels[members] == -1]
+        if len(members) < -negative_count:
+            heapq.heappush(heap, (-len(members), centre))
+            continue
+        labels[members] = centre
+    return labels
@@ -0,0 +1,95 @@
+import numpy as np
+
+from utils.gini import gini_coefficient
+from utils.spatial import SphericalIndex
+
+
+def group_scenarios(labels):
+    """
+    One removal scenario per group (e.g. country or cluster).
+
+    :param labels: Array of group labels, one per validator.
+    :return: Tuple (group names, (S, n) boolean removal mask).
+    """
+    groups, inverse = np.unique(np.asarray(labels), return_inverse=True)
+    return groups, inverse.ravel()[None, :] == np.arange(len(groups))[:, None]
+
+
+def disk_scenarios(latitudes, longitudes, centre_latitudes, centre_longitudes, radius_km):
+    """
+    One removal scenario per disk: all validators within radius_km of a centre (e.g. a city) go dark.
+
+    :return: (S, n) boolean removal mask, one row per centre.
+    """
+    index = SphericalIndex(latitudes, longitudes)
+    removed = np.zeros((len(centre_latitudes), len(index)), dtype=bool)
+    for row, members in enumerate(index.query_radius(centre_latitudes, centre_longitudes, radius_km)):
+        removed[row, members] = True
+    return removed
+
+
+class OutageScenarios:
+    def __init__(self, distances, stakes, countries, fraction=2 / 3):
+        """
+        Evaluates many validator removal scenarios against one precomputed state: every validator's
+        neighbours sorted by distance, so the GDI of the remaining set follows from prefix sums.
+
+        :param distances: (n, n) distance matrix in km.
+        :param stakes: Array of validator stakes.
+        :param countries: Int array of country codes (0 .. G-1), one per validator.
+        :param fraction: Quorum size as a fraction of the stake.
+        """
+        self.stakes = np.asarray(stakes, dtype=float)
+        self.total = self.stakes.sum()
+        self.countries = np.asarray(countries)
+        self.country_count = int(self.countries.max()) + 1
+        self.fraction = fraction
+        self.order = np.argsort(distances, axis=1, kind="stable")
+        self.sorted_distances = np.take_along_axis(np.asarray(distances, dtype=float), self.order, axis=1)
+        self.sorted_stakes = self.stakes[self.order]
+
+    def _mean_gdi(self, alive):
+        """
+        Mean GDI of the remaining validators of every scenario in the batch (see GDI_Calculator).
+        """
+        sorted_alive = alive[:, self.order]  # (S, n, n)
+        accumulated = np.cumsum(sorted_alive * self.sorted_stakes, axis=2)
+        threshold = self.fraction * accumulated[:, :, -1:]
+        crossing = np.argmax(accumulated >= threshold, axis=2)[:, :, None]
+        travelled = np.cumsum(sorted_alive * self.sorted_distances, axis=2)
+        gdi = np.take_along_axis(travelled, crossing, axis=2)[:, :, 0]
+        counts = alive.sum(axis=1)
+        return np.divide((gdi * alive).sum(axis=1), counts, out=np.full(len(alive), np.nan), where=counts > 0)
+
+    def evaluate(self, removed, batch_size=16):
+        """
+        Metrics of the validator set left over in every scenario.
+
+        :param removed: (S, n) boolean mask of removed validators.
+        :param batch_size: Scenarios evaluated at once in the GDI step.
+        :return: Dictionary of (S,) arrays: 'removed_validators', 'remaining_share' (of the original stake),
+                 'quorum_feasible' (the remaining stake is still more than the quorum fraction of the original
+                 stake), 'country_gini' and 'max_country_share' of the remaining stake, and 'mean_gdi'.
+        """
+        removed = np.asarray(removed, dtype=bool)
+        alive = ~removed
+        remaining = alive @ self.stakes
+
+        # Stake and validators per country of every scenario
+        membership = self.countries[:, None] == np.arange(self.country_count)
+        country_stakes = alive @ (membership * self.stakes[:, None])
+        country_alive = alive.astype(int) @ membership
+        largest = country_stakes.max(axis=1)
+
+        mean_gdi = np.concatenate([
+            self._mean_gdi(alive[start:start + batch_size]) for start in range(0, len(removed), batch_size)
+        ]) if len(removed) else np.zeros(0)
+
+        return {
+            "removed_validators": removed.sum(axis=1),
+            "remaining_share": remaining / self.total,
+            "quorum_feasible": remaining > self.fraction * self.total,
+            "country_gini": gini_coefficient(country_stakes, mask=country_alive > 0),
+            "max_country_share": np.divide(largest, remaining, out=np.zeros_like(largest), where=remaining > 0),
+            "mean_gdi": mean_gdi,
+        }
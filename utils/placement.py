@@ -0,0 +1,157 @@
+import numpy as np
+
+from utils.gini import gini_coefficient
+from utils.nakamoto import nakamoto_from_group_stakes
+from utils.spatial import haversine_matrix
+
+OBJECTIVES = ("gdi", "country_gini", "nakamoto")
+
+
+class PlacementRecommender:
+    def __init__(self, latitudes, longitudes, stakes, countries, fraction=2 / 3):
+        """
+        Scores candidate sites for a new validator by the change in mean GDI, country Gini and country
+        Nakamoto coefficient the validator would cause.
+
+        Every validator's neighbours are sorted by distance once, with prefix sums of their stake and distance.
+        Adding one validator only inserts one entry into each sorted list, so the new GDI of every validator
+        follows from the insertion position, for all candidates at once.
+
+        :param latitudes: Array of validator latitudes.
+        :param longitudes: Array of validator longitudes.
+        :param stakes: Array of validator stakes.
+        :param countries: Array of validator country names.
+        :param fraction: Stake fraction of the GDI quorum.
+        """
+        self.latitudes = np.asarray(latitudes, dtype=float)
+        self.longitudes = np.asarray(longitudes, dtype=float)
+        self.stakes = np.asarray(stakes, dtype=float)
+        self.total = self.stakes.sum()
+        self.fraction = fraction
+        self.country_names, self.countries = np.unique(np.asarray(countries, dtype=str), return_inverse=True)
+        self.country_stakes = np.bincount(self.countries.ravel(), weights=self.stakes)
+
+        distances = haversine_matrix(self.latitudes, self.longitudes)
+        self.order = np.argsort(distances, axis=1, kind="stable")
+        self.sorted_distances = np.take_along_axis(distances, self.order, axis=1)
+        self.prefix_stakes = np.cumsum(self.stakes[self.order], axis=1)
+        self.prefix_distances = np.cumsum(self.sorted_distances, axis=1)
+
+        rows = np.arange(len(self.stakes))
+        crossing = (self.prefix_stakes < fraction * self.total).sum(axis=1)
+        self.gdi = self.prefix_distances[rows, crossing].mean()
+        self.country_gini = gini_coefficient(self.country_stakes)
+        self.nakamoto = nakamoto_from_group_stakes(self.country_stakes)[:, 0]
+
+    def _existing_gdi(self, candidate_distances, stake):
+        """
+        Sum over the existing validators of their GDI after adding the new validator, per candidate.
+
+        :param candidate_distances: (n, C) distances from every validator to every candidate.
+        """
+        n = len(self.stakes)
+        rows = np.arange(n)[:, None]
+        threshold = self.fraction * (self.total + stake)
+
+        # First position reaching the threshold without the new validator, and with it counted in
+        without_new = (self.prefix_stakes < threshold).sum(axis=1)[:, None]
+        with_new = (self.prefix_stakes < threshold - stake).sum(axis=1)[:, None]
+
+        # Insertion position of every candidate in every sorted row, via one searchsorted over offset rows
+        offset = max(self.sorted_distances.max(), candidate_distances.max()) + 1
+        flat = (self.sorted_distances + np.arange(n)[:, None] * offset).ravel()
+        inserted = np.searchsorted(flat, candidate_distances + rows * offset, side="right") - rows * n
+
+        padded = np.hstack((np.zeros((n, 1)), self.prefix_distances))  # padded[:, j] = distance of the first j
+        crossed_before = without_new < inserted
+        crossed_at_new = ~crossed_before & (inserted > with_new)
+        gdi = np.where(
+            crossed_before,
+            padded[rows, np.minimum(without_new, n - 1) + 1],
+            np.where(crossed_at_new, padded[rows, inserted], padded[rows, np.minimum(with_new, n - 1) + 1])
+            + candidate_distances,
+        )
+        return gdi.sum(axis=0)
+
+    def _new_validator_gdi(self, candidate_distances, stake):
+        """
+        GDI of the new validator at every candidate site.
+        """
+        order = np.argsort(candidate_distances, axis=0, kind="stable")
+        sorted_distances = np.take_along_axis(candidate_distances, order, axis=0)
+        accumulated = stake + np.cumsum(self.stakes[order], axis=0)
+        threshold = self.fraction * (self.total + stake)
+        crossing = (accumulated < threshold).sum(axis=0)
+        travelled = np.vstack((np.zeros((1, candidate_distances.shape[1])), np.cumsum(sorted_distances, axis=0)))
+        # The validator itself comes first at distance 0 and may already be enough
+        return np.where(stake >= threshold, 0, travelled[np.minimum(crossing, len(self.stakes) - 1) + 1,
+                                                        np.arange(candidate_distances.shape[1])])
+
+    def _country_effects(self, candidate_countries, stake):
+        """
+        Country Gini and Nakamoto coefficients after adding the stake to each candidate's country.
+        """
+        names, inverse = np.unique(np.asarray(candidate_countries, dtype=str), return_inverse=True)
+        positions = np.searchsorted(self.country_names, names)
+        known = (positions < len(self.country_names)) & (
+            self.country_names[np.minimum(positions, len(self.country_names) - 1)] == names
+        )
+
+        # One column per distinct candidate country; unknown countries get a new group
+        groups = len(self.country_stakes)
+        stakes = np.tile(np.append(self.country_stakes, 0.0)[:, None], (1, len(names)))
+        stakes[np.where(known, positions, groups), np.arange(len(names))] += stake
+        present = stakes > 0
+
+        gini = gini_coefficient(stakes, axis=0, mask=present)
+        nakamoto = nakamoto_from_group_stakes(stakes)
+        return gini[inverse.ravel()], nakamoto[:, inverse.ravel()]
+
+    def score(self, candidate_latitudes, candidate_longitudes, candidate_countries, stake):
+        """
+        Effect of adding a validator with the given stake at every candidate site.
+
+        :param candidate_latitudes: Array of candidate latitudes.
+        :param candidate_longitudes: Array of candidate longitudes.
+        :param candidate_countries: Array of candidate country names.
+        :param stake: Stake of the new validator (same unit as the validator stakes).
+        :return: Dictionary of (C,) arrays: 'gdi', 'delta_gdi' (mean GDI, higher is more spread out),
+                 'country_gini', 'delta_country_gini', 'nakamoto_33', 'nakamoto_67' and 'delta_nakamoto_33',
+                 'delta_nakamoto_67' (country Nakamoto coefficients).
+        """
+        candidate_distances = haversine_matrix(
+            self.latitudes, self.longitudes, candidate_latitudes, candidate_longitudes
+        )
+        gdi = (self._existing_gdi(candidate_distances, stake) + self._new_validator_gdi(candidate_distances, stake)) / (
+            len(self.stakes) + 1
+        )
+        gini, nakamoto = self._country_effects(candidate_countries, stake)
+        return {
+            "gdi": gdi,
+            "delta_gdi": gdi - self.gdi,
+            "country_gini": gini,
+            "delta_country_gini": gini - self.country_gini,
+            "nakamoto_33": nakamoto[0],
+            "nakamoto_67": nakamoto[1],
+            "delta_nakamoto_33": nakamoto[0] - self.nakamoto[0],
+            "delta_nakamoto_67": nakamoto[1] - self.nakamoto[1],
+        }
+
+    def recommend(self, candidate_latitudes, candidate_longitudes, candidate_countries, stake, top_k=10, by="gdi"):
+        """
+        Best candidate sites for a new validator.
+
+        :param by: Objective: 'gdi' (largest GDI increase), 'country_gini' (largest Gini decrease) or 'nakamoto'
+                   (largest increase of the 1/3 country Nakamoto coefficient, ties broken by GDI).
+        :return: Tuple (positions of the top_k candidates, best first; scores from score()).
+        """
+        if by not in OBJECTIVES:
+            raise ValueError(f"Unknown objective '{by}'. Expected one of {OBJECTIVES}.")
+        scores = self.score(candidate_latitudes, candidate_longitudes, candidate_countries, stake)
+        if by == "gdi":
+            ranking = np.argsort(-scores["delta_gdi"], kind="stable")
+        elif by == "country_gini":
+            ranking = np.argsort(scores["delta_country_gini"], kind="stable")
+        else:
+            ranking = np.lexsort((-scores["delta_gdi"], -scores["delta_nakamoto_33"]))
+        return ranking[:top_k], scores
@@ -0,0 +1,116 @@
+import csv
+import os
+import sys
+
+import numpy as np
+
+from pre_processing.stake_units import StakeUnits
+from utils.gini import gini_coefficient
+from utils.nakamoto import group_stakes, nakamoto_from_group_stakes
+from utils.spatial import haversine_matrix
+
+# Metrics-only path for cron runs: NumPy and the standard library only, no pandas, plotting or geo libraries
+
+
+def read_columns(path, numeric=("latitude", "longitude", "stake_weight"), text=("country",), integer=("stake_weight",)):
+    """
+    Reads columns of a CSV file into arrays with the csv module.
+
+    :param path: CSV file.
+    :param numeric: Columns parsed as floats (empty cells become NaN).
+    :param text: Columns kept as strings, if present.
+    :param integer: Numeric columns kept as int64 when every cell is an integer, so large stakes stay exact.
+    :return: Dictionary of column name to array.
+    """
+    with open(path, newline="", encoding="ISO-8859-1") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = list(reader)
+    positions = {name: header.index(name) for name in (*numeric, *text) if name in header}
+    columns = {}
+    for name, position in positions.items():
+        values = [row[position] if position < len(row) else "" for row in rows]
+        if name in integer and all(value.isdigit() and len(value) < 19 for value in values):
+            columns[name] = np.array([int(value) for value in values], dtype=np.int64)
+        elif name in numeric:
+            columns[name] = np.array([float(value) if value else np.nan for value in values])
+        else:
+            columns[name] = np.array(values, dtype=str)
+    return columns
+
+
+def gdi_values(latitudes, longitudes, stakes, fraction=2 / 3, block_size=1024):
+    """
+    GDI of every validator (see GDI_Calculator): the summed distance to the closest validators, itself
+    first, until they hold at least fraction of the stake. Rows are processed in blocks to bound memory.
+    Stakes with a common base unit (see StakeUnits) are compared with the quorum exactly.
+
+    :return: Array of GDI values in km.
+    """
+    units = StakeUnits.from_stakes(stakes)
+    stakes = np.asarray(stakes, dtype=float)
+    result = np.empty(len(stakes))
+    for start in range(0, len(stakes), block_size):
+        rows = slice(start, start + block_size)
+        distances = haversine_matrix(latitudes[rows], longitudes[rows], latitudes, longitudes)
+        order = np.argsort(distances, axis=1, kind="stable")
+        if units is not None:
+            reached = units.cumsum_reaches(order, units.threshold(fraction), axis=1)
+        else:
+            reached = np.cumsum(stakes[order], axis=1) >= fraction * stakes.sum()
+        crossing = np.argmax(reached, axis=1)[:, None]
+        travelled = np.cumsum(np.take_along_axis(distances, order, axis=1), axis=1)
+        result[rows] = np.take_along_axis(travelled, crossing, axis=1)[:, 0]
+    return result
+
+
+def chain_metrics(columns, fraction=2 / 3):
+    """
+    Headline metrics of one chain.
+
+    :param columns: Output of read_columns.
+    :param fraction: Stake fraction of the GDI quorum.
+    :return: Dictionary with 'validators', 'total_stake', 'mean_gdi' and, with a 'country' column,
+             'country_gini', 'nakamoto_33' and 'nakamoto_67'.
+    """
+    latitudes, longitudes = columns["latitude"], columns["longitude"]
+    stakes = np.nan_to_num(columns["stake_weight"])
+    units = StakeUnits.from_stakes(stakes)
+    located = ~(np.isnan(latitudes) | np.isnan(longitudes))
+    metrics = {
+        "validators": len(stakes),
+        "total_stake": units.total_stake() if units is not None else stakes.sum(),
+        "mean_gdi": gdi_values(latitudes[located], longitudes[located], stakes[located], fraction).mean()
+        if located.any() else np.nan,
+    }
+    if "country" in columns:
+        countries = np.where(columns["country"] == "", "Unknown", columns["country"])
+        _, sums = group_stakes(countries, stakes)
+        nakamoto = nakamoto_from_group_stakes(sums)[:, 0]
+        metrics.update({
+            "country_gini": gini_coefficient(sums[:, 0]),
+            "nakamoto_33": int(nakamoto[0]),
+            "nakamoto_67": int(nakamoto[1]),
+        })
+    return metrics
+
+
+if __name__ == "__main__":
+    input_folder = sys.argv[1] if len(sys.argv) > 1 else "data/pre_processed_data/"
+    output_file = sys.argv[2] if len(sys.argv) > 2 else "results/quick_metrics.csv"
+
+    results_list = []
+    for file in sorted(os.listdir(input_folder)):
+        if not file.endswith(".csv"):
+            continue
+        metrics = chain_metrics(read_columns(os.path.join(input_folder, file)))
+        results_list.append({"file": os.path.splitext(file)[0], **metrics})
+        print(", ".join(f"{key}: {value}" for key, value in results_list[-1].items()))
+
+    fieldnames = list(dict.fromkeys(key for row in results_list for key in row))
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    with open(output_file, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(results_list)
+    print(f"Results saved to {output_file}")
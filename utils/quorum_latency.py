@@ -0,0 +1,56 @@
+import numpy as np
+
+# Light in fibre covers about 200 km per millisecond (two thirds of c)
+FIBER_SPEED_KM_PER_MS = 200.0
+
+
+def rtt_matrix(distances_km, stretch=1.5, fiber_speed=FIBER_SPEED_KM_PER_MS, overhead_ms=1.0):
+    """
+    Round-trip times from great-circle distances: RTT = 2 * d * stretch / fiber_speed + overhead.
+
+    RTT is an increasing affine function of distance, so stretch, fiber_speed and overhead_ms only set the
+    scale in ms. They cannot change which responders form a quorum or how configurations rank against each
+    other, so fitting them to emulation results does not improve a rank correlation.
+
+    :param distances_km: (n, n) distance matrix in km.
+    :param stretch: Ratio of fibre route length to great-circle distance.
+    :param fiber_speed: Signal speed in km per ms.
+    :param overhead_ms: Fixed per-message processing and queuing time, not charged to the leader itself.
+    :return: (n, n) RTT matrix in ms.
+    """
+    rtt = 2 * np.asarray(distances_km, dtype=float) * stretch / fiber_speed + overhead_ms
+    np.fill_diagonal(rtt, 0)
+    return rtt
+
+
+def quorum_latency(rtt, weights, fraction=2 / 3):
+    """
+    Time until validators holding more than fraction of the stake have responded to each leader,
+    for all leaders and all weight columns at once.
+
+    :param rtt: (n, n) RTT matrix in ms; row i holds the RTTs seen by leader i (itself at 0).
+    :param weights: Array of shape (n,) or (n, W) with the stake of every validator per weighting.
+    :param fraction: Quorum size as a fraction of the stake.
+    :return: (n, W) array of quorum latencies in ms.
+    """
+    weights = np.asarray(weights, dtype=float)
+    if weights.ndim == 1:
+        weights = weights[:, None]
+    order = np.argsort(rtt, axis=1)
+    sorted_rtt = np.take_along_axis(rtt, order, axis=1)
+
+    accumulated = np.cumsum(weights[order], axis=1)  # (leaders, responders, W)
+    crossing = np.argmax(accumulated > fraction * weights.sum(axis=0), axis=1)  # (leaders, W)
+    return np.take_along_axis(sorted_rtt, crossing, axis=1)
+
+
+def summarize_leaders(latencies, weights):
+    """
+    Expected quorum latency under round-robin (uniform) and stake-proportional leader rotation.
+
+    :param latencies: (n, W) output of quorum_latency.
+    :param weights: (n, W) stake of every validator per weighting.
+    :return: Tuple of (W,) arrays (round-robin mean, stake-weighted mean).
+    """
+    weights = np.asarray(weights, dtype=float).reshape(latencies.shape)
+    return latencies.mean(axis=0), (latencies * weights).sum(axis=0) / weights.sum(axis=0)
@@ -0,0 +1,134 @@
+import numpy as np
+
+from utils.gini import gini_coefficient
+from utils.nakamoto import nakamoto_from_group_stakes
+
+
+def _levels(sorted_values, moved):
+    """
+    Water level per moved amount: the level L with sum(max(v - L, 0)) = moved, for values sorted descending.
+    """
+    count = np.arange(1, len(sorted_values) + 1)
+    prefix = np.cumsum(sorted_values)
+    # Amount above each value: what lowering everything down to that value would move
+    above = prefix - count * sorted_values
+    k = np.searchsorted(above, moved, side="right")  # Number of values above the level
+    k = np.clip(k, 1, len(sorted_values))
+    return (prefix[k - 1] - moved) / k
+
+
+def water_fill(stakes, moved):
+    """
+    Most equalizing relocation of a given amount of stake: the largest stakes are lowered to a common
+    ceiling and the smallest raised to a common floor, each side moving exactly the given amount.
+
+    :param stakes: Array of stake per location (G,).
+    :param moved: Array of amounts to move (K,), each at most max_relocation(stakes).
+    :return: (K, G) array of the stake per location after each relocation.
+    """
+    stakes = np.asarray(stakes, dtype=float)
+    moved = np.atleast_1d(np.asarray(moved, dtype=float))
+    ceilings = _levels(np.sort(stakes)[::-1], moved)
+    floors = -_levels(np.sort(-stakes)[::-1], moved)
+    return np.clip(stakes[None, :], floors[:, None], ceilings[:, None])
+
+
+def max_relocation(stakes):
+    """
+    Amount of stake that has to move to make every location hold the mean stake.
+    """
+    stakes = np.asarray(stakes, dtype=float)
+    return np.maximum(stakes - stakes.mean(), 0).sum()
+
+
+def _search(stakes, reached, tolerance, grid=64):
+    """
+    Smallest moved amount for which reached(water_fill(stakes, amounts)) is True, by repeatedly evaluating
+    a grid of amounts in one batch and zooming in on the first one that reaches the target.
+    """
+    low, high = 0.0, max_relocation(stakes)
+    if reached(water_fill(stakes, [low]))[0]:
+        return low
+    if not reached(water_fill(stakes, [high]))[0]:
+        raise ValueError("The target cannot be reached by relocating stake between the existing locations.")
+    while high - low > tolerance * stakes.sum():
+        amounts = np.linspace(low, high, grid + 1)
+        first = int(np.argmax(reached(water_fill(stakes, amounts))))
+        low, high = amounts[max(first - 1, 0)], amounts[first]
+    return high
+
+
+def relocate_for_gini(stakes, target, tolerance=1e-6):
+    """
+    Minimal total stake to move between locations so that the Gini of the per-location stake drops to target.
+
+    Uses the plain Gini: every transfer from a larger to a smaller location lowers it, and water filling is the
+    most equalizing way to move a given amount. The min-max normalized Gini of the analysis scripts is not
+    monotone under such transfers (raising the smallest location moves the zero point), so it is not a
+    meaningful optimization target.
+
+    :param stakes: Array of stake per location (e.g. per country or per geo cell).
+    :param target: Gini coefficient to reach.
+    :param tolerance: Precision of the moved amount, as a fraction of the total stake.
+    :return: Dictionary with 'moved' (amount), 'stakes' (per location after the relocation),
+             'gini_before' and 'gini_after'.
+    """
+    stakes = np.asarray(stakes, dtype=float)
+    moved = _search(stakes, lambda filled: gini_coefficient(filled, normalize=False) <= target, tolerance)
+    after = water_fill(stakes, [moved])[0]
+    return {
+        "moved": moved,
+        "stakes": after,
+        "gini_before": gini_coefficient(stakes, normalize=False),
+        "gini_after": gini_coefficient(after, normalize=False),
+    }
+
+
+def relocate_for_nakamoto(stakes, target, threshold=1 / 3, tolerance=1e-6):
+    """
+    Minimal total stake to move between locations so that at least target locations are needed to hold
+    more than threshold of the stake.
+
+    :param stakes: Array of stake per location.
+    :param target: Nakamoto coefficient to reach.
+    :param threshold: Stake fraction of the Nakamoto coefficient.
+    :param tolerance: Precision of the moved amount, as a fraction of the total stake.
+    :return: Dictionary with 'moved', 'stakes', 'nakamoto_before' and 'nakamoto_after'.
+    """
+    stakes = np.asarray(stakes, dtype=float)
+    moved = _search(stakes, lambda filled: nakamoto_from_group_stakes(filled.T, (threshold,))[0] >= target, tolerance)
+    after = water_fill(stakes, [moved])[0]
+    return {
+        "moved": moved,
+        "stakes": after,
+        "nakamoto_before": int(nakamoto_from_group_stakes(stakes, (threshold,))[0, 0]),
+        "nakamoto_after": int(nakamoto_from_group_stakes(after, (threshold,))[0, 0]),
+    }
+
+
+def relocation_moves(labels, before, after):
+    """
+    Lists the relocation as individual moves, from the largest donor to the smallest receiver first.
+
+    :param labels: Location names.
+    :param before: Stake per location before.
+    :param after: Stake per location after.
+    :return: List of (from location, to location, amount) tuples.
+    """
+    labels = np.asarray(labels)
+    change = np.asarray(after, dtype=float) - np.asarray(before, dtype=float)
+    donors = [[i, -change[i]] for i in np.argsort(np.asarray(before))[::-1] if change[i] < 0]
+    receivers = [[i, change[i]] for i in np.argsort(np.asarray(before)) if change[i] > 0]
+
+    moves = []
+    d = r = 0
+    while d < len(donors) and r < len(receivers):
+        amount = min(donors[d][1], receivers[r][1])
+        moves.append((labels[donors[d][0]], labels[receivers[r][0]], amount))
+        donors[d][1] -= amount
+        receivers[r][1] -= amount
+        if donors[d][1] <= 1e-12 * max(amount, 1):
+            d += 1
+        if receivers[r][1] <= 1e-12 * max(amount, 1):
+            r += 1
+    return moves
@@ -0,0 +1,366 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from pre_processing.gdi_calculator import closest_merge_owners, gdi_from_distances
+from pre_processing.stake_units import group_sum
+from utils.gini import gini_coefficient
+from utils.spatial import haversine_matrix
+
+COLUMNS = ["uuid", "latitude", "longitude", "stake_weight"]
+CHANGES = ("add", "remove", "update")
+
+
+def _read_validators(path):
+    return pd.read_csv(path, dtype={"uuid": str})
+
+
+def _replace_file(path, write):
+    """
+    Writes a file through a temporary file and os.replace, so readers see either the old or the new content.
+
+    :param write: Function writing the content to the path it is given.
+    """
+    tmp_path = path + ".tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def compute_delta(previous, current):
+    """
+    Changes between two validator sets, keyed by uuid.
+
+    :param previous: DataFrame with 'uuid', 'latitude', 'longitude' and 'stake_weight'.
+    :param current: DataFrame with the same columns.
+    :return: DataFrame with 'uuid', 'change' ('add', 'remove' or 'update'), the new 'latitude', 'longitude' and
+             'stake_weight' (the last known ones for removals) and the previous values as 'old_latitude',
+             'old_longitude' and 'old_stake_weight'.
+    """
+    merged = previous[COLUMNS].merge(current[COLUMNS], on="uuid", how="outer", suffixes=("_old", ""), indicator=True)
+    changed = (
+        (merged["latitude"] != merged["latitude_old"])
+        | (merged["longitude"] != merged["longitude_old"])
+        | (merged["stake_weight"] != merged["stake_weight_old"])
+    )
+    merged["change"] = np.select(
+        [merged["_merge"] == "right_only", merged["_merge"] == "left_only", changed], CHANGES, default=""
+    )
+    merged = merged[merged["change"] != ""]
+
+    removed = merged["change"] == "remove"
+    for column in COLUMNS[1:]:
+        merged[column] = merged[column].where(~removed, merged[f"{column}_old"])
+    merged = merged.rename(columns={f"{column}_old": f"old_{column}" for column in COLUMNS[1:]})
+    return merged[["uuid", "change"] + COLUMNS[1:] + [f"old_{column}" for column in COLUMNS[1:]]].reset_index(
+        drop=True
+    )
+
+
+def apply_delta(state, delta):
+    """
+    Applies a delta from compute_delta to a validator set.
+
+    :return: The new validator set, sorted by uuid.
+    """
+    kept = state[~state["uuid"].isin(delta["uuid"])]
+    changed = delta.loc[delta["change"] != "remove", COLUMNS]
+    return pd.concat([kept[COLUMNS], changed], ignore_index=True).sort_values("uuid", ignore_index=True)
+
+
+class LocationMetrics:
+    def __init__(self, fraction=2 / 3, threshold_percentage=33.0, merge_distance=20):
+        """
+        Cleaned-data metrics of a validator set, kept up to date from deltas instead of being rebuilt.
+
+        Cleaning merges validators with the same coordinates, which is a sum of stake per location, so every
+        change only moves stake between two locations. Locations keep their slot (and their row of the
+        distance matrix) while their stake is zero; only the distances of new locations are computed.
+        The proximity merge of the GDI depends on all locations and is redone on the cached distances.
+
+        :param fraction: Stake fraction of the GDI quorum.
+        :param threshold_percentage: Validators at (0, 0) are dropped when they hold less than this percentage of
+                                     the stake (see DataCleaner.clean_data).
+        :param merge_distance: Distance in km below which locations are merged before the GDI
+                               (see GDI_Calculator.merge_closest_validators).
+        """
+        self.fraction = fraction
+        self.threshold_percentage = threshold_percentage
+        self.merge_distance = merge_distance
+        self.slots = {}
+        self.latitudes = np.zeros(0)
+        self.longitudes = np.zeros(0)
+        self.stakes = np.zeros(0)
+        self.validators = np.zeros(0, dtype=int)
+        self.distances = np.zeros((0, 0))
+
+    def _add_locations(self, latitudes, longitudes):
+        """
+        Slots for new locations, with their distances to all known locations.
+        """
+        start = len(self.stakes)
+        self.slots.update({location: start + i for i, location in enumerate(zip(latitudes, longitudes))})
+        self.latitudes = np.concatenate((self.latitudes, latitudes))
+        self.longitudes = np.concatenate((self.longitudes, longitudes))
+        self.stakes = np.concatenate((self.stakes, np.zeros(len(latitudes))))
+        self.validators = np.concatenate((self.validators, np.zeros(len(latitudes), dtype=int)))
+
+        new_rows = haversine_matrix(latitudes, longitudes, self.latitudes, self.longitudes)
+        distances = np.zeros((len(self.stakes), len(self.stakes)))
+        distances[:start, :start] = self.distances
+        distances[start:] = new_rows
+        distances[:start, start:] = new_rows[:, :start].T
+        self.distances = distances
+
+    def _compact(self):
+        """
+        Drops the slots of locations without validators once they make up most of the matrix.
+        """
+        keep = np.flatnonzero(self.validators > 0)
+        self.latitudes = self.latitudes[keep]
+        self.longitudes = self.longitudes[keep]
+        self.stakes = self.stakes[keep]
+        self.validators = self.validators[keep]
+        self.distances = self.distances[np.ix_(keep, keep)]
+        self.slots = {location: i for i, location in enumerate(zip(self.latitudes, self.longitudes))}
+
+    def update(self, latitudes, longitudes, stakes, counts):
+        """
+        Adds stake and validator counts (negative to remove) at the given coordinates.
+        """
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        new = list(dict.fromkeys(location for location in zip(latitudes, longitudes) if location not in self.slots))
+        if new:
+            self._add_locations(np.array([lat for lat, _ in new]), np.array([lon for _, lon in new]))
+
+        slots = np.array([self.slots[location] for location in zip(latitudes, longitudes)], dtype=int)
+        np.add.at(self.stakes, slots, np.asarray(stakes, dtype=float))
+        np.add.at(self.validators, slots, np.asarray(counts, dtype=int))
+        if (self.validators == 0).sum() > len(self.validators) / 2:
+            self._compact()
+
+    def apply_delta(self, delta):
+        """
+        Moves the stake of every changed validator from its old to its new location.
+        """
+        old = delta[delta["change"] != "add"]
+        new = delta[delta["change"] != "remove"]
+        self.update(
+            np.concatenate((old["old_latitude"], new["latitude"])),
+            np.concatenate((old["old_longitude"], new["longitude"])),
+            np.concatenate((-old["old_stake_weight"], new["stake_weight"])),
+            np.concatenate((-np.ones(len(old), dtype=int), np.ones(len(new), dtype=int))),
+        )
+
+    def compute(self):
+        """
+        :return: Dictionary with 'validators', 'locations' (after merging equal coordinates), 'total_stake',
+                 'stake_gini' (Gini of the stake per location), 'max_location_share' and 'mean_gdi'
+                 (after the proximity merge, as in the pre-processing pipeline, see GDI_Calculator).
+        """
+        active = self.validators > 0
+        zero = (self.latitudes == 0) & (self.longitudes == 0)
+        total = self.stakes[active].sum()
+        if total and self.stakes[active & zero].sum() / total * 100 < self.threshold_percentage:
+            active &= ~zero
+        positions = np.flatnonzero(active)
+        if len(positions) == 0:
+            return {"validators": 0, "locations": 0, "total_stake": 0.0, "stake_gini": 0.0,
+                    "max_location_share": np.nan, "mean_gdi": np.nan}
+        # Locations in the order of the cleaned data (sorted by coordinates), which decides ties of the merge
+        positions = positions[np.lexsort((self.longitudes[positions], self.latitudes[positions]))]
+        stakes = self.stakes[positions]
+
+        distances = self.distances[np.ix_(positions, positions)]
+        owner, merged, _ = closest_merge_owners(distances, self.merge_distance)
+        merged_stakes = group_sum(stakes, owner, len(stakes))[~merged]
+        gdi, _ = gdi_from_distances(distances[np.ix_(~merged, ~merged)], merged_stakes, self.fraction)
+        return {
+            "validators": int(self.validators[positions].sum()),
+            "locations": len(positions),
+            "total_stake": stakes.sum(),
+            "stake_gini": gini_coefficient(stakes),
+            "max_location_share": stakes.max() / stakes.sum(),
+            "mean_gdi": gdi.mean(),
+        }
+
+
+class SnapshotStore:
+    def __init__(self, root, chain, keyframe_interval=30, fraction=2 / 3, threshold_percentage=33.0,
+                 merge_distance=20):
+        """
+        History of the validator set of one chain, stored as a full keyframe every keyframe_interval snapshots
+        and uuid-keyed deltas in between, together with a metrics time series that is extended incrementally.
+
+        Layout of root/chain/: index.json (dates and files of all snapshots), keyframes/<date>.csv,
+        deltas/<date>.csv (one per snapshot, keyframes included), heads/<date>.csv (the latest validator set) and
+        metrics.csv (one row per snapshot).
+
+        Saving index.json commits a snapshot. Every other file is written before it, under a name of its own or
+        through an atomic replace, so a crash at any point leaves the store at the previous or the new snapshot
+        and adding the snapshot again completes it.
+
+        :param root: Folder holding the stores of all chains.
+        :param chain: Chain name.
+        :param keyframe_interval: Snapshots per keyframe; bounds the deltas replayed to restore any date.
+        :param fraction: Stake fraction of the GDI quorum.
+        :param threshold_percentage: Zero-coordinate threshold of the cleaning step.
+        :param merge_distance: Proximity merge distance in km of the GDI.
+        """
+        self.folder = os.path.join(root, chain)
+        self.index_path = os.path.join(self.folder, "index.json")
+        self.metrics_path = os.path.join(self.folder, "metrics.csv")
+        for subfolder in ("keyframes", "deltas", "heads"):
+            os.makedirs(os.path.join(self.folder, subfolder), exist_ok=True)
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+        else:
+            self.index = {"keyframe_interval": keyframe_interval, "snapshots": [], "head": None}
+        if self.index.get("head"):
+            self.head = _read_validators(os.path.join(self.folder, self.index["head"]))
+        elif self.index["snapshots"]:
+            # Stores written before heads/ existed: restore the latest set from its keyframe and deltas
+            self.head = self.state(self.dates()[-1])
+        else:
+            self.head = None
+        self.location_metrics = LocationMetrics(fraction, threshold_percentage, merge_distance)
+        if self.head is not None:
+            self.location_metrics.update(
+                self.head["latitude"], self.head["longitude"], self.head["stake_weight"], np.ones(len(self.head))
+            )
+
+    def dates(self):
+        """
+        :return: List of snapshot dates, oldest first.
+        """
+        return [snapshot["date"] for snapshot in self.index["snapshots"]]
+
+    def _save_index(self, index):
+        def write(path):
+            with open(path, "w") as f:
+                json.dump(index, f, indent=2)
+
+        _replace_file(self.index_path, write)
+        self.index = index
+
+    def _read_metrics(self):
+        """
+        Rows of metrics.csv of committed snapshots, one per date; rows of a snapshot whose index save was
+        interrupted are left out.
+        """
+        if not os.path.exists(self.metrics_path):
+            return pd.DataFrame()
+        metrics = pd.read_csv(self.metrics_path, dtype={"date": str})
+        return metrics[metrics["date"].isin(self.dates())].drop_duplicates("date", keep="last")
+
+    def add_snapshot(self, date, df):
+        """
+        Adds the validator set crawled on date, which has to be later than every stored snapshot.
+
+        :param date: ISO date string (e.g. '2024-10-01'); ISO dates sort chronologically.
+        :param df: DataFrame with 'uuid', 'latitude', 'longitude' and 'stake_weight'.
+        :return: Dictionary with the metrics of the new snapshot and the number of 'added', 'removed' and
+                 'updated' validators.
+        """
+        if self.index["snapshots"] and date <= self.index["snapshots"][-1]["date"]:
+            raise ValueError(f"Snapshot {date} is not later than the latest snapshot {self.dates()[-1]}.")
+        current = df[COLUMNS].astype({"uuid": str}).drop_duplicates("uuid", keep="last")
+        # Missing coordinates count as (0, 0), as in DataCleaner
+        current[["latitude", "longitude"]] = current[["latitude", "longitude"]].fillna(0).astype(float)
+        current = current.sort_values("uuid", ignore_index=True)
+        previous = self.head if self.head is not None else pd.DataFrame(columns=COLUMNS)
+        delta = compute_delta(previous, current)
+
+        # Data files first, each under the snapshot's date, so a repeated add overwrites what it left behind
+        entry = {"date": date, "delta": os.path.join("deltas", f"{date}.csv"), "keyframe": None}
+        _replace_file(os.path.join(self.folder, entry["delta"]), lambda path: delta.to_csv(path, index=False))
+        if len(self.index["snapshots"]) % self.index["keyframe_interval"] == 0:
+            entry["keyframe"] = os.path.join("keyframes", f"{date}.csv")
+            _replace_file(os.path.join(self.folder, entry["keyframe"]), lambda path: current.to_csv(path, index=False))
+        entry.update({change: int((delta["change"] == change).sum()) for change in CHANGES})
+        head = os.path.join("heads", f"{date}.csv")
+        _replace_file(os.path.join(self.folder, head), lambda path: current.to_csv(path, index=False))
+
+        self.location_metrics.apply_delta(delta)
+        metrics = {"date": date, **self.location_metrics.compute()}
+        metrics_df = pd.concat([self._read_metrics(), pd.DataFrame([metrics])], ignore_index=True)
+        _replace_file(self.metrics_path, lambda path: metrics_df.to_csv(path, index=False))
+
+        # Saving the index commits the snapshot
+        self._save_index({**self.index, "snapshots": self.index["snapshots"] + [entry], "head": head})
+        self.head = current
+        for file in os.listdir(os.path.join(self.folder, "heads")):
+            if os.path.join("heads", file) != head:
+                os.remove(os.path.join(self.folder, "heads", file))
+        return {**metrics, "added": entry["add"], "removed": entry["remove"], "updated": entry["update"]}
+
+    def _position(self, date):
+        """
+        Position of the latest snapshot on or before date.
+        """
+        position = int(np.searchsorted(self.dates(), date, side="right")) - 1
+        if position < 0:
+            raise ValueError(f"No snapshot on or before {date}.")
+        return position
+
+    def _read(self, position, kind):
+        return _read_validators(os.path.join(self.folder, self.index["snapshots"][position][kind]))
+
+    def states(self, start=None, end=None):
+        """
+        Validator sets of all snapshots between start and end (inclusive), oldest first. Only the keyframe
+        preceding start and the deltas after it are read.
+
+        :return: Generator of (date, DataFrame) tuples.
+        """
+        snapshots = self.index["snapshots"]
+        if not snapshots:
+            return
+        first = self._position(start) if start is not None and start > snapshots[0]["date"] else 0
+        last = self._position(end) if end is not None else len(snapshots) - 1
+        keyframe = max(i for i in range(first + 1) if snapshots[i]["keyframe"])
+
+        state = self._read(keyframe, "keyframe")
+        for position in range(keyframe, last + 1):
+            if position > keyframe:
+                state = apply_delta(state, self._read(position, "delta"))
+            if position >= first and (start is None or snapshots[position]["date"] >= start):
+                yield snapshots[position]["date"], state
+
+    def state(self, date):
+        """
+        Validator set as of date (the latest snapshot on or before it).
+        """
+        snapshot_date = self.dates()[self._position(date)]
+        return next(self.states(snapshot_date, snapshot_date))[1]
+
+    def deltas(self, start=None, end=None):
+        """
+        All changes between start and end (inclusive), read from the delta files without restoring any
+        validator set.
+
+        :return: DataFrame of compute_delta rows with a 'date' column.
+        """
+        frames = [
+            self._read(position, "delta").assign(date=snapshot["date"])
+            for position, snapshot in enumerate(self.index["snapshots"])
+            if (start is None or snapshot["date"] >= start) and (end is None or snapshot["date"] <= end)
+        ]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def metrics(self, start=None, end=None):
+        """
+        Metrics time series between start and end (inclusive), from metrics.csv alone.
+        """
+        metrics = self._read_metrics()
+        if metrics.empty:
+            return metrics
+        if start is not None:
+            metrics = metrics[metrics["date"] >= start]
+        if end is not None:
+            metrics = metrics[metrics["date"] <= end]
+        return metrics.reset_index(drop=True)
@@ -0,0 +1,125 @@
+import numpy as np
+
+# Mean earth radius in km, the value used by the haversine package
+EARTH_RADIUS_KM = 6371.0088
+
+
+def to_unit_vectors(latitudes, longitudes):
+    """
+    Converts latitude/longitude in degrees to 3D unit vectors.
+
+    :param latitudes: Array of latitudes in degrees.
+    :param longitudes: Array of longitudes in degrees.
+    :return: (n, 3) float array.
+    """
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def km_to_chord(distance_km):
+    """
+    Converts a great-circle distance in km to the straight-line distance between unit vectors.
+    """
+    angle = np.minimum(np.asarray(distance_km, dtype=float) / EARTH_RADIUS_KM, np.pi)
+    return 2 * np.sin(angle / 2)
+
+
+def chord_to_km(chord):
+    """
+    Converts a straight-line distance between unit vectors to the great-circle distance in km.
+    """
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord, dtype=float) / 2, 0, 1))
+
+
+def haversine_distances(lat1, lon1, lat2, lon2):
+    """
+    Vectorized haversine distance in km. Inputs are broadcast against each other.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=float)) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def haversine_matrix(latitudes, longitudes, other_latitudes=None, other_longitudes=None):
+    """
+    Pairwise haversine distances in km between two sets of points (or within one set).
+
+    :return: (n, m) float array.
+    """
+    if other_latitudes is None:
+        other_latitudes, other_longitudes = latitudes, longitudes
+    return haversine_distances(
+        np.asarray(latitudes, dtype=float)[:, None],
+        np.asarray(longitudes, dtype=float)[:, None],
+        np.asarray(other_latitudes, dtype=float)[None, :],
+        np.asarray(other_longitudes, dtype=float)[None, :],
+    )
+
+
+class SphericalIndex:
+    def __init__(self, latitudes, longitudes, leafsize=16):
+        """
+        Spatial index over points on the sphere: a k-d tree over 3D unit vectors.
+        Chord distances are monotone in great-circle distances, so nearest neighbours and
+        radius queries on the tree are exact.
+
+        :param latitudes: Array of latitudes in degrees.
+        :param longitudes: Array of longitudes in degrees.
+        :param leafsize: Leaf size of the k-d tree.
+        """
+        from scipy.spatial import cKDTree
+
+        self.latitudes = np.asarray(latitudes, dtype=float)
+        self.longitudes = np.asarray(longitudes, dtype=float)
+        self.points = to_unit_vectors(self.latitudes, self.longitudes)
+        self.tree = cKDTree(self.points, leafsize=leafsize)
+
+    def __len__(self):
+        return len(self.points)
+
+    def query(self, latitudes, longitudes, k=1):
+        """
+        Finds the k nearest indexed points of each query point.
+
+        :return: Tuple (distances in km, indices), each of shape (n,) for k=1 and (n, k) otherwise.
+        """
+        return self.query_points(to_unit_vectors(latitudes, longitudes), k=k)
+
+    def query_points(self, points, k=1):
+        """
+        Like query, for points already given as (n, 3) unit vectors.
+        """
+        chords, indices = self.tree.query(points, k=k)
+        return chord_to_km(chords), indices
+
+    def query_radius(self, latitudes, longitudes, radius_km):
+        """
+        Finds all indexed points within radius_km of each query point.
+
+        :return: Array of index lists, one per query point.
+        """
+        return self.tree.query_ball_point(to_unit_vectors(latitudes, longitudes), km_to_chord(radius_km))
+
+    def query_pairs(self, radius_km):
+        """
+        Finds all pairs (i, j), i < j, of indexed points within radius_km of each other.
+
+        :return: (m, 2) int array.
+        """
+        return self.tree.query_pairs(km_to_chord(radius_km), output_type="ndarray")
+
+    def distance_matrix(self, other, radius_km):
+        """
+        Sparse great-circle distances in km between indexed points and the points of another index,
+        for all pairs within radius_km. Pairs at distance zero are kept as explicit entries.
+
+        :return: scipy.sparse.coo_matrix of shape (len(self), len(other)).
+        """
+        from scipy.sparse import coo_matrix
+
+        chords = self.tree.sparse_distance_matrix(other.tree, km_to_chord(radius_km), output_type="ndarray")
+        return coo_matrix(
+            (chord_to_km(chords["v"]), (chords["i"], chords["j"])), shape=(len(self), len(other))
+        )
@@ -0,0 +1,86 @@
+import numpy as np
+
+
+def _divide(numerator, denominator):
+    """
+    Element-wise division with 0 wherever the denominator is 0 (empty bins).
+    """
+    return np.divide(numerator, denominator, out=np.zeros_like(denominator), where=denominator > 0)
+
+
+def sinkhorn_costs(sources, targets, cost, epsilon, max_iterations=2000, tolerance=1e-4, scaling=0.5):
+    """
+    Entropic optimal transport (stabilized Sinkhorn) for a batch of distribution pairs on a common support.
+
+    The scaling iterations are batched matrix-vector products. Large scalings are regularly absorbed into
+    log-domain potentials, so small epsilon values do not underflow. The regularization starts at the largest
+    cost and is lowered by the scaling factor down to epsilon, warm-starting the potentials at every step
+    (epsilon scaling), which needs far fewer iterations than starting at a small epsilon.
+
+    :param sources: (P, m) array of source distributions (each row sums to 1).
+    :param targets: (P, m) array of target distributions.
+    :param cost: (m, m) cost matrix between support points.
+    :param epsilon: Entropic regularization, in cost units. Smaller is closer to the exact earth-mover distance.
+    :param max_iterations: Maximum number of Sinkhorn iterations per epsilon step.
+    :param tolerance: Move to the next step once the largest row marginal error of the batch is below tolerance.
+    :param scaling: Factor between consecutive epsilon steps.
+    :return: (P,) array of transport costs sum(plan * cost).
+    """
+    cost = np.asarray(cost, dtype=float)
+    sources = np.asarray(sources, dtype=float)
+    targets = np.asarray(targets, dtype=float)
+
+    steps = [epsilon]
+    while steps[-1] < cost.max():
+        steps.append(steps[-1] / scaling)
+
+    # Log-domain potentials in cost units, carried over between epsilon steps
+    f = np.zeros_like(sources)
+    g = np.zeros_like(targets)
+    with np.errstate(divide="ignore", under="ignore"):
+        for eps in reversed(steps):
+            kernel = np.exp((f[:, :, None] + g[:, None, :] - cost) / eps)
+            u = np.ones_like(sources)
+            v = np.ones_like(targets)
+            for iteration in range(max_iterations):
+                u = _divide(sources, (kernel @ v[:, :, None])[:, :, 0])
+                v = _divide(targets, (u[:, None, :] @ kernel)[:, 0, :])
+
+                if max(u.max(), v.max()) > 1e50:
+                    f, g = f + eps * np.log(u), g + eps * np.log(v)
+                    kernel = np.exp((f[:, :, None] + g[:, None, :] - cost) / eps)
+                    u = np.ones_like(sources)
+                    v = np.ones_like(targets)
+                elif iteration % 10 == 0:
+                    # After the v update the column marginals are exact; check the rows
+                    row_sums = u * (kernel @ v[:, :, None])[:, :, 0]
+                    if np.max(np.abs(row_sums - sources)) < tolerance:
+                        break
+
+            f, g = f + eps * np.log(u), g + eps * np.log(v)
+
+        plans = np.exp((f[:, :, None] + g[:, None, :] - cost) / eps)
+    return np.einsum("pij,ij->p", plans, cost)
+
+
+def wasserstein_matrix(distributions, cost, epsilon, **kwargs):
+    """
+    Pairwise entropic earth-mover distances between K distributions, solved in one batched Sinkhorn call.
+
+    :param distributions: (K, m) array of distributions over a common support (rows are normalized here).
+    :param cost: (m, m) cost matrix between support points (e.g. great-circle distances in km).
+    :param epsilon: Entropic regularization, in cost units.
+    :param kwargs: Passed on to sinkhorn_costs.
+    :return: Symmetric (K, K) array with zeros on the diagonal.
+    """
+    distributions = np.asarray(distributions, dtype=float)
+    distributions = distributions / distributions.sum(axis=1, keepdims=True)
+    k = len(distributions)
+    rows, cols = np.triu_indices(k, 1)
+
+    matrix = np.zeros((k, k))
+    if len(rows):
+        costs = sinkhorn_costs(distributions[rows], distributions[cols], cost, epsilon, **kwargs)
+        matrix[rows, cols] = costs
+        matrix[cols, rows] = costs
+    return matrix
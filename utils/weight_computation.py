@@ -6,9 +6,10 @@ from utils.normalization import Normalization
 class WeightComputation:
     def __init__(self, df):
         """
-        Initialize the WeightComputation class with a pandas DataFrame.
+        Initialize the WeightComputation class with a pandas DataFrame or ValidatorSet.
 
-        :param df: A pandas DataFrame with 'stake_weight' and 'GDI' columns.
+        :param df: A pandas DataFrame or ValidatorSet with 'stake_weight' and 'GDI' columns. Weights are added
+                   as columns either way; a ValidatorSet keeps its arrays and gains new ones.
         """
         self.df = df
 
@@ -34,9 +35,9 @@ class WeightComputation:
 
     def get_updated_df(self):
         """
-        Return the DataFrame after computing the weights.
+        Return the data after computing the weights.
 
-        :return: Updated DataFrame.
+        :return: Updated DataFrame (or ValidatorSet).
         """
         # Use self.df instead of df
         self.df = Normalization.normalize_column(self.df, col="stake_weight")
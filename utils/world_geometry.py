@@ -0,0 +1,104 @@
+import hashlib
+import os
+import pickle
+
+import numpy as np
+
+SHAPEFILE_PATH = "ne_110m_admin_0_countries/ne_110m_admin_0_countries.shp"
+CACHE_FOLDER = ".cache/geometry"
+
+# Per-process caches, filled on first use
+_worlds = {}
+_boundaries = {}
+
+
+def get_world(shapefile_path=SHAPEFILE_PATH):
+    """
+    Loads the world country polygons from the shapefile, once per process.
+
+    :param shapefile_path: Path to the Natural Earth countries shapefile.
+    :return: A GeoDataFrame with one row per country. Callers must not modify it in place.
+    """
+    if shapefile_path not in _worlds:
+        import geopandas as gpd
+
+        _worlds[shapefile_path] = gpd.read_file(shapefile_path)
+    return _worlds[shapefile_path]
+
+
+def _cache_file(shapefile_path, tolerance, cache_folder):
+    """
+    Returns the on-disk cache file for the boundaries of a shapefile.
+    The key covers the shapefile size and modification time, so an updated shapefile invalidates the cache.
+    """
+    stat = os.stat(shapefile_path)
+    key = f"{os.path.abspath(shapefile_path)}|{stat.st_size}|{stat.st_mtime_ns}|{tolerance}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    return os.path.join(cache_folder, f"boundaries_{digest}.pkl")
+
+
+def get_boundaries(shapefile_path=SHAPEFILE_PATH, tolerance=0.05, cache_folder=CACHE_FOLDER):
+    """
+    Returns the simplified country boundaries in longitude/latitude degrees, the projection used by all map plots.
+
+    The boundaries are computed once from the shapefile and pickled in cache_folder, so later runs
+    (and other processes) skip shapefile parsing entirely.
+
+    :param shapefile_path: Path to the Natural Earth countries shapefile.
+    :param tolerance: Simplification tolerance in degrees (0 keeps the original geometry).
+    :param cache_folder: Folder for the pickled boundaries.
+    :return: Dictionary with 'segments' (list of (N, 2) float arrays of lon/lat) and 'bounds' (minx, miny, maxx, maxy).
+    """
+    key = (shapefile_path, tolerance)
+    if key in _boundaries:
+        return _boundaries[key]
+
+    cache_file = _cache_file(shapefile_path, tolerance, cache_folder)
+    if os.path.exists(cache_file):
+        with open(cache_file, "rb") as f:
+            boundaries = pickle.load(f)
+    else:
+        world = get_world(shapefile_path)
+        lines = world.boundary
+        if tolerance > 0:
+            lines = lines.simplify(tolerance, preserve_topology=True)
+
+        segments = []
+        for geometry in lines:
+            parts = geometry.geoms if hasattr(geometry, "geoms") else [geometry]
+            for part in parts:
+                segments.append(np.asarray(part.coords, dtype=float)[:, :2])
+
+        boundaries = {"segments": segments, "bounds": tuple(float(b) for b in world.total_bounds)}
+
+        os.makedirs(cache_folder, exist_ok=True)
+        with open(cache_file, "wb") as f:
+            pickle.dump(boundaries, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    _boundaries[key] = boundaries
+    return boundaries
+
+
+def plot_boundaries(ax, color="black", linewidth=1.5, tolerance=0.05, **kwargs):
+    """
+    Draws the world country boundaries on a matplotlib axis as a single LineCollection.
+
+    Matches the look of GeoSeries.boundary.plot(ax=ax), including the latitude-corrected aspect ratio.
+
+    :param ax: Matplotlib axis to draw on.
+    :param color: Line color.
+    :param linewidth: Line width.
+    :param tolerance: Simplification tolerance in degrees passed to get_boundaries.
+    :return: The added LineCollection.
+    """
+    from matplotlib.collections import LineCollection
+
+    boundaries = get_boundaries(tolerance=tolerance)
+    collection = LineCollection(boundaries["segments"], colors=color, linewidths=linewidth, **kwargs)
+    ax.add_collection(collection)
+    ax.autoscale_view()
+
+    # Same aspect ratio geopandas uses for geographic coordinates
+    miny, maxy = boundaries["bounds"][1], boundaries["bounds"][3]
+    ax.set_aspect(1 / np.cos(np.mean([miny, maxy]) * np.pi / 180))
+    return collection